@@ -0,0 +1,137 @@
+###
+# Copyright 2019 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+""" Benchmark of the encrypted save, load and clone file paths.
+
+Encrypts and decrypts a generated clone document with the cryptography backend, when
+it is installed, and with pyaes, checking every output against the whole buffer pyaes
+encryption files were written with before chunking. The previous whole buffer paths,
+json.dumps then pyaes to save and pyaes then a validating and a final json.loads to
+load, are timed for comparison.
+
+usage: python benchmarks/aes_paths.py [MEGABYTES]
+"""
+
+import os
+import io
+import sys
+import json
+import time
+
+import pyaes
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+import rdmc_helper
+from rdmc_helper import Encryption
+
+#key used to encrypt the document
+KEY = '1234567890123456'
+
+def document(size):
+    """ Clone like document of about size bytes once encoded
+
+    :param size: approximate size in bytes
+    :type size: int.
+    :returns: returns the document
+    """
+    entry = {'@odata.type': '#Bios.v1_0_0.Bios', 'Attributes': dict(('Attribute%d' % ind, \
+                                            u'Value %d \xe9' % ind) for ind in range(40))}
+    count = max(1, size // len(json.dumps(entry)))
+    return [{'#Bios.v1_0_0.Bios': {'/redfish/v1/systems/1/bios/%d/' % ind: entry}} \
+                                                                for ind in range(count)]
+
+def timed(func, *args):
+    """ Time a single call
+
+    :param func: function called
+    :type func: function.
+    :returns: returns the elapsed seconds and the result of the call
+    """
+    starttime = time.time()
+    result = func(*args)
+    return (time.time() - starttime, result)
+
+def run(data, expected):
+    """ Time the encrypt and decrypt paths with the currently selected backend
+
+    :param data: document to encrypt
+    :type data: list.
+    :param expected: whole buffer pyaes encryption of the document
+    :type expected: bytes.
+    :returns: returns the encrypt and decrypt seconds
+    """
+    encryption = Encryption()
+    outfile = io.BytesIO()
+    (enctime, _) = timed(encryption.encrypt_json, data, outfile, KEY)
+    if outfile.getvalue() != expected:
+        raise AssertionError('encrypt_json output differs from pyaes')
+
+    (dectime, result) = timed(encryption.decrypt_json, io.BytesIO(expected), KEY)
+    if result != data:
+        raise AssertionError('decrypt_json output differs from the document')
+
+    return (enctime, dectime)
+
+def oldencrypt(data):
+    """ Previous save path, encoding and encrypting the whole document at once
+
+    :param data: document to encrypt
+    :type data: list.
+    :returns: returns the encrypted document
+    """
+    return pyaes.AESModeOfOperationCTR(KEY.encode('utf8')).encrypt(json.dumps(data))
+
+def olddecrypt(content):
+    """ Previous load path, decrypting the whole file, validating it and parsing it
+
+    :param content: encrypted document
+    :type content: bytes.
+    :returns: returns the parsed document
+    """
+    decrypted = pyaes.AESModeOfOperationCTR(KEY.encode('utf8')).decrypt(content)
+    json.loads(decrypted)
+    return json.loads(decrypted)
+
+def main(megabytes):
+    """ Run the benchmark
+
+    :param megabytes: size of the document in megabytes
+    :type megabytes: float.
+    """
+    data = document(int(megabytes * 1024 * 1024))
+    plain = json.dumps(data).encode('utf8')
+    expected = pyaes.AESModeOfOperationCTR(KEY.encode('utf8')).encrypt(plain)
+
+    sys.stdout.write('document: %.1f MB\n\n' % (len(plain) / 1024.0 / 1024.0))
+    sys.stdout.write('%-14s %10s %15s\n' % ('backend', 'encrypt', 'decrypt+parse'))
+
+    native = rdmc_helper.Cipher
+    if native is not None:
+        sys.stdout.write('%-14s %9.2fs %14.2fs\n' % (('cryptography',) + run(data, expected)))
+
+    rdmc_helper.Cipher = None
+    try:
+        sys.stdout.write('%-14s %9.2fs %14.2fs\n' % (('pyaes',) + run(data, expected)))
+    finally:
+        rdmc_helper.Cipher = native
+
+    sys.stdout.write('%-14s %9.2fs %14.2fs\n' % ('old path', timed(oldencrypt, data)[0], \
+                                                        timed(olddecrypt, expected)[0]))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
@@ -0,0 +1,85 @@
+###
+# Copyright 2019 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+""" Cold start benchmark of the command manifest.
+
+Times 'ilorest --version' and 'ilorest rawget' (which fails without a session once the
+command is loaded) from a fresh cache directory, where every extension is imported and
+the manifest generated, and again once the manifest is in the cache. A manifest built
+by rdmc.build_manifest in src/extensions is used by both, remove it first.
+
+usage: python benchmarks/cold_start.py [RUNS]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+#main script of the tool
+RDMC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src', 'rdmc.py')
+#commands timed
+COMMANDS = [['--version'], ['rawget', '/redfish/v1']]
+
+def timerun(args, cachedir):
+    """ Time a single run of the tool
+
+    :param args: command line arguments
+    :type args: list.
+    :param cachedir: cache directory passed to the tool
+    :type cachedir: str.
+    :returns: returns the elapsed seconds
+    """
+    starttime = time.time()
+    with open(os.devnull, 'w') as devnull:
+        subprocess.call([sys.executable, RDMC, '--cache-dir', cachedir] + args, \
+                                                    stdout=devnull, stderr=devnull)
+    return time.time() - starttime
+
+def median(values):
+    """ Median of a list of values """
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def main(runs):
+    """ Run the benchmark
+
+    :param runs: runs of each command and state
+    :type runs: int.
+    """
+    if os.path.isfile(os.path.join(os.path.dirname(RDMC), 'extensions', 'manifest.json')):
+        sys.stderr.write('WARNING: a packaged manifest is present, both columns use it.\n')
+
+    sys.stdout.write('%-24s %12s %12s\n' % ('command', 'no manifest', 'manifest'))
+    for args in COMMANDS:
+        cold = []
+        warm = []
+        for _ in range(runs):
+            cachedir = tempfile.mkdtemp()
+            try:
+                cold.append(timerun(args, cachedir))
+                warm.append(timerun(args, cachedir))
+            finally:
+                shutil.rmtree(cachedir, ignore_errors=True)
+
+        sys.stdout.write('%-24s %11.3fs %11.3fs\n' % (' '.join(args), median(cold), \
+                                                                        median(warm)))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
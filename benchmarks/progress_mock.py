@@ -0,0 +1,215 @@
+###
+# Copyright 2019 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+""" Progress tracker benchmark against a local mock Redfish server.
+
+Runs rdmc_helper.ProgressTracker, as used by uploadcomp, firmwareupdate, flashfwpkg and
+taskqueue, against a small HTTP server whose UpdateService moves through a scripted list
+of states. Each scenario reports the final state, the time taken, the number of state
+requests and how long after each change the tracker noticed it.
+
+    sse        the EventService offers a server-sent event stream, changes wake the tracker
+    poll       no event stream, the state is polled with exponential backoff and jitter
+    flapping   the state keeps changing and never finishes, the deadline ends the wait
+
+usage: python benchmarks/progress_mock.py [SCENARIO ...]
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+
+from six.moves import socketserver
+from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from redfish.rest.v1 import RestClient
+
+from rdmc_helper import ProgressTracker
+
+#path of the mock server-sent event stream
+SSE_PATH = '/redfish/v1/EventService/SSE'
+#states of the UpdateService and the seconds spent in each, for every scenario
+SCENARIOS = {
+    'sse': ([('IDLE', 0.5), ('UPLOADING', 2), ('PROGRESSING', 3), ('COMPLETE', None)], True),
+    'poll': ([('IDLE', 0.5), ('UPLOADING', 2), ('PROGRESSING', 3), ('COMPLETE', None)], False),
+    'flapping': ([('UPLOADING', 0.3), ('PROGRESSING', 0.3)] * 50, False),
+}
+#seconds allowed for a scenario before the tracker gives up
+DEADLINE = 10
+
+class MockUpdateService(object):
+    """ UpdateService state which moves through scripted states on its own clock """
+    def __init__(self, steps, usesse):
+        self.steps = steps
+        self.usesse = usesse
+        self.starttime = time.time()
+        self.staterequests = 0
+        self.lock = threading.Lock()
+
+    def state(self):
+        """ Current state and the time it was entered
+
+        :returns: returns a (state, entered) tuple
+        """
+        entered = self.starttime
+        for state, duration in self.steps:
+            if duration is None or time.time() < entered + duration:
+                return state, entered
+            entered += duration
+        return self.steps[-1][0], entered
+
+class MockRedfishHandler(BaseHTTPRequestHandler):
+    """ Handler serving the UpdateService, the EventService and its event stream """
+    protocol_version = 'HTTP/1.0'
+
+    def log_message(self, *_):
+        """ Keep the benchmark output quiet """
+        pass
+
+    def sendjson(self, body):
+        """ Send a json response
+
+        :param body: response body
+        :type body: dict.
+        """
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        """ Serve a GET request """
+        service = self.server.service
+        path = self.path.rstrip('/')
+
+        if path == '/redfish/v1/UpdateService':
+            with service.lock:
+                service.staterequests += 1
+            self.sendjson({'Oem': {'Hpe': {'State': service.state()[0]}}})
+        elif path == '/redfish/v1/EventService':
+            self.sendjson({'ServerSentEventUri': SSE_PATH} if service.usesse else {})
+        elif path == SSE_PATH and service.usesse:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            self.streamevents(service)
+        else:
+            self.send_error(404)
+
+    def streamevents(self, service):
+        """ Send an event for every change of state until the client goes away
+
+        :param service: mock update service
+        :type service: MockUpdateService.
+        """
+        laststate = None
+        try:
+            while True:
+                state = service.state()[0]
+                if state != laststate:
+                    laststate = state
+                    event = json.dumps({'Events': [{'MessageArgs': [state]}]})
+                    self.wfile.write(('data: %s\n\n' % event).encode('utf-8'))
+                    self.wfile.flush()
+                time.sleep(0.05)
+        except Exception:
+            pass
+
+class MockRedfishServer(socketserver.ThreadingMixIn, HTTPServer):
+    """ Threaded server, the event stream holds its connection open """
+    daemon_threads = True
+    allow_reuse_address = True
+
+class MockApp(object):
+    """ The parts of RmcApp the progress tracker uses """
+    def __init__(self, client):
+        self.current_client = client
+
+    def get_handler(self, path, **_):
+        """ GET a path with the client """
+        return self.current_client.get(path)
+
+class MockRdmc(object):
+    """ The parts of RdmcCommand the progress tracker uses """
+    def __init__(self, client):
+        self.app = MockApp(client)
+
+def runscenario(name):
+    """ Run the progress tracker against one scenario
+
+    :param name: scenario name
+    :type name: str.
+    :returns: returns a dictionary of results
+    """
+    steps, usesse = SCENARIOS[name]
+    server = MockRedfishServer(('127.0.0.1', 0), MockRedfishHandler)
+    server.service = MockUpdateService(steps, usesse)
+    listener = threading.Thread(target=server.serve_forever)
+    listener.daemon = True
+    listener.start()
+
+    client = RestClient(base_url='http://127.0.0.1:%s' % server.server_address[1])
+    rdmc = MockRdmc(client)
+    latencies = []
+
+    def fetch():
+        """ Current state of the mock UpdateService """
+        return rdmc.app.get_handler('/redfish/v1/UpdateService').dict['Oem']['Hpe']['State']
+
+    def callback(state):
+        """ Record how long after the change the tracker noticed it """
+        current, entered = server.service.state()
+        if current == state:
+            latencies.append(time.time() - entered)
+
+    server.service.starttime = time.time()
+    tracker = ProgressTracker(rdmc, fetch, lambda state: state == 'COMPLETE', \
+                            callback=callback, usesse=usesse, \
+                            active=lambda state: state in ('UPLOADING', 'PROGRESSING'))
+    try:
+        state = tracker.wait(timeout=DEADLINE, deadline=DEADLINE)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {'scenario': name, 'state': state, \
+            'seconds': round(time.time() - server.service.starttime, 2), \
+            'staterequests': server.service.staterequests, \
+            'maxlatency': round(max(latencies), 2) if latencies else None}
+
+def main(names):
+    """ Run the scenarios and print a line of results for each
+
+    :param names: scenario names, every scenario if empty
+    :type names: list.
+    """
+    for name in names or sorted(SCENARIOS):
+        if name not in SCENARIOS:
+            sys.stderr.write('Unknown scenario %s, choose from %s.\n' % \
+                                                        (name, ', '.join(sorted(SCENARIOS))))
+            return 1
+        sys.stdout.write('%s\n' % json.dumps(runscenario(name), sort_keys=True))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,5 +1,7 @@
 # -*- mode: python -*-
 import os
+import sys
+import subprocess
 
 block_cipher = None
 
@@ -25,6 +27,13 @@ def hiddenImportGet():
 				classNames.append('extensions'+cn+'.'+name)
 	return classNames
 
+def buildManifest():
+	""" Write the command manifest shipped with the extensions """
+	subprocess.check_call([sys.executable, '-c', 'import sys, rdmc; '\
+			'sys.exit(not rdmc.build_manifest())'], cwd=os.path.join(os.getcwd(), 'src'))
+
+buildManifest()
+
 a = Analysis(['.//src//rdmc.py'],
              pathex=[],
              binaries=None,
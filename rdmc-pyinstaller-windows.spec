@@ -2,6 +2,7 @@
 import os
 import sys
 import compileall
+import subprocess
 
 block_cipher = None
 
@@ -41,8 +42,16 @@ def getData():
 		for dir in dirs:
 			tempstr = cwd.split('\\src\\')[-1]+'\\'+dir+'\\'
 			datalist.append(('.\\src\\' + tempstr + '*.pyc', tempstr))
+	datalist.append(('.\\src\\extensions\\manifest.json', 'extensions'))
 	return datalist
 
+def buildManifest():
+	""" Write the command manifest shipped with the extensions """
+	subprocess.check_call([sys.executable, '-c', 'import sys, rdmc; '\
+			'sys.exit(not rdmc.build_manifest())'], cwd=os.path.join(os.getcwd(), 'src'))
+
+buildManifest()
+
 compileall.compile_dir('.', force=True, quiet=True)
 
 a = Analysis(['.\\src\\rdmc.py'],
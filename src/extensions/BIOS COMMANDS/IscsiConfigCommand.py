@@ -27,7 +27,8 @@ import redfish.ris
 
 from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, InvalidCommandLineErrorOPTS, \
-                NicMissingOrConfigurationError, BootOrderMissingEntriesError, Encryption
+                NicMissingOrConfigurationError, BootOrderMissingEntriesError, Encryption, \
+                InstanceIndex
 
 class IscsiConfigCommand(RdmcCommandBase):
     """ Changes the iscsi configuration for the server that is currently logged in """
@@ -332,8 +333,8 @@ class IscsiConfigCommand(RdmcCommandBase):
         else:
             self.selobj.selectfunction(["Collection."])
             pcideviceslist = next(iter(self.getobj.getworkerfunction("Items", options, \
-                            results=True, uselist=False, filtervals=("MemberType", \
-                                                        "HpServerPciDevice.*"))), None)["Items"]
+                            results=True, uselist=False, filtervals=InstanceIndex.parse(\
+                                        ["MemberType=HpServerPciDevice*"]))), None)["Items"]
 
         self.selobj.selectfunction("HpiSCSISoftwareInitiator.")
         iscsibootsources = self.rawdatahandler(action="GET", silent=True, \
@@ -415,8 +416,8 @@ class IscsiConfigCommand(RdmcCommandBase):
         else:
             self.selobj.selectfunction(["Collection."])
             pcideviceslist = next(iter(self.getobj.getworkerfunction("Items", options, \
-                            results=True, uselist=False, filtervals=("MemberType", \
-                                                        "HpServerPciDevice.*"))), None)["Items"]
+                            results=True, uselist=False, filtervals=InstanceIndex.parse(\
+                                        ["MemberType=HpServerPciDevice*"]))), None)["Items"]
 
         self.selobj.selectfunction(\
                                self.typepath.defs.hpiscsisoftwareinitiatortype)
@@ -521,8 +522,8 @@ class IscsiConfigCommand(RdmcCommandBase):
             else:
                 self.selobj.selectfunction(["Collection."])
                 pcideviceslist = next(iter(self.getobj.getworkerfunction("Items", \
-                       options, results=True, uselist=False, filtervals=("MemberType", \
-                                                            "HpServerPciDevice.*"))), None)["Items"]
+                       options, results=True, uselist=False, filtervals=InstanceIndex.parse(\
+                                        ["MemberType=HpServerPciDevice*"]))), None)["Items"]
         try:
             self.rawdatahandler(action="GET", silent=True, \
                             jsonflag=True, path=iscsipath)['iSCSINicSources']
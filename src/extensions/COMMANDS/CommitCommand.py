@@ -18,14 +18,31 @@
 """ Commit Command for RDMC """
 
 import sys
+import copy
 
 from argparse import ArgumentParser, SUPPRESS
+from multiprocessing.dummy import Pool as ThreadPool
 
-from redfish.ris.rmc_helper import NothingSelectedError
+import jsonpatch
+import jsonpointer
+
+from redfish.ris.rmc import validate_headers
+from redfish.ris.utils import merge_dict
+from redfish.ris.resp_handler import ResponseHandler
+from redfish.ris.ris import SessionExpired
+from redfish.ris.rmc_helper import NothingSelectedError, IloResponseError
 
 from rdmc_base_classes import RdmcCommandBase
 from rdmc_helper import ReturnCodes, InvalidCommandLineErrorOPTS, FailureDuringCommitError,\
-                        NoChangesFoundOrMadeError, NoCurrentSessionEstablished
+                        NoChangesFoundOrMadeError, NoCurrentSessionEstablished, StreamingRequest
+
+#maximum number of PATCH requests sent at once during a commit
+MAX_COMMIT_WORKERS = 4
+#types committed after all other resources, one type at a time in this order. Account
+#policy is applied before the accounts it governs and network settings, which can
+#interrupt the session, are sent last.
+ORDERED_COMMIT_TYPES = ['AccountService', 'ManagerAccount', 'ManagerNetworkService', \
+                        'EthernetInterface', 'EthernetNetworkInterface']
 
 class CommitCommand(RdmcCommandBase):
     """ Constructor """
@@ -62,12 +79,37 @@ class CommitCommand(RdmcCommandBase):
                 self._rdmc.app.current_client.bios_password = options.biospassword
         try:
             failure = False
-            commit_opp = self._rdmc.app.commit()
-            for path in commit_opp:
-                if self._rdmc.opts.verbose:
-                    sys.stdout.write('Changes are being made to path: %s\n' % path)
-                if commit_opp.next():
-                    failure = True
+            if (self._rdmc.app.getiloversion(skipschemas=True) or 0) <= 5.130:
+                #without If-Match support the etag of every instance is checked before
+                #it is patched, which the redfish library commit does one at a time
+                commit_opp = self._rdmc.app.commit()
+                for path in commit_opp:
+                    if self._rdmc.opts.verbose:
+                        sys.stdout.write('Changes are being made to path: %s\n' % path)
+                    if commit_opp.next():
+                        failure = True
+            else:
+                for stage in self.commitstages(self.commitrequests()):
+                    #every response of a stage is applied before an error stops the commit,
+                    #so the PATCHes which succeeded are not sent again by a later commit
+                    errors = list()
+                    for path, result in zip([request[0] for request in stage], \
+                                                                    self.patchstage(stage)):
+                        if self._rdmc.opts.verbose:
+                            sys.stdout.write('Changes are being made to path: %s\n' % path)
+                        try:
+                            if self.commitresult(path, result):
+                                failure = True
+                        except Exception as excp:
+                            errors.append(excp)
+
+                    for excp in errors:
+                        if isinstance(excp, SessionExpired):
+                            raise excp
+                    if errors:
+                        raise FailureDuringCommitError('One or more types failed to commit: '\
+                                               '%s. Run the status command to see uncommitted '\
+                                               'data.' % errors[0])
         except NothingSelectedError:
             raise NoChangesFoundOrMadeError("No changes found or made during commit operation.")
         else:
@@ -77,10 +119,151 @@ class CommitCommand(RdmcCommandBase):
                                                'if you wish to discard failed changes refresh the '\
                                                'type using select with the --refresh flag.')
 
-        if options.reboot:
+        if options and options.reboot:
             self.rebootobj.run(options.reboot)
             self.logoutobj.run("")
 
+    def commitrequests(self):
+        """ Build the PATCH request of every instance with pending changes. All patches
+        of an instance are merged into a single payload, as done by the redfish
+        library commit, and sent with the etag of the instance in If-Match.
+
+        :returns: returns a list of (path, type, payload, headers) tuples
+        """
+        app = self._rdmc.app
+        instances = [inst for inst in app.monolith.iter() if inst.patches]
+
+        if not instances:
+            raise NothingSelectedError()
+
+        requests = list()
+
+        for instance in instances:
+            if validate_headers(instance, verbose=app.verbose):
+                continue
+
+            payload = dict()
+            for patches in instance.patches:
+                fulldict = jsonpatch.apply_patch(instance.resp.dict, patches)
+                for patch in patches:
+                    merge_dict(payload, self.patchpayload(fulldict, patch["path"]))
+
+            if payload:
+                path = instance.resp.request.path
+                headers = dict([('If-Match', app.monolith.paths[path].etag)])
+                requests.append((path, instance.maj_type, payload, headers))
+
+        return requests
+
+    @staticmethod
+    def patchpayload(fulldict, patchpath):
+        """ Payload for a single json patch: the first list or non dictionary value
+        along the patch path, nested in its parent keys
+
+        :param fulldict: resource dictionary with the patches applied
+        :type fulldict: dict.
+        :param patchpath: json pointer of the patch
+        :type patchpath: str.
+        :returns: returns the payload dictionary
+        """
+        pointer = jsonpointer.JsonPointer(patchpath)
+        payload = fulldict
+        depth = 0
+
+        for part in pointer.parts:
+            payload = pointer.walk(payload, part)
+            depth += 1
+            if not isinstance(payload, dict):
+                break
+
+        payload = copy.deepcopy(payload)
+        for part in reversed(pointer.parts[:depth]):
+            payload = {part: payload}
+
+        return payload
+
+    @staticmethod
+    def commitstages(requests):
+        """ Split commit requests into stages which are sent one after another. The
+        first stage holds every independent resource, followed by a stage for each
+        of the ORDERED_COMMIT_TYPES.
+
+        :param requests: list of requests from commitrequests
+        :type requests: list.
+        :returns: returns a list of non empty request lists
+        """
+        ordered = [_type.lower() for _type in ORDERED_COMMIT_TYPES]
+        stages = [list() for _ in range(len(ordered) + 1)]
+
+        for request in requests:
+            family = (request[1] or '').lstrip('#').split('.')[0].lower()
+            stages[ordered.index(family) + 1 if family in ordered else 0].append(request)
+
+        return [stage for stage in stages if stage]
+
+    def patchstage(self, requests):
+        """ Send the PATCH requests of a stage concurrently, at most MAX_COMMIT_WORKERS
+        at a time. Only the requests are sent from the pool, the monolith is updated with
+        the responses by commitresult on the calling thread. In-band (blobstore) clients
+        share a single channel, so their requests are sent one at a time.
+
+        :param requests: list of requests from commitrequests
+        :type requests: list.
+        :returns: returns the response, or the raised exception, of each request in order
+        """
+        client = self._rdmc.app.current_client
+
+        def patch(request):
+            """ Send a single PATCH request """
+            (path, _, payload, headers) = request
+            try:
+                return client.patch(path, body=payload, headers=headers)
+            except Exception as excp:
+                return excp
+
+        if len(requests) == 1 or not StreamingRequest.available(client):
+            return [patch(request) for request in requests]
+
+        pool = ThreadPool(min(MAX_COMMIT_WORKERS, len(requests)))
+        try:
+            return pool.map(patch, requests)
+        finally:
+            pool.close()
+            pool.join()
+
+    def commitresult(self, path, result):
+        """ Update the monolith with the response of a PATCH request and report it, as
+        the redfish library patch handler does
+
+        :param path: path the PATCH request was sent to
+        :type path: str.
+        :param result: response or exception returned by patchstage
+        :type result: RestResponse.
+        :returns: returns True if the PATCH failed
+        """
+        if isinstance(result, Exception):
+            raise result
+        elif result.status == 401:
+            raise SessionExpired()
+
+        monolith = self._rdmc.app.monolith
+        if result.status in (200, 201) and path in monolith.paths:
+            #the instance is reloaded the next time it is selected
+            monolith.paths[path].modified = True
+            monolith.paths[path].patches = []
+        elif result.status == 412:
+            #the etag is out of date, refresh the instance
+            self._rdmc.app.get_handler(path, silent=True)
+
+        try:
+            ResponseHandler(self._rdmc.app.validationmanager, \
+                            self._rdmc.app.typepath.defs.messageregistrytype).\
+                            output_resp(result, dl_reg=False, print_code=self._rdmc.app.verbose)
+        except IloResponseError:
+            return True
+
+        return False
+
     def run(self, line):
         """ Wrapper function for commit main function
 
@@ -26,7 +26,7 @@ import redfish.ris
 
 from rdmc_base_classes import RdmcCommandBase, HARDCODEDLIST, add_login_arguments_group
 from rdmc_helper import ReturnCodes, InvalidCommandLineErrorOPTS, UI, Encryption, \
-                    NoContentsFoundForOperationError, InvalidCommandLineError
+                    NoContentsFoundForOperationError, InstanceIndex
 
 class GetCommand(RdmcCommandBase):
     """ Constructor """
@@ -65,20 +65,7 @@ class GetCommand(RdmcCommandBase):
 
         self.getvalidation(options)
 
-        filtr = (None, None)
-
-        if options.filter:
-            try:
-                if (str(options.filter)[0] == str(options.filter)[-1])\
-                        and str(options.filter).startswith(("'", '"')):
-                    options.filter = options.filter[1:-1]
-
-                (sel, val) = options.filter.split('=')
-                filtr = (sel.strip(), val.strip())
-
-            except:
-                raise InvalidCommandLineError("Invalid filter" \
-                  " parameter format [filter_attribute]=[filter_value]")
+        filtr = InstanceIndex.parse(options.filter)
 
         self.getworkerfunction(args, options, results=None, uselist=True, filtervals=filtr,\
                                readonly=options.noreadonly)
@@ -86,7 +73,7 @@ class GetCommand(RdmcCommandBase):
         #Return code
         return ReturnCodes.SUCCESS
 
-    def getworkerfunction(self, args, options, readonly=False, filtervals=(None, None),\
+    def getworkerfunction(self, args, options, readonly=False, filtervals=None,\
                                 results=None, uselist=False):
         """ main get worker function
 
@@ -98,8 +85,9 @@ class GetCommand(RdmcCommandBase):
         :type line: string.
         :param readonly: remove readonly properties
         :type readonly: bool
-        :param filtervals: filter key value pair (Key,Val)
-        :type filtervals: tuple
+        :param filtervals: filters as (Key, Operator, Val) tuples, combined with AND, or a
+                           single (Key, Val) tuple
+        :type filtervals: list
         :param results: current results collected
         :type results: string.
         :param uselist: use reserved properties list to filter results
@@ -115,9 +103,14 @@ class GetCommand(RdmcCommandBase):
         args = ["Attributes/"+arg if self._rdmc.app.selector.lower().\
                 startswith('bios.') and 'attributes' not in arg.lower() else arg \
                                                 for arg in args] if args else args
-        if filtervals[0]:
-            instances = self._rdmc.app.select(selector=self._rdmc.app.selector, \
-                                                                    fltrvals=filtervals)
+        if isinstance(filtervals, tuple):
+            #single (Key, Val) filter, as accepted by app.select, where a trailing .* is
+            #the prefix match of the = operator
+            (key, val) = filtervals
+            filtervals = [(key, '=', val[:-2] + '*' if val.endswith('.*') else val)]
+        if filtervals:
+            instances = self._rdmc.instanceindex.select(self._rdmc.app, \
+                                                    self._rdmc.app.selector, filtervals)
 
         try:
             contents = self._rdmc.app.getprops(props=args, remread=readonly, nocontent=nocontent, \
@@ -137,7 +130,9 @@ class GetCommand(RdmcCommandBase):
             return contents
 
         contents = contents[0] if len(contents) == 1 else contents
-        if options and options.json and contents:
+        if options and options.jsonlines and contents:
+            UI().print_out_json_lines(contents)
+        elif options and options.json and contents:
             UI().print_out_json(contents)
         elif contents:
             UI().print_out_human_readable(contents)
@@ -280,7 +275,10 @@ class GetCommand(RdmcCommandBase):
             " objects that are all of that type. If you want to modify"\
             " the properties of only one of those objects, use the filter"\
             " flag to narrow down results based on properties."\
+            " The flag can be repeated to combine filters, and >=, <=, > and <"\
+            " match ranges of values. A trailing * matches values by prefix."\
             "\t\t\t\t\t Usage: --filter [ATTRIBUTE]=[VALUE]",
+            action='append',
             default=None,
         )
         customparser.add_argument(
@@ -293,6 +291,15 @@ class GetCommand(RdmcCommandBase):
             " structure makes the information easier to parse.",
             default=False
         )
+        customparser.add_argument(
+            '--jsonlines',
+            dest='jsonlines',
+            action="store_true",
+            help="Optionally include this flag to display the output as JSON Lines, one"\
+            " compact JSON document per instance. Each line can be parsed on its own,"\
+            " which suits large results and line based tools.",
+            default=False
+        )
         customparser.add_argument(
             '--logout',
             dest='logout',
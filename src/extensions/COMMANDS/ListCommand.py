@@ -22,8 +22,7 @@ from argparse import ArgumentParser
 import redfish.ris
 
 from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
-from rdmc_helper import ReturnCodes, InvalidCommandLineErrorOPTS, InvalidCommandLineError, \
-                        Encryption
+from rdmc_helper import ReturnCodes, InvalidCommandLineErrorOPTS, Encryption, InstanceIndex
 
 class ListCommand(RdmcCommandBase):
     """ Constructor """
@@ -62,19 +61,7 @@ class ListCommand(RdmcCommandBase):
 
         self.listvalidation(options)
 
-        fvals = (None, None)
-
-        if options.filter:
-            try:
-                if (str(options.filter)[0] == str(options.filter)[-1])\
-                        and str(options.filter).startswith(("'", '"')):
-                    options.filter = options.filter[1:-1]
-
-                (sel, val) = options.filter.split('=')
-                fvals = (sel.strip(), val.strip())
-            except:
-                raise InvalidCommandLineError("Invalid filter" \
-                  " parameter format [filter_attribute]=[filter_value]")
+        fvals = InstanceIndex.parse(options.filter)
 
         self.getobj.getworkerfunction(args, options, filtervals=fvals, uselist=False)
 
@@ -182,7 +169,10 @@ class ListCommand(RdmcCommandBase):
             " objects that are all of that type. If you want to modify"\
             " the properties of only one of those objects, use the filter"\
             " flag to narrow down results based on properties."\
+            " The flag can be repeated to combine filters, and >=, <=, > and <"\
+            " match ranges of values. A trailing * matches values by prefix."\
             "\t\t\t\t\t Usage: --filter [ATTRIBUTE]=[VALUE]",
+            action='append',
             default=None,
         )
         customparser.add_argument(
@@ -195,6 +185,15 @@ class ListCommand(RdmcCommandBase):
             " structure makes the information easier to parse.",
             default=False
         )
+        customparser.add_argument(
+            '--jsonlines',
+            dest='jsonlines',
+            action="store_true",
+            help="Optionally include this flag to display the output as JSON Lines, one"\
+            " compact JSON document per instance. Each line can be parsed on its own,"\
+            " which suits large results and line based tools.",
+            default=False
+        )
         customparser.add_argument(
             '--logout',
             dest='logout',
@@ -21,12 +21,12 @@ import os
 import sys
 import json
 import shlex
-import subprocess
+import hashlib
+import threading
 
 from datetime import datetime
 from argparse import ArgumentParser
-
-from six.moves import queue
+from collections import OrderedDict
 
 import redfish.ris
 
@@ -35,15 +35,24 @@ from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                     InvalidCommandLineErrorOPTS, InvalidFileFormattingError, \
                     NoChangesFoundOrMadeError, InvalidFileInputError, \
                     NoDifferencesFoundError, MultipleServerConfigError, \
-                    InvalidMSCfileInputError, Encryption
+                    InvalidMSCfileInputError, Encryption, ServerPool
 
-from rdmc_base_classes import RdmcCommandBase, HARDCODEDLIST, add_login_arguments_group
+from rdmc_base_classes import RdmcCommandBase, HARDCODEDLIST, add_login_arguments_group, \
+                        add_multiserver_arguments_group
 
 #default file name
 __filename__ = 'ilorest.json'
+#number of parsed load files kept for reuse by the sessions of this process
+MAX_LOAD_PLANS = 4
 
 class LoadCommand(RdmcCommandBase):
     """ Constructor """
+    # parsed load files shared by every session of this process, least recently used first
+    loadplans = OrderedDict()
+    loadplanslock = threading.Lock()
+    # per file locks, so a file loaded by several sessions at once is only parsed once
+    loadplanlocks = dict()
+
     def __init__(self, rdmcObj):
         RdmcCommandBase.__init__(self,\
             name='load',\
@@ -63,7 +72,6 @@ class LoadCommand(RdmcCommandBase):
         self.definearguments(self.parser)
         self.filenames = None
         self.mpfilename = None
-        self.queue = queue.Queue()
         self._rdmc = rdmcObj
         self.lobobj = rdmcObj.commands_dict["LoginCommand"](rdmcObj)
         self.selobj = rdmcObj.commands_dict["SelectCommand"](rdmcObj)
@@ -96,23 +104,7 @@ class LoadCommand(RdmcCommandBase):
             sys.stdout.write("Loading configuration...\n")
 
         for files in self.filenames:
-            if not os.path.isfile(files):
-                raise InvalidFileInputError("File '%s' doesn't exist. Please " \
-                                "create file by running save command." % files)
-            if options.encryption:
-                with open(files, "rb") as myfile:
-                    data = myfile.read()
-                    data = Encryption().decrypt_file(data, \
-                                                        options.encryption)
-            else:
-                with open(files, "r") as myfile:
-                    data = myfile.read()
-
-            try:
-                loadcontents = json.loads(data)
-            except:
-                raise InvalidFileFormattingError("Invalid file formatting " \
-                                                    "found in file %s" % files)
+            loadplan = self.getloadplan(files, options.encryption)
 
             if options.mpfilename:
                 mfile = options.mpfilename
@@ -122,7 +114,7 @@ class LoadCommand(RdmcCommandBase):
                     outputdir = options.outdirectory
 
                 if self.runmpfunc(mpfile=mfile, lfile=files, \
-                                                        outputdir=outputdir):
+                                        outputdir=outputdir, options=options):
                     return ReturnCodes.SUCCESS
                 else:
                     raise MultipleServerConfigError("One or more servers "\
@@ -131,38 +123,34 @@ class LoadCommand(RdmcCommandBase):
             results = False
             validation_errs = []
 
-            for loadcontent in loadcontents:
-                for content, loaddict in loadcontent.items():
-                    inputlist = list()
+            for content, loaditems in loadplan:
+                inputlist = list()
 
-                    if content == "Comments":
-                        continue
+                inputlist.append(content)
+                if options.biospassword:
+                    inputlist.extend(["--biospassword", options.biospassword])
+
+                self.selobj.selectfunction(inputlist)
+                if self._rdmc.app.selector.lower() not in content.lower():
+                    raise InvalidCommandLineError("Selector not found.\n")
 
-                    inputlist.append(content)
-                    if options.biospassword:
-                        inputlist.extend(["--biospassword", options.biospassword])
-
-                    self.selobj.selectfunction(inputlist)
-                    if self._rdmc.app.selector.lower() not in content.lower():
-                        raise InvalidCommandLineError("Selector not found.\n")
-
-                    try:
-                        for _, items in loaddict.items():
-                            try:
-                                if self._rdmc.app.loadset(seldict=items, \
-                                      latestschema=options.latestschema, \
-                                      uniqueoverride=options.uniqueoverride):
-                                    results = True
-                            except LoadSkipSettingError as excp:
-                                returnvalue = True
+                try:
+                    for items in loaditems:
+                        try:
+                            if self._rdmc.app.loadset(seldict=items, \
+                                  latestschema=options.latestschema, \
+                                  uniqueoverride=options.uniqueoverride):
                                 results = True
-                            except:
-                                raise
-                    except redfish.ris.ValidationError as excp:
-                        errs = excp.get_errors()
-                        validation_errs.append({self._rdmc.app.selector: errs})
-                    except:
-                        raise
+                        except LoadSkipSettingError as excp:
+                            returnvalue = True
+                            results = True
+                        except:
+                            raise
+                except redfish.ris.ValidationError as excp:
+                    errs = excp.get_errors()
+                    validation_errs.append({self._rdmc.app.selector: errs})
+                except:
+                    raise
 
             try:
                 if results:
@@ -199,6 +187,85 @@ class LoadCommand(RdmcCommandBase):
 
         return ReturnCodes.SUCCESS
 
+    def getloadplan(self, filename, key=None):
+        """ Read, decrypt and validate a load file into a list of (selector, [properties])
+        entries. Plans are cached per file so servers loaded from the same file in this
+        process share a single parsed copy. The key is only kept as a SHA-256 digest.
+
+        :param filename: load file name
+        :type filename: string.
+        :param key: encryption key of the file
+        :type key: string.
+        :returns: returns the load plan
+        """
+        if not os.path.isfile(filename):
+            raise InvalidFileInputError("File '%s' doesn't exist. Please " \
+                            "create file by running save command." % filename)
+
+        path = os.path.abspath(filename)
+        with LoadCommand.loadplanslock:
+            filelock = LoadCommand.loadplanlocks.setdefault(path, threading.Lock())
+
+        with filelock:
+            keydigest = None
+            if key:
+                keydigest = hashlib.sha256(key if isinstance(key, bytes) else \
+                                                            key.encode('utf-8')).hexdigest()
+            fileinfo = os.stat(filename)
+            stamp = (fileinfo.st_mtime, fileinfo.st_size, keydigest)
+
+            with LoadCommand.loadplanslock:
+                cached = LoadCommand.loadplans.pop(path, None)
+                if cached and cached[0] == stamp:
+                    LoadCommand.loadplans[path] = cached
+                    return cached[1]
+
+            loadplan = self.parseloadfile(filename, key)
+
+            with LoadCommand.loadplanslock:
+                LoadCommand.loadplans[path] = (stamp, loadplan)
+                while len(LoadCommand.loadplans) > MAX_LOAD_PLANS:
+                    LoadCommand.loadplans.popitem(last=False)
+
+        return loadplan
+
+    @staticmethod
+    def parseloadfile(filename, key=None):
+        """ Read, decrypt and validate a load file, either a json list or the JSON Lines
+        written by save --jsonlines
+
+        :param filename: load file name
+        :type filename: string.
+        :param key: encryption key of the file
+        :type key: string.
+        :returns: returns the load plan
+        """
+        if key:
+            with open(filename, "rb") as myfile:
+                loadcontents = Encryption().decrypt_json(myfile, key)
+        else:
+            with open(filename, "r") as myfile:
+                loadcontents = myfile.read()
+
+        try:
+            if not key:
+                try:
+                    loadcontents = json.loads(loadcontents)
+                except ValueError:
+                    loadcontents = [json.loads(line) for line in loadcontents.splitlines() \
+                                                                            if line.strip()]
+            loadplan = []
+            for loadcontent in loadcontents:
+                for content, loaddict in loadcontent.items():
+                    if content == "Comments":
+                        continue
+                    loadplan.append((content, [items for _, items in loaddict.items()]))
+        except:
+            raise InvalidFileFormattingError("Invalid file formatting " \
+                                                "found in file %s" % filename)
+
+        return loadplan
+
     def loadvalidation(self, options):
         """ Load method validation function
 
@@ -298,7 +365,7 @@ class LoadCommand(RdmcCommandBase):
 
         return contents
 
-    def runmpfunc(self, mpfile=None, lfile=None, outputdir=None):
+    def runmpfunc(self, mpfile=None, lfile=None, outputdir=None, options=None):
         """ Main worker function for multi file command
 
         :param mpfile: configuration file
@@ -307,14 +374,16 @@ class LoadCommand(RdmcCommandBase):
         :type lfile: string.
         :param outputdir: custom output directory
         :type outputdir: string.
+        :param options: command line options
+        :type options: list.
         """
         self.logoutobj.run("")
-        data = self.validatempfile(mpfile=mpfile, lfile=lfile)
+        data = self.validatempfile(mpfile=mpfile, lfile=lfile, \
+                                   key=options.encryption if options else None)
 
         if not data:
             return False
 
-        processes = []
         finalreturncode = True
         outputform = '%Y-%m-%d-%H-%M-%S'
 
@@ -334,63 +403,52 @@ class LoadCommand(RdmcCommandBase):
         createdir = os.path.join(dirpath, dirname)
         os.mkdir(createdir)
 
-        oofile = open(os.path.join(createdir, 'CompleteOutputfile.txt'), 'w+')
-        sys.stdout.write('Create multiple processes to load configuration '\
-                                            'concurrently to all servers...\n')
-
-        while True:
-            if not self.queue.empty():
-                line = self.queue.get()
-            else:
-                break
-
-            finput = '\n'+ 'Output for '+ line[line.index('--url')+1]+': \n\n'
+        jobs = []
+        for line in data:
             urlvar = line[line.index('--url')+1]
-            listargforsubprocess = [sys.executable] + line
-
-            if os.name is not 'nt':
-                listargforsubprocess = " ".join(listargforsubprocess)
-
             urlfilename = urlvar.split('//')[-1]
-            logfile = open(os.path.join(createdir, urlfilename+".txt"), "w+")
-            pinput = subprocess.Popen(listargforsubprocess, shell=True,\
-                                                stdout=logfile, stderr=logfile)
+            jobs.append((urlfilename, line, os.path.join(createdir, urlfilename+".txt")))
 
-            processes.append((pinput, finput, urlfilename, logfile))
+        pool = ServerPool(self._rdmc, workers=options.workers if options else 10, \
+                          timeout=options.servertimeout if options else None, \
+                          retries=options.retries if options else 0)
 
-        for pinput, finput, urlfilename, logfile in processes:
-            pinput.wait()
-            returncode = pinput.returncode
-            finalreturncode = finalreturncode and not returncode
+        sys.stdout.write('Loading configuration concurrently to all servers...\n')
 
-            logfile.close()
-            logfile = open(os.path.join(createdir, urlfilename+".txt"), "r+")
-            oofile.write(finput + str(logfile.read()))
-            oofile.write('-x+x-'*16)
-            logfile.close()
+        with open(os.path.join(createdir, 'CompleteOutputfile.txt'), 'w+') as oofile:
+            for urlfilename, line, logpath, returncode in pool.run(jobs):
+                finalreturncode = finalreturncode and not returncode
 
-            if returncode == 0:
-                sys.stdout.write('Loading Configuration for {} : SUCCESS\n'.format(urlfilename))
-            else:
-                sys.stdout.write('Loading Configuration for {} : FAILED\n'.format(urlfilename))
-                sys.stderr.write('ILOREST return code : {}.\nFor more '\
-                         'details please check {}.txt under {} directory.\n'\
-                                        .format(returncode, urlfilename, createdir))
+                with open(logpath, "r") as logfile:
+                    oofile.write('\n' + 'Output for ' + line[line.index('--url')+1] + \
+                                                            ': \n\n' + str(logfile.read()))
+                oofile.write('-x+x-'*16)
+                oofile.flush()
 
-        oofile.close()
+                if returncode == 0:
+                    sys.stdout.write('Loading Configuration for {} : SUCCESS\n'.format(\
+                                                                            urlfilename))
+                else:
+                    sys.stdout.write('Loading Configuration for {} : FAILED\n'.format(\
+                                                                            urlfilename))
+                    sys.stderr.write('ILOREST return code : {}.\nFor more '\
+                             'details please check {}.txt under {} directory.\n'\
+                                            .format(returncode, urlfilename, createdir))
 
         if finalreturncode:
             sys.stdout.write('All servers have been successfully configured.\n')
 
         return finalreturncode
 
-    def validatempfile(self, mpfile=None, lfile=None):
+    def validatempfile(self, mpfile=None, lfile=None, key=None):
         """ Validate temporary file
 
         :param mpfile: configuration file
         :type mpfile: string.
         :param lfile: custom file name
         :type lfile: string.
+        :param key: encryption key of the custom file
+        :type key: string.
         """
         sys.stdout.write('Checking given server information...\n')
 
@@ -406,6 +464,8 @@ class LoadCommand(RdmcCommandBase):
                 data = list()
                 cmdtorun = ['load']
                 cmdargs = ['-f', str(lfile)]
+                if key:
+                    cmdargs.extend(['--encryption', key])
                 globalargs = ['-v', '--nocache']
 
                 while True:
@@ -425,8 +485,6 @@ class LoadCommand(RdmcCommandBase):
                                             'contents of the %s file' %mpfile)
                     else:
                         linelist = globalargs + cmdtorun + args + cmdargs
-                        line = str(line).replace("\n", "")
-                        self.queue.put(linelist)
                         data.append(linelist)
         except Exception as excp:
             raise excp
@@ -446,6 +504,7 @@ class LoadCommand(RdmcCommandBase):
             return
 
         add_login_arguments_group(customparser)
+        add_multiserver_arguments_group(customparser)
 
         customparser.add_argument(
             '--logout',
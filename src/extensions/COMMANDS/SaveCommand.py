@@ -17,6 +17,7 @@
 # -*- coding: utf-8 -*-
 """ Save Command for RDMC """
 
+import os
 import sys
 import json
 
@@ -25,9 +26,12 @@ from collections import OrderedDict
 
 import redfish.ris
 
-from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
+from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group, \
+                            add_multiserver_arguments_group
 from rdmc_helper import ReturnCodes, InvalidCommandLineErrorOPTS, InvalidFileInputError, \
-                            InvalidCommandLineError, InvalidFileFormattingError, Encryption
+                            InvalidCommandLineError, InvalidFileFormattingError, Encryption, \
+                            MultipleServerConfigError, ServerPool, \
+                            UI, InstanceIndex
 
 #default file name
 __filename__ = 'ilorest.json'
@@ -41,7 +45,11 @@ class SaveCommand(RdmcCommandBase):
             '\n\texample: save --selector HpBios.\n\n\tChange the default ' \
             'output filename\n\texample: save --selector HpBios. -f ' \
             'output.json\n\n\tTo save multiple types in one file\n\texample: '\
-            'save --multisave Bios.,ComputerSystem.',\
+            'save --multisave Bios.,ComputerSystem.\n\n\tSave the configuration of ' \
+            'multiple servers,\n\tone file per server plus a manifest.json\n\texample: ' \
+            'save --selector Bios. --mpfile mpfilename.txt -o outputdirectory\n\n\tNote: ' \
+            'multiple server file format (1 server per new line)\n\t--url <iLO url/' \
+            'hostname> -u admin -p password\n\t--url <iLO url/hostname> -u admin -p password',\
             summary="Saves the selected type's settings to a file.",\
             aliases=[],\
             argparser=ArgumentParser())
@@ -67,27 +75,21 @@ class SaveCommand(RdmcCommandBase):
             else:
                 raise InvalidCommandLineErrorOPTS("")
 
-        self.savevalidation(options)
-
         if args:
             raise InvalidCommandLineError('Save command takes no arguments.')
 
+        if options.mpfilename:
+            sys.stdout.write("Saving configuration for multiple servers...\n")
+            if self.savempfunc(options):
+                return ReturnCodes.SUCCESS
+            raise MultipleServerConfigError("One or more servers failed to save configuration.")
+
+        self.savevalidation(options)
+
         sys.stdout.write("Saving configuration...\n")
         if options.filter:
-            try:
-                if (str(options.filter)[0] == str(options.filter)[-1])\
-                        and str(options.filter).startswith(("'", '"')):
-                    options.filter = options.filter[1:-1]
-
-                (sel, val) = options.filter.split('=')
-                sel = sel.strip()
-                val = val.strip()
-            except:
-                raise InvalidCommandLineError("Invalid filter" \
-                  " parameter format [filter_attribute]=[filter_value]")
-
-            instances = self._rdmc.app.select(selector=self._rdmc.app.selector, \
-                                                                                fltrvals=(sel, val))
+            instances = self._rdmc.instanceindex.select(self._rdmc.app, \
+                            self._rdmc.app.selector, InstanceIndex.parse(options.filter))
             contents = self.saveworkerfunction(instances=instances)
         else:
             contents = self.saveworkerfunction()
@@ -104,12 +106,14 @@ class SaveCommand(RdmcCommandBase):
 
         if options.encryption:
             with open(self.filename, 'wb') as outfile:
-                outfile.write(Encryption().encrypt_file(json.dumps(contents, \
-                                indent=2, cls=redfish.ris.JSONEncoder), options.encryption))
+                Encryption().encrypt_json(contents, outfile, options.encryption, indent=2, \
+                                                            cls=redfish.ris.JSONEncoder)
+        elif options.jsonlines:
+            with open(self.filename, 'w') as outfile:
+                UI().print_out_json_lines(contents, outfile)
         else:
             with open(self.filename, 'w') as outfile:
-                outfile.write(json.dumps(contents, indent=2, cls=redfish.ris.JSONEncoder, \
-                                                                            sort_keys=True))
+                UI().write_json(contents, outfile, indent=2, sort_keys=True)
         sys.stdout.write("Configuration saved to: %s\n" % self.filename)
 
         if options.logout:
@@ -159,6 +163,52 @@ class SaveCommand(RdmcCommandBase):
 
         return templist
 
+    def savempfunc(self, options):
+        """ Save the configuration of every server in the multiple server file concurrently
+
+        :param options: command line options
+        :type options: list.
+        :returns: returns True if every server was saved
+        """
+        if not options.selector and not options.multisave:
+            raise InvalidCommandLineError("Please provide the types to save using the "\
+                                          "--selector or --multisave option.")
+
+        outputdir = options.outdirectory if options.outdirectory else os.getcwd()
+        if outputdir.endswith(('"', "'")) and outputdir.startswith(('"', "'")):
+            outputdir = outputdir[1:-1]
+
+        if not os.path.isdir(outputdir):
+            raise InvalidCommandLineError("The given output folder path does not exist.")
+
+        servers = ServerPool.readmpfile(options.mpfilename)
+
+        saveargs = []
+        for flag, value in (('--selector', options.selector), ('--multisave', \
+                    options.multisave), ('--path', options.path), \
+                    ('--encryption', options.encryption)):
+            if value:
+                saveargs.extend([flag, value])
+        for fltr in options.filter or []:
+            saveargs.extend(['--filter', fltr])
+        if options.includelogs:
+            saveargs.append('--includelogs')
+        if options.jsonlines:
+            saveargs.append('--jsonlines')
+
+        jobs = []
+        for name, args in servers:
+            jobs.append((name, ['--nocache', 'save'] + args + ['-f', os.path.join(\
+                    outputdir, name+'.json')] + saveargs, os.path.join(outputdir, name+'.log')))
+
+        pool = ServerPool(self._rdmc, workers=options.workers, timeout=options.servertimeout, \
+                                                                    retries=options.retries)
+        manifest = pool.runmanifest(jobs, outputdir, 'Saving configuration for', \
+                fields=lambda name, returncode: [('file', name+'.json' if not returncode \
+                                                                                else None)])
+
+        return all(not entry['returncode'] for entry in manifest)
+
     def nested_sort(self, data):
         """ Helper function to sort all dictionary key:value pairs
 
@@ -185,6 +235,10 @@ class SaveCommand(RdmcCommandBase):
         if self._rdmc.app.config._ac__format.lower() == 'json':
             options.json = True
 
+        if options.jsonlines and options.encryption:
+            raise InvalidCommandLineError("The --jsonlines flag can not be used with "\
+                                                                        "--encryption.")
+
         try:
             _ = self._rdmc.app.current_client
         except:
@@ -293,6 +347,7 @@ class SaveCommand(RdmcCommandBase):
             return
 
         add_login_arguments_group(customparser, full=True)
+        add_multiserver_arguments_group(customparser)
 
         customparser.add_argument(
             '--logout',
@@ -341,7 +396,10 @@ class SaveCommand(RdmcCommandBase):
             " objects that are all of that type. If you want to modify"\
             " the properties of only one of those objects, use the filter"\
             " flag to narrow down results based on properties."\
+            " The flag can be repeated to combine filters, and >=, <=, > and <"\
+            " match ranges of values. A trailing * matches values by prefix."\
             "\t\t\t\t\t Usage: --filter [ATTRIBUTE]=[VALUE]",
+            action='append',
             default=None,
         )
         customparser.add_argument(
@@ -354,6 +412,31 @@ class SaveCommand(RdmcCommandBase):
             " structure makes the information easier to parse.",
             default=False
         )
+        customparser.add_argument(
+            '--jsonlines',
+            dest='jsonlines',
+            action="store_true",
+            help="Optionally include this flag to write the file as JSON Lines, one"\
+            " compact JSON document per instance after the header line. Each line"\
+            " is written as it is encoded, which suits large saves. The load command"\
+            " reads both formats.",
+            default=False
+        )
+        customparser.add_argument(
+            '--mpfile',
+            dest='mpfilename',
+            help="Optionally use the provided filename to obtain server information and save "\
+            "the configuration of every server concurrently.",
+            default=None,
+        )
+        customparser.add_argument(
+            '-o',
+            '--outputdirectory',
+            '--outdir',
+            dest='outdirectory',
+            help="use the provided directory to output data for multiple server saves.",
+            default=None,
+        )
         customparser.add_argument(
             '--encryption',
             dest='encryption',
@@ -1,12 +1,16 @@
 """find and add dynamic extensions"""
 import os
 import sys
+import json
+import importlib
 
 tl = []
 classNames = []
-Commands = {}
+modulePaths = {}
 
 extensionDir = os.path.dirname(__file__)
+#manifest built at package time by rdmc.build_manifest and shipped with the extensions
+manifestFile = os.path.join(extensionDir, 'manifest.json')
 
 if os.name != 'nt':
     replacement = '/'
@@ -23,10 +27,102 @@ for cwd, names in tl:
     comms = []
     for name in names:
         if name.endswith('.pyc') and '__' not in name:
+            modulePaths[cn+'.'+name.replace('.pyc', '')] = os.path.join(cwd, name)
             name = name.replace('.pyc', '')
             classNames.append(cn+'.'+name+'.'+name)
         elif name.endswith('.py') and '__' not in name:
             name = name.replace('.py', '')
             if name+'.pyc' in names:
                 continue
-            classNames.append(cn+'.'+name+'.'+name)
\ No newline at end of file
+            modulePaths[cn+'.'+name] = os.path.join(cwd, name+'.py')
+            classNames.append(cn+'.'+name+'.'+name)
+
+class LazyCommands(dict):
+    """ Dictionary of extension classes which imports an extension module the first time
+    its class is requested """
+    def __missing__(self, cName):
+        for name in classNames:
+            pkgName, clsName = name.rsplit('.', 1)
+            if clsName != cName:
+                continue
+            try:
+                self[cName] = getattr(importlib.import_module('extensions' + pkgName), cName)
+            except Exception as excp:
+                sys.stderr.write("Error locating extension %s at location %s\n" % \
+                                                        (cName, 'extensions' + name))
+                raise excp
+            return self[cName]
+
+        raise KeyError(cName)
+
+Commands = LazyCommands()
+
+def load_manifest(cachedir=None):
+    """ Load the command manifest shipped with the extensions, or else the one generated
+    in the cache directory
+
+    :param cachedir: cache directory holding a generated manifest
+    :type cachedir: str.
+    :returns: returns the list of manifest entries, or None if no manifest is found
+              which is up to date with the extension modules
+    """
+    paths = [manifestFile]
+    if cachedir:
+        paths.append(os.path.join(cachedir, 'manifest.json'))
+
+    for path in paths:
+        entries = read_manifest(path)
+        if entries is not None:
+            return entries
+
+    return None
+
+def read_manifest(path):
+    """ Read a command manifest
+
+    :param path: manifest file
+    :type path: str.
+    :returns: returns the list of manifest entries, or None if the manifest is
+              missing or out of date with the extension modules
+    """
+    try:
+        with open(path, 'r') as manifest:
+            entries = json.load(manifest)['commands']
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+    expected = [name for name in classNames if name.endswith('Command')]
+    if sorted(entry['classname'] for entry in entries) != sorted(expected):
+        return None
+
+    # frozen builds extract with fresh timestamps, so only source trees are checked
+    if not getattr(sys, 'frozen', False):
+        try:
+            mtime = os.path.getmtime(path)
+            for name in expected:
+                if os.path.getmtime(modulePaths[name.rsplit('.', 1)[0]]) > mtime:
+                    return None
+        except (KeyError, OSError):
+            return None
+
+    return entries
+
+def save_manifest(entries, path):
+    """ Write a command manifest, ignoring locations which can not be written
+
+    :param entries: manifest entries
+    :type entries: list.
+    :param path: manifest file
+    :type path: str.
+    """
+    tmpfile = path + '.tmp'
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(tmpfile, 'w') as manifest:
+            json.dump({'commands': entries}, manifest, indent=1)
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmpfile, path)
+    except (IOError, OSError):
+        pass
@@ -18,7 +18,6 @@
 """ Firmware Update Command for rdmc """
 
 import sys
-import time
 
 from argparse import ArgumentParser
 
@@ -27,7 +26,12 @@ from redfish.ris.resp_handler import ResponseHandler
 from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, \
                     InvalidCommandLineErrorOPTS, FirmwareUpdateError, \
-                    NoContentsFoundForOperationError, Encryption
+                    NoContentsFoundForOperationError, Encryption, ProgressTracker
+
+#seconds the update service may stay in an idle state
+UPDATE_IDLE_TIMEOUT = 200
+#seconds allowed for the whole update, even while the service keeps changing state
+UPDATE_DEADLINE = 3600
 
 class FirmwareUpdateCommand(RdmcCommandBase):
     """ Reboot server that is currently logged in """
@@ -126,18 +130,8 @@ class FirmwareUpdateCommand(RdmcCommandBase):
         :param path: path to update service.
         :tyep path: str
         """
-        counter = 0
-        written = False
-        uploadingpost = False
-        spinner = ['|', '/', '-', '\\']
-        position = 0
-
-        while True:
-            if counter == 100:
-                raise FirmwareUpdateError("Error occurred while updating the firmware.")
-            else:
-                counter += 1
-
+        def getstate():
+            """ Return the current update service state """
             results = self._rdmc.app.get_handler(path, silent=True)
             results = results.dict
             try:
@@ -149,44 +143,41 @@ class FirmwareUpdateCommand(RdmcCommandBase):
                 raise FirmwareUpdateError("Unable to contact Update Service. " \
                                             "Please re-login and try again.")
 
-            if results["State"].lower().startswith("idle"):
-                time.sleep(2)
-            elif results["State"].lower().startswith("uploading"):
-                counter = 0
-
-                if not uploadingpost:
-                    uploadingpost = True
-                else:
-                    if not written:
-                        written = True
-                        sys.stdout.write("iLO is uploading the necessary files. Please wait...")
-
-                time.sleep(0.5)
-            elif results["State"].lower().startswith(("progressing", \
-                                          "updating", "verifying", "writing")):
-                counter = 0
-
-                for _ in range(2):
-                    if position < 4:
-                        sys.stdout.write("Updating: "+ spinner[position]+"\r")
-                        position += 1
-                        time.sleep(0.1)
-                    else:
-                        position = 0
-                        sys.stdout.write("Updating: "+ spinner[position]+"\r")
-                        position += 1
-                        time.sleep(0.1)
-            elif results["State"].lower().startswith("complete"):
-                sys.stdout.write('\n\nFirmware update has completed and iLO' \
-                                 ' may reset. \nIf iLO resets the' \
-                                 ' session will be terminated.\nPlease wait' \
-                                 ' for iLO to initialize completely before' \
-                                 ' logging in again.\nA reboot may be required'\
-                                 ' for firmware changes to take effect.\n')
-                break
-            elif results["State"].lower().startswith("error"):
-                error = self._rdmc.app.get_handler(path, silent=True)
-                self.printerrmsg(error)
+            return results["State"].lower()
+
+        #the idle timeout only covers idle states, uploading and flashing can take much
+        #longer but never more than the deadline
+        tracker = ProgressTracker(self._rdmc, getstate, lambda state: state.startswith(\
+                        ("complete", "error")), callback=self.showstate, initial=0.2, maximum=2, \
+                        active=lambda state: state.startswith(("uploading", "progressing", \
+                                                        "updating", "verifying", "writing")))
+        state = tracker.wait(timeout=UPDATE_IDLE_TIMEOUT, deadline=UPDATE_DEADLINE)
+
+        if state.startswith("complete"):
+            sys.stdout.write('\n\nFirmware update has completed and iLO' \
+                             ' may reset. \nIf iLO resets the' \
+                             ' session will be terminated.\nPlease wait' \
+                             ' for iLO to initialize completely before' \
+                             ' logging in again.\nA reboot may be required'\
+                             ' for firmware changes to take effect.\n')
+        elif state.startswith("error"):
+            error = self._rdmc.app.get_handler(path, silent=True)
+            self.printerrmsg(error)
+        else:
+            raise FirmwareUpdateError("Error occurred while updating the firmware.")
+
+    def showstate(self, state):
+        """ Show a new update service state
+
+        :param state: update service state
+        :type state: str.
+        """
+        if state.startswith("uploading"):
+            sys.stdout.write("iLO is uploading the necessary files. Please wait...")
+        elif state.startswith(("progressing", "updating", "verifying", "writing")):
+            sys.stdout.write("Updating: %s\r" % state)
+
+        self._rdmc.reportprogress(event='state', state=state)
 
     def printerrmsg(self, error):
         """ raises and prints the detailed error message if possible """
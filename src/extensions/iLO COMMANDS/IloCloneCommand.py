@@ -872,10 +872,8 @@ class IloCloneCommand(RdmcCommandBase):
 
         if options.encryption:
             outfile = open(filename, 'wb')
-            outfile.write(Encryption().encrypt_file(json.dumps(clone, \
-                                separators=(',', ':'), \
-                                cls=redfish.ris.JSONEncoder),\
-                                options.encryption))
+            Encryption().encrypt_json(clone, outfile, options.encryption, \
+                                separators=(',', ':'), cls=redfish.ris.JSONEncoder)
         else:
             outfile = open(filename, 'w')
             #compact
@@ -906,14 +904,10 @@ class IloCloneCommand(RdmcCommandBase):
                             "create file by running save command." % file)
         if options.encryption:
             with open(filename, "rb") as myfile:
-                data = myfile.read()
-                data = Encryption().decrypt_file(data, \
-                                                    options.encryption)
-        else:
-            myfile = open(filename, 'r')
-            data = myfile.read()
+                return Encryption().decrypt_json(myfile, options.encryption)
 
-        myfile.close()
+        with open(filename, 'r') as myfile:
+            data = myfile.read()
 
         try:
             loadcontents = json.loads(data)
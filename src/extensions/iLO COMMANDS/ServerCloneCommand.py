@@ -29,17 +29,21 @@ import traceback
 
 from collections import OrderedDict
 from argparse import ArgumentParser
+from multiprocessing.dummy import Pool as ThreadPool
 
 import jsonpath_rw
 import redfish.ris
 
-from redfish.ris.utils import iterateandclear, diffdict
-from redfish.ris.rmc_helper import (IloResponseError, IdTokenError, InstanceNotFoundError)
+from redfish.ris.ris import SessionExpired
+from redfish.ris.utils import iterateandclear, diffdict, merge_dict, skipnonsettingsinst
+from redfish.ris.rmc_helper import (IloResponseError, IdTokenError, InstanceNotFoundError, \
+                                     LoadSkipSettingError)
 
 from six.moves import input
 from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
 
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, InvalidKeyError, Encryption, \
+            JsonObjectWriter, AtomicFileWriter, StreamingRequest, \
             InvalidCommandLineErrorOPTS, InvalidFileInputError, NoChangesFoundOrMadeError, \
             NoContentsFoundForOperationError, ResourceExists, NoDifferencesFoundError
 
@@ -49,11 +53,10 @@ from redfish.ris.rmc_helper import ValueChangedError
 __DEFAULT__ = "<p/k>"
 __MINENCRYPTIONLEN__ = 16
 __clone_file__ = 'ilorest_clone.json'
-__tmp_clone_file__ = '_ilorest_clone_tmp'
-__tmp_sel_file__ = '_ilorest_sel_tmp'
 __error_log_file__ = 'clone_error_logfile.log'
 __changelog_file__ = 'changelog.log'
-__tempfoldername__ = "serverclone_data"
+#number of types fetched at the same time during save
+__gather_workers__ = 4
 
 def log_decor(func):
     """
@@ -115,6 +118,9 @@ def logging(command, _trace, error, _args):
 
 class ServerCloneCommand(RdmcCommandBase):
     """ Constructor """
+    # (family, major, minor) tuple of every type parsed by type_parse
+    parsedtypes = dict()
+
     def __init__(self, rdmcObj):
         RdmcCommandBase.__init__(self,\
             name='serverclone',\
@@ -133,6 +139,8 @@ class ServerCloneCommand(RdmcCommandBase):
             'example: serverclone load -ssocert sso.txt --tlscert tls.txt'\
             '\n\n\tLoad a clone file which has been encrypted.\n\t'\
             'example: serverclone load --encryption abc12abc12abc123\n\n\t'\
+            'Report the changes a clone file would make without applying them.\n\t'\
+            'example: serverclone load -f serv_clone.json --dryrun\n\n\t'\
             'NOTE 1: Use the \'--silent\' OR \'--quiet\'option to ignore \n\t        '\
             'all user input. Intended for scripting purposes.\n\n\t' \
             'NOTE 2: During clone load, login using an ilo account with\n\t        full privileges'\
@@ -148,9 +156,6 @@ class ServerCloneCommand(RdmcCommandBase):
         self._rdmc = rdmcObj
         self.typepath = rdmcObj.app.typepath
         self.clone_file = None #set in validation
-        self._cache_dir = None #set in validation
-        self.tmp_clone_file = __tmp_clone_file__
-        self.tmp_sel_file = __tmp_sel_file__
         self.change_log_file = __changelog_file__
         self.error_log_file = __error_log_file__
         self.https_cert_file = None
@@ -161,7 +166,7 @@ class ServerCloneCommand(RdmcCommandBase):
 
         self.loginobj = rdmcObj.commands_dict["LoginCommand"](rdmcObj)
         self.logoutobj = rdmcObj.commands_dict["LogoutCommand"](rdmcObj)
-        self.loadobj = rdmcObj.commands_dict["LoadCommand"](rdmcObj)
+        self.commitobj = rdmcObj.commands_dict["CommitCommand"](rdmcObj)
 
         #referenced for special POST commands
         self.makedriveobj = rdmcObj.commands_dict["CreateLogicalDriveCommand"](rdmcObj)
@@ -230,7 +235,7 @@ class ServerCloneCommand(RdmcCommandBase):
         :param data: data to be written to output file
         :type data: container (list of dictionaries, dictionary, etc.)
         :param file: filename to be written
-        :type file: string (generally this should be self.clone_file or tmp_clone_file
+        :type file: string (generally this should be self.clone_file)
         :param operation: file operation to be performed
         :type operation: string ('w+', 'a+', 'r+')
         :param sk: sort keys flag
@@ -247,8 +252,8 @@ class ServerCloneCommand(RdmcCommandBase):
             try:
                 if options.encryption:
                     with open(filename, operation + 'b') as outfile:
-                        outfile.write(Encryption().encrypt_file(json.dumps(data, indent=2, \
-                                    cls=redfish.ris.JSONEncoder, sort_keys=sk), options.encryption))
+                        Encryption().encrypt_json(data, outfile, options.encryption, indent=2, \
+                                                    cls=redfish.ris.JSONEncoder, sort_keys=sk)
                 else:
                     with open(filename, operation) as outfile:
                         outfile.write(json.dumps(data, indent=2, cls=redfish.ris.JSONEncoder, \
@@ -260,8 +265,7 @@ class ServerCloneCommand(RdmcCommandBase):
             try:
                 if options.encryption:
                     with open(filename, operation + 'b') as file_handle:
-                        fdata = json.loads(Encryption().decrypt_file(file_handle.read(),\
-                                                                options.encryption))
+                        fdata = Encryption().decrypt_json(file_handle, options.encryption)
                 else:
                     with open(filename, operation) as file_handle:
                         fdata = json.loads(file_handle.read())
@@ -297,22 +301,13 @@ class ServerCloneCommand(RdmcCommandBase):
 
         unsupported_types_list = ['Collection', 'PowerMeter', 'BiosMapping']
 
-        #supported types comparison
-        types_accepted = set()
-        for _type in sorted(set(self._rdmc.app.types('--fulltypes'))):
-            if _type[:1].split('.')[0] == '#':
-                _type_mod = _type[1:].split('.')[0]
-            else:
-                _type_mod = _type.split('.')[0]
-            for stype in supported_types_list:
-                if stype.lower() in _type_mod.lower():
-                    found = False
-                    for ustype in unsupported_types_list:
-                        if ustype.lower() in _type_mod.lower():
-                            found = True
-                            break
-                    if not found:
-                        types_accepted.add(_type)
+        #supported types comparison, made once per family
+        types_accepted = list()
+        for family, types in self.type_index(self._rdmc.app.types('--fulltypes')).items():
+            family = family.lower()
+            if any(stype.lower() in family for stype in supported_types_list) and not \
+                        any(ustype.lower() in family for ustype in unsupported_types_list):
+                types_accepted.extend(types)
 
         return sorted(types_accepted)
 
@@ -328,7 +323,7 @@ class ServerCloneCommand(RdmcCommandBase):
 
         reset_confirm = True
 
-        if not options.silentcopy:
+        if not options.silentcopy and not options.dryrun:
             while True:
                 ans = input("A configuration file \'%s\' containing " \
                             "configuration changes will be applied to this iLO"\
@@ -350,8 +345,13 @@ class ServerCloneCommand(RdmcCommandBase):
                     sys.stdout.write("Invalid input...\n")
 
         self._fdata = self.file_handler(self.clone_file, operation='r+', options=options)
-        self.loadhelper(options)
-        self.loadpatch(options)
+        self.loadpatch(self.loadhelper(options), options)
+
+        if options.dryrun:
+            sys.stdout.write("Dry run of clonefile \'%s\' is complete. No changes were made "\
+                             "to the server.\n" % self.clone_file)
+            return ReturnCodes.SUCCESS
+
         self.getsystemstatus(options)
 
         if not options.silentcopy:
@@ -393,12 +393,11 @@ class ServerCloneCommand(RdmcCommandBase):
         Helper function for loading which calls additional helper functions for
         Server BIOS and Firmware compatibility, type compatibility, patch or
         postability (special functions). Data deemed for exclusive patching
-        (through load) is written into a temporary file, which is deleted unless
-        archived for later use.
+        (through load) is collected into the load plan handed to loadpatch.
 
         :param options: command line options
         :type options: attribute
-
+        :returns: list of {type: {path: properties}} dictionaries to be patched
         """
         data = list()
 
@@ -413,29 +412,27 @@ class ServerCloneCommand(RdmcCommandBase):
             raise InvalidFileInputError("Clone File \'%s\' does not include a valid \'Comments\' "\
                                         "dictionary.")
 
-        if options.ssocert:
-            self.load_ssocertificate()  #check and load sso certificates
-        if options.tlscert:
-            self.load_tlscertificate()  #check and load tls certificates
+        if options.dryrun:
+            if options.ssocert or options.tlscert:
+                sys.stdout.write("Dry run: SSO and TLS certificates will not be loaded.\n")
+        else:
+            if options.ssocert:
+                self.load_ssocertificate()  #check and load sso certificates
+            if options.tlscert:
+                self.load_tlscertificate()  #check and load tls certificates
 
         typelist = []
+        server_types = self.type_index(server_avail_types)
         for _x in self._fdata:
-            for _y in server_avail_types:
-                _x1 = re.split('#|\.', _x)
-                _y1 = re.split('#|\.', _y)
-                if _x1[0] == '':
-                    _x1.pop(0)
-                if _y1[0] == '':
-                    _y1.pop(0)
-                if _x1[0] == _y1[0]: # _x.split('.')[0] == _y.split('.')[0]:
-                    _comp_tuple = self.type_compare(_x, _y)
-                    if (_comp_tuple[0] and _comp_tuple[1]):
-                        sys.stdout.write("Type \'%s\' is compatible with this system.\n" % _x)
-                        typelist.append(_x)
-                    else:
-                        sys.stdout.write("The type: \'%s\' isn't compatible with the type: \'%s\'"\
-                                         "found on this system. Associated properties can not "\
-                                         "be applied...Skipping\n" % (_x, _y))
+            for _y in server_types.get(self.type_parse(_x)[0], []):
+                _comp_tuple = self.type_compare(_x, _y)
+                if (_comp_tuple[0] and _comp_tuple[1]):
+                    sys.stdout.write("Type \'%s\' is compatible with this system.\n" % _x)
+                    typelist.append(_x)
+                else:
+                    sys.stdout.write("The type: \'%s\' isn't compatible with the type: \'%s\'"\
+                                     "found on this system. Associated properties can not "\
+                                     "be applied...Skipping\n" % (_x, _y))
 
         for _type in typelist:
             singlet = True
@@ -511,7 +508,7 @@ class ServerCloneCommand(RdmcCommandBase):
                 finally:
                     scanned_dict[path]['Scanned'] = True
 
-        self.file_handler(self.tmp_clone_file, 'w+', options, data, True)
+        return data
 
     def subhelper(self, data, _type, path, options):
         """
@@ -567,59 +564,288 @@ class ServerCloneCommand(RdmcCommandBase):
         self.json_traversal_delete_empty(tmp, None, None)
         return tmp
 
-    def loadpatch(self, options):
+    def loadpatch(self, data, options):
         """
-        Load temporary patch file to server
+        Compare the remaining clone data with the current state of the server and
+        commit only the properties which differ, in a single pass. For a dry run the
+        differences are reported instead.
 
+        :param data: list of {type: {path: properties}} dictionaries from loadhelper
+        :type data: list
         :parm options: command line options
         :type options: attribute
         """
-        sys.stdout.write("Patching remaining data.\n")
-        fdata = self.file_handler(self.tmp_clone_file, operation='r+', options=options)
-        for _sect in fdata:
-            _tmp_sel = {}
-            _key = (next(iter(_sect)))
-            _tmp_sel[_key.split('.')[0] + '.'] = _sect[_key]
-            self.file_handler(self.tmp_sel_file, 'w', options, [_tmp_sel], True)
-            self.loadpatch_helper(_key, _sect, options)
+        sys.stdout.write("Comparing remaining data with the server.\n")
+        loadplan = OrderedDict()
+        for _sect in data or []:
+            for _type, _items in _sect.items():
+                loadplan.setdefault(_type, []).extend(_items.values())
+
+        deltas = OrderedDict()
+        for _type, loaditems in loadplan.items():
+            delta = self.loaddelta(_type, loaditems)
+            if delta:
+                deltas[_type] = delta
+            else:
+                sys.stdout.write("No differences found for \'%s\'.\n" % _type)
+
+        if options.dryrun:
+            self.report_delta(deltas)
+            return
+
+        if options.biospassword:
+            self._rdmc.app.current_client.bios_password = options.biospassword
+
+        staged = False
+        for _type, delta in deltas.items():
+            if self.loadpatch_helper(_type, delta, options):
+                staged = True
+
+        if staged:
+            self.loadpatch_commit()
+        elif deltas:
+            sys.stderr.write("Unable to stage the differences found, no changes were made.\n")
+        else:
+            sys.stdout.write("No differences identified from current configuration.\n")
+
+    def loaddelta(self, _type, loaditems):
+        """
+        Minimal changes needed to bring every instance of a type in line with the clone
+        data. The sections of the type are merged first, so a later section wins over an
+        earlier one as in a sequential load, and the result is compared once with each
+        instance. The current state is taken from the instances loadhelper retrieved and
+        @odata properties are ignored on both sides.
+
+        :param _type: cross compatible iLO type
+        :type _type: string
+        :param loaditems: property dictionaries to be loaded for this type, in file order
+        :type loaditems: list
+        :returns: OrderedDict of each instance path to its differing properties
+        """
+        delta = OrderedDict()
+        loaddata = dict()
+        for items in loaditems:
+            merge_dict(loaddata, self.delta_normalize(items))
+
+        instances = skipnonsettingsinst(self._rdmc.app.select(_type.split('.')[0] + '.'))
+
+        for instance in instances:
+            changes = diffdict(newdict=copy.deepcopy(loaddata), \
+                               oridict=copy.deepcopy(instance.resp.dict))
+            if changes:
+                delta[instance.path] = changes
+
+        return delta
+
+    def instancefilter(self, instance, instances):
+        """
+        Select filter matching a single instance on its own href, which is found under
+        links/self on /rest trees
+
+        :param instance: instance to be matched
+        :type instance: RisMonolithMemberv100
+        :param instances: all the instances of the same type
+        :type instances: list
+        :returns: (property, value) filter tuple
+        """
+        hrefkey = self.typepath.defs.hrefstring
+        if self.typepath.defs.flagforrest:
+            hrefkey = 'links/self/' + hrefkey
+
+        href = instance.resp.dict
+        for key in hrefkey.split('/'):
+            href = href.get(key) if isinstance(href, dict) else None
+
+        if href:
+            return (hrefkey, href)
+        elif len(instances) == 1:
+            return (None, None)
+        raise InstanceNotFoundError("Unable to locate the href of instance %s." % \
+                                                                                instance.path)
+
+    def delta_normalize(self, data):
+        """
+        Copy of clone data without @odata properties
+
+        :param data: clone properties
+        :type data: dictionary
+        :returns: normalized copy of the properties
+        """
+        if isinstance(data, dict):
+            return dict((key, self.delta_normalize(value)) for key, value in data.items() \
+                                                            if '@odata' not in key.lower())
+        elif isinstance(data, list):
+            return [self.delta_normalize(value) for value in data]
+        return copy.deepcopy(data)
+
+    def report_delta(self, deltas):
+        """
+        Print the properties a load would change, per type and instance
+
+        :param deltas: OrderedDict of each type to the deltas from loaddelta
+        :type deltas: OrderedDict
+        """
+        if not deltas:
+            sys.stdout.write("Dry run: the server already matches the clone file.\n")
+            return
+
+        sys.stdout.write("Dry run: the following properties would be changed.\n")
+        for _type, delta in deltas.items():
+            sys.stdout.write("%s\n" % _type)
+            for path, changes in delta.items():
+                sys.stdout.write("  %s\n" % path)
+                stack = [('', changes)]
+                while stack:
+                    (prefix, value) = stack.pop()
+                    if isinstance(value, dict) and value:
+                        stack.extend((prefix + key + '/', value[key]) for key in \
+                                                                sorted(value, reverse=True))
+                    else:
+                        sys.stdout.write("    %s: %s\n" % (prefix[:-1], json.dumps(value, \
+                                                            cls=redfish.ris.JSONEncoder)))
 
     @log_decor
-    def loadpatch_helper(self, type, dict, options):
+    def loadpatch_helper(self, _type, delta, options):
         """
-        Load temporary patch file to server
+        Stage the differing properties of a single clone type on the server instances,
+        each instance with its own changes only.
 
+        :param _type: cross compatible iLO type
+        :type _type: string
+        :param delta: OrderedDict of each instance path to its differing properties
+        :type delta: OrderedDict
         :parm options: command line options
         :type options: attribute
-        """
-        options_str = ""
-        if options.encryption:
-            options_str += " --encryption " + options.encryption
+        :returns: True if any changes were staged for this type
+        """
+        staged = False
+        sys.stdout.write("Patching \'%s\'.\n" % _type)
+        instances = skipnonsettingsinst(self._rdmc.app.select(_type.split('.')[0] + '.'))
+        filters = dict((instance.path, self.instancefilter(instance, instances)) \
+                                                                for instance in instances)
+        for path, changes in delta.items():
+            try:
+                if self._rdmc.app.loadset(seldict=copy.deepcopy(changes), \
+                                fltrvals=filters[path], \
+                                selector=_type.split('.')[0] + '.', \
+                                latestschema=self._rdmc.opts.latestschema, \
+                                uniqueoverride=options.uniqueoverride):
+                    staged = True
+            except LoadSkipSettingError:
+                staged = True
 
-        if options.uniqueoverride:
-            options_str += " --uniqueitemoverride"
+        return staged
 
-        sys.stdout.write("Patching \'%s\'.\n" % type)
-        self.loadobj.run("-f " + self.tmp_sel_file + options_str)
+    @log_decor
+    def loadpatch_commit(self):
+        """
+        Commit all changes staged by loadpatch_helper
+        """
+        self.commitobj.commitfunction()
 
     def gatherandsavefunction(self, typelist, options):
         """
-        Write parsed JSON save data to file
+        Write parsed JSON save data to file. The instances of up to __gather_workers__
+        types are fetched at the same time and each type is written to the file as
+        soon as it has been parsed, in the order of the type list. In-band (blobstore)
+        connections share a single channel, so their types are fetched one at a time.
+        The file is only moved into place once it is complete.
 
         :param typelist: list of available types on iLO
         :type typelist: list
         :param options: command line options
         :type options: attribute
         """
-        data = OrderedDict()
-        data.update(self._rdmc.app.create_save_header(selectignore=True))
+        fetchlist = [(_type, self.gatherpaths(_type)) for _type in typelist]
 
-        for _type in typelist:
-            self.gatherandsavehelper(_type, data, options)
+        try:
+            outfile = AtomicFileWriter(self.clone_file, 'w+b' if options.encryption else 'w+')
+            completed = False
+            try:
+                writer = JsonObjectWriter(outfile, options.encryption, indent=2, \
+                                                                cls=redfish.ris.JSONEncoder)
+                for key, value in self._rdmc.app.create_save_header(selectignore=True).items():
+                    writer.write(key, value)
+
+                pool = None
+                if len(fetchlist) > 1 and \
+                                StreamingRequest.available(self._rdmc.app.current_client):
+                    pool = ThreadPool(min(__gather_workers__, len(fetchlist)))
+                fetched = pool.imap(self.gatherfetch, fetchlist) if pool else \
+                                        (self.gatherfetch(fetch) for fetch in fetchlist)
+                try:
+                    for _type, responses in fetched:
+                        data = OrderedDict()
+                        self.gatherandsavehelper(_type, data, options, responses)
+                        if _type in data:
+                            writer.write(_type, data[_type])
+                finally:
+                    if pool:
+                        pool.close()
+                        pool.join()
+
+                writer.close()
+                outfile.commit()
+                completed = True
+            finally:
+                if not completed:
+                    outfile.discard()
+        except (IOError, OSError) as excp:
+            self.cleanup()
+            raise InvalidFileInputError("Unable to open file: %s" % excp)
 
-        self.file_handler(self.clone_file, 'w+', options, data, False)
         sys.stdout.write('Saving of clone file to \'%s\' is complete.\n' % self.clone_file)
 
-    def gatherandsavehelper(self, _type, data, options):
+    def gatherpaths(self, _type):
+        """
+        Paths of the instances of a type that are reloaded for save
+
+        :param _type: type to be saved
+        :type _type: string
+        :returns: list of instance paths
+        """
+        selector = self.typepath.modifyselectorforgen(_type.split('.')[0] + '.')
+        family = selector.split('#')[-1].split('.')[0].lower()
+
+        return [path for path, member in list(self._rdmc.app.monolith.paths.items()) \
+                    if member.maj_type and self.type_parse(member.maj_type)[0].lower() == family]
+
+    def gatherfetch(self, fetch):
+        """
+        Retrieve the instances of a type from the server. Runs on the save workers, so
+        the responses are only added to the monolith by gatherupdate.
+
+        :param fetch: type and the paths of its instances
+        :type fetch: tuple
+        :returns: the type and a list of (path, response) tuples, or the exception raised
+        """
+        (_type, paths) = fetch
+        try:
+            return (_type, [(path, self._rdmc.app.current_client.get(path)) for path in paths])
+        except Exception as excp:
+            return (_type, excp)
+
+    def gatherupdate(self, responses):
+        """
+        Add the responses retrieved by gatherfetch to the monolith
+
+        :param responses: list of (path, response) tuples or the exception raised
+        :type responses: list
+        """
+        if isinstance(responses, Exception):
+            raise responses
+
+        monolith = self._rdmc.app.monolith
+        for path, resp in responses:
+            if resp.status == 401:
+                raise SessionExpired("Invalid session. Please logout and "\
+                                     "log back in or include credentials.")
+            elif resp.status in (200, 201):
+                monolith.update_member(resp=resp, path=path, init=False)
+            else:
+                monolith.removepath(path)
+
+    def gatherandsavehelper(self, _type, data, options, responses=None):
         """
         Collect data on types and parse properties (delete unnecessary/readonly/
         empty properties.
@@ -630,22 +856,28 @@ class ServerCloneCommand(RdmcCommandBase):
         :type data: JSON
         :param options: command line options
         :type options: attribute
+        :param responses: instances retrieved by gatherfetch, None to reload them here
+        :type responses: list
         """
         _typep = _type.split('.')[0]
         _spec_list = ['SmartStorageConfig', 'iLOLicense', 'Bios']
+        rel = responses is None
 
         try:
+            if not rel:
+                self.gatherupdate(responses)
+
             if 'EthernetInterface' in _type:
                 instances = self._rdmc.app.select(_typep + '.', \
                             (self.typepath.defs.hrefstring, self.typepath.defs.managerpath + '*'), \
-                                                                                        rel=True)
+                                                                                        rel=rel)
             #'links/self/href' required when using iLO 4 (rest).
             elif 'EthernetNetworkInterface' in _type:
                 instances = self._rdmc.app.select(_typep + '.', ("links/self/" + \
                             self.typepath.defs.hrefstring, self.typepath.defs.managerpath + '*'), \
-                                                                                        rel=True)
+                                                                                        rel=rel)
             else:
-                instances = self._rdmc.app.select(_typep + '.', rel=True)
+                instances = self._rdmc.app.select(_typep + '.', rel=rel)
 
             for j, instance in enumerate(self._rdmc.app.getprops(insts=instances)):
                 if '#' in _typep:
@@ -726,41 +958,41 @@ class ServerCloneCommand(RdmcCommandBase):
         if 'EthernetInterfaces' in _typep:
             identified = True
             #save function not needed
-            if self.load:
+            if self.load and not self.dryrun_skip(_typep, path, options):
                 self.load_ethernet(data[_type][path], _type, path)
 
         elif 'DateTime' in _typep:
             #do not use identified=True. Kind of a hack to have additional items patched.
             #save function not needed
-            if self.load:
+            if self.load and not self.dryrun_skip(_typep, path, options):
                 self.load_datetime(data[_type][path], path)
 
         elif 'LicenseService' in path and 'License' in _typep:
             identified = True
             if self.save:
                 data = self.save_license(data, _type, options)
-            elif self.load:
+            elif self.load and not self.dryrun_skip(_typep, path, options):
                 self.load_license(data[_type][path])
 
         elif 'AccountService/Accounts' in path and 'AccountService' not in  _typep:
             identified = True
             if self.save:
                 data = self.save_accounts(data, _type, options)
-            elif self.load:
+            elif self.load and not self.dryrun_skip(_typep, path, options):
                 self.load_accounts(data[_type][path], _type, path)
 
         elif 'FederationGroups' in _typep:
             identified = True
             if self.save:
                 data = self.save_federation(data, _type, options)
-            elif self.load:
+            elif self.load and not self.dryrun_skip(_typep, path, options):
                 self.load_federation(data[_type][path])
 
         elif 'SmartStorageConfig' in _typep:
             #do not use identified=True. Kind of a hack to have the settings patched.
             if self.save:
                 data = self.save_smartstorage(data, _type)
-            elif self.load:
+            elif self.load and not self.dryrun_skip(_typep, path, options):
                 self.load_smartstorage(data[_type][path], _type, path)
 
         if self.save:
@@ -768,6 +1000,23 @@ class ServerCloneCommand(RdmcCommandBase):
 
         return identified
 
+    def dryrun_skip(self, _typep, path, options):
+        """
+        Report a load step which is skipped because of a dry run
+
+        :param _typep: type of the step
+        :type _typep: string
+        :param path: iLO schema path of the step
+        :type path: string
+        :parm options: command line options
+        :type options: attribute
+        :returns: True if the step should be skipped
+        """
+        if options.dryrun:
+            sys.stdout.write("Dry run: \'%s\' at \'%s\' is loaded by a special function "\
+                             "and is not compared.\n" % (_typep, path))
+        return options.dryrun
+
     @log_decor
     def delete(self, data, _type, path, fdata, options):
         """
@@ -821,7 +1070,10 @@ class ServerCloneCommand(RdmcCommandBase):
                             sys.stdout.write("Manager Account, \'%s\' was not found in the "\
                                              "clone file. Deleting entry from server.\n"\
                                               % data['UserName'])
-                            if not options.silentcopy:
+                            if options.dryrun:
+                                sys.stdout.write("Dry run: entry not deleted.\n")
+                                ans = False
+                            elif not options.silentcopy:
                                 ans = userprompt(data)
                             else:
                                 ans = True
@@ -856,7 +1108,10 @@ class ServerCloneCommand(RdmcCommandBase):
                         sys.stdout.write("Account \'%s\' exists in file, not deleting."
                                          "\n" % data[fed_identifier])
                         return False
-                if not options.silentcopy:
+                if options.dryrun:
+                    sys.stdout.write("Dry run: entry not deleted.\n")
+                    ans = False
+                elif not options.silentcopy:
                     ans = userprompt(data)
                 else:
                     ans = True
@@ -2037,56 +2292,51 @@ class ServerCloneCommand(RdmcCommandBase):
         :type string
         :returns: return tuple with booleans of comparison checks
         """
-        _type1 = type1
-        _type2 = type2
-        checklist = ['Major']#, 'Minor'] #No minor checking for now
+        (family1, major1, _) = self.type_parse(type1)
+        (family2, major2, _) = self.type_parse(type2)
 
-        found_type = False
-        compatible = list()
+        #No minor checking for now
+        return (family1.lower() == family2.lower(), major1 == major2)
 
-        _type1 = self.type_break(_type1)
-        _type2 = self.type_break(_type2)
-
-        if _type1[type1]['Type'].lower() == _type2[type2]['Type'].lower():
-            found_type = True
+    def type_parse(self, _type):
+        """
+        Breakdown of an iLO schema type into its family and version. Redfish types look
+        like '#Bios.v1_0_0.Bios' and iLO 4 types like 'HpBios.1.2.0'. Each type is only
+        parsed once.
 
-        for item in checklist:
-            if _type1[type1]['Version'][item] == _type2[type2]['Version'][item]:
-                compatible.append('True')
-            else:
-                compatible.append('False')
+        :param _type: iLO schema type
+        :type _type: string
+        :returns: tuple of (family, major, minor), versions are None if not found
+        """
+        if _type not in ServerCloneCommand.parsedtypes:
+            _type_breakdown = _type.split('#')[-1].split('.')
+            version = []
+            try:
+                if len(_type_breakdown) == 3 and '_' in _type_breakdown[1]:
+                    version = [int(value) for value in \
+                                            _type_breakdown[1].lstrip('vV').split('_')]
+                elif len(_type_breakdown) > 3 and '_' not in _type:
+                    version = [int(value) for value in _type_breakdown if value.isdigit()]
+            except ValueError:
+                pass
+            version.extend([None, None])
+            ServerCloneCommand.parsedtypes[_type] = (_type_breakdown[0], version[0], version[1])
 
-        if 'False' in compatible:
-            return (found_type, False)
-        return (found_type, True)
+        return ServerCloneCommand.parsedtypes[_type]
 
-    @log_decor
-    def type_break(self, _type):
+    def type_index(self, types):
         """
-        Breakdown of each iLO schema type for version comparison
+        Index iLO schema types by family
 
-        :param _type: iLO schema type
-        :type _type: string
+        :param types: iLO schema types
+        :type types: list
+        :returns: dictionary of each family to the sorted list of its types
         """
+        index = dict()
+        for _type in sorted(set(types)):
+            index.setdefault(self.type_parse(_type)[0], []).append(_type)
 
-        _type2 = dict()
-        _type_breakdown = _type.split('#')[-1].split('.')
-        _type2[_type] = dict([("Type", _type_breakdown[0]), ("Version", {})])
-        versioning = list()
-        if len(_type_breakdown) == 3 and '_' in _type_breakdown[1]:
-            rev = _type_breakdown[1].split('_')
-            _type2[_type]["Version"] = {"Major": int(rev[0][-1]),
-                                        "Minor": int(rev[1]),
-                                        "Errata": int(rev[2])}
-        elif len(_type_breakdown) > 3 and '_' not in _type:
-            for value in _type_breakdown:
-                if value.isdigit():
-                    versioning.append(int(value))
-            _type2[_type]["Version"] = {"Major": versioning[0],
-                                        "Minor": versioning[1],
-                                        "Errata": versioning[2]}
-
-        return _type2
+        return index
 
     def serverclonevalidation(self, options):
         """
@@ -2098,12 +2348,6 @@ class ServerCloneCommand(RdmcCommandBase):
 
         """
 
-        self._cache_dir = os.path.join(self._rdmc.app.config.get_cachedir(), __tempfoldername__)
-        if not os.path.exists(self._cache_dir):
-            os.makedirs(self._cache_dir)
-        self.tmp_clone_file = os.path.join(self._cache_dir, __tmp_clone_file__)
-        self.tmp_sel_file = os.path.join(self._cache_dir, __tmp_sel_file__)
-
         client = None
         inputline = list()
 
@@ -2259,6 +2503,15 @@ class ServerCloneCommand(RdmcCommandBase):
             action="store_true",
             default=None,
         )
+        customparser.add_argument(
+            '--dryrun',
+            '--dry-run',
+            dest='dryrun',
+            help="Optionally include this flag to report the properties a load would change"\
+            " without making any changes to the server. (During load process only.)",
+            action="store_true",
+            default=None,
+        )
         customparser.add_argument(
             '--nobios',
             dest='noBIOS',
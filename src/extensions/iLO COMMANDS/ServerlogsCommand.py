@@ -31,8 +31,8 @@ import itertools
 import subprocess
 
 from argparse import ArgumentParser
-
-from six.moves import queue
+from six.moves.urllib.parse import quote
+from multiprocessing.dummy import Pool as ThreadPool
 
 import redfish.hpilo.risblobstore2 as risblobstore2
 
@@ -40,18 +40,27 @@ from redfish.ris.utils import filter_output
 
 from redfish.rest.connections import SecurityStateError
 
-from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
+from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group, \
+                        add_multiserver_arguments_group
 from rdmc_helper import ReturnCodes, InvalidCommandLineError, UI, \
                 InvalidMSCfileInputError, InvalidCommandLineErrorOPTS, InvalidFileInputError, \
                 LOGGER, InvalidCListFileError, NoContentsFoundForOperationError, \
                 IncompatibleiLOVersionError, Encryption, PartitionMoutingError, \
-                MultipleServerConfigError, UnabletoFindDriveError
+                MultipleServerConfigError, UnabletoFindDriveError, ServerPool, StreamingRequest, \
+                AtomicFileWriter
 
 if os.name == 'nt':
     import win32api
 elif sys.platform != 'darwin' and not 'VMkernel' in platform.uname():
     import pyudev
 
+#maximum number of concurrent requests used to retrieve log entries
+MAX_GET_WORKERS = 8
+#size of the chunks AHS logs are written to disk in
+AHS_CHUNK_SIZE = 1024 * 1024
+#cache folder holding the last log entry collected from each server
+__cursorfoldername__ = "serverlogs_cursors"
+
 class ServerlogsCommand(RdmcCommandBase):
     """ Download logs from the server that is currently logged in """
     def __init__(self, rdmcObj):
@@ -100,7 +109,6 @@ class ServerlogsCommand(RdmcCommandBase):
         self.selobj = rdmcObj.commands_dict["SelectCommand"](rdmcObj)
         self.logoutobj = rdmcObj.commands_dict["LogoutCommand"](rdmcObj)
         self.dontunmount = None
-        self.queue = queue.Queue()
         self.abspath = None
         self.lib = None
 
@@ -165,8 +173,16 @@ class ServerlogsCommand(RdmcCommandBase):
             self.addmaintenancelogentry(options, path=path)
         elif options.repiml:
             self.repairlogentry(options, path=path)
+        elif options.service.lower() == 'ahs':
+            self.saveahsdata(path=path, options=options)
+            return
+        elif options.filename or options.jsonlines:
+            self.streamdata(path=path, options=options)
+            return
         else:
             data = self.downloaddata(path=path, options=options)
+            if options.incremental and not data:
+                sys.stdout.write("No new log entries.\n")
 
         self.savedata(options=options, data=data)
 
@@ -203,7 +219,6 @@ class ServerlogsCommand(RdmcCommandBase):
         if not data:
             return False
 
-        processes = []
         finalreturncode = True
         outputform = '%Y-%m-%d-%H-%M-%S'
 
@@ -222,54 +237,40 @@ class ServerlogsCommand(RdmcCommandBase):
         createdir = os.path.join(dirpath, dirname)
         os.mkdir(createdir)
 
-        oofile = open(os.path.join(createdir, 'CompleteOutputfile.txt'), 'w+')
-        sys.stdout.write('Creating multiple processes to load configuration '\
-                                            'concurrently to all servers...\n')
-
-        while True:
-            if not self.queue.empty():
-                line = self.queue.get()
-            else:
-                break
-
-            finput = '\n'+ 'Output for '+ line[line.index('--url')+1]+': \n\n'
+        jobs = []
+        for line in data:
             urlvar = line[line.index('--url')+1]
             urlfilename = urlvar.split('//')[-1]
-            line[line.index('-f')+1] = str(line[line.index('-f')+1]) + urlfilename
-            listargforsubprocess = [sys.executable] + line
+            logname = line[line.index('-f')+1]
+            line[line.index('-f')+1] = str(logname) + urlfilename
+            jobs.append((urlvar, line, os.path.join(createdir, '%s_%s.txt' % \
+                                                                    (urlfilename, logname))))
 
-            if os.name is not 'nt':
-                listargforsubprocess = " ".join(listargforsubprocess)
+        pool = ServerPool(self._rdmc, workers=options.workers, timeout=options.servertimeout, \
+                                                                    retries=options.retries)
 
-            logfile = open(os.path.join(createdir, urlfilename+".txt"), "w+")
-            pinput = subprocess.Popen(listargforsubprocess, shell=True,\
-                                                stdout=logfile, stderr=logfile)
+        sys.stdout.write('Downloading logs concurrently from all servers...\n')
 
-            processes.append((pinput, finput, urlvar, logfile))
+        with open(os.path.join(createdir, 'CompleteOutputfile.txt'), 'w+') as oofile:
+            for urlvar, line, logpath, returncode in pool.run(jobs):
+                finalreturncode = finalreturncode and not returncode
 
-        for pinput, finput, urlvar, logfile in processes:
-            pinput.wait()
-            returncode = pinput.returncode
-            finalreturncode = finalreturncode and not returncode
+                with open(logpath, "r") as logfile:
+                    oofile.write('\n' + 'Output for ' + urlvar + ': \n\n' + \
+                                                                    str(logfile.read()))
+                oofile.write('-x+x-'*16)
+                oofile.flush()
 
-            logfile.close()
-            logfile = open(os.path.join(createdir, urlvar+".txt"), "r+")
-            oofile.write(finput + str(logfile.read()))
-            oofile.write('-x+x-'*16)
-            logfile.close()
-
-            if returncode == 0:
-                sys.stdout.write('Loading Configuration for {} : SUCCESS\n'.format(urlvar))
-            else:
-                sys.stdout.write('Loading Configuration for {} : FAILED\n'.format(urlvar))
-                sys.stderr.write('ILOREST return code : {}.\nFor more '\
-                         'details please check {}.txt under {} directory.\n'\
-                                        .format(returncode, urlvar, createdir))
-
-        oofile.close()
+                if returncode == 0:
+                    sys.stdout.write('Downloading logs for {} : SUCCESS\n'.format(urlvar))
+                else:
+                    sys.stdout.write('Downloading logs for {} : FAILED\n'.format(urlvar))
+                    sys.stderr.write('ILOREST return code : {}.\nFor more '\
+                             'details please check {} under {} directory.\n'\
+                                .format(returncode, os.path.basename(logpath), createdir))
 
         if finalreturncode:
-            sys.stdout.write('All servers have been successfully configured.\n')
+            sys.stdout.write('Logs have been successfully downloaded from all servers.\n')
 
         return finalreturncode
 
@@ -298,7 +299,8 @@ class ServerlogsCommand(RdmcCommandBase):
             with open(mpfile, "r") as myfile:
                 data = list()
                 cmdtorun = ['serverlogs']
-                globalargs = ['-v', '--nocache']
+                #incremental collection keeps its cursors in the cache
+                globalargs = ['-v'] if options.incremental else ['-v', '--nocache']
 
                 while True:
                     line = myfile.readline()
@@ -307,6 +309,8 @@ class ServerlogsCommand(RdmcCommandBase):
 
                     for logval in logs:
                         cmdargs = ['--selectlog='+ str(logval), '-f', str(logval)]
+                        if options.incremental and str(logval).upper() != 'AHS':
+                            cmdargs.append('--incremental')
                         if line.endswith(os.linesep):
                             line.rstrip(os.linesep)
 
@@ -318,8 +322,6 @@ class ServerlogsCommand(RdmcCommandBase):
                                                 'contents of the %s file' %mpfile)
                         else:
                             linelist = globalargs + cmdtorun + args + cmdargs
-                            line = str(line).replace("\n", "")
-                            self.queue.put(linelist)
                             data.append(linelist)
         except Exception as excp:
             LOGGER.info("%s", str(excp))
@@ -432,6 +434,31 @@ class ServerlogsCommand(RdmcCommandBase):
             bodydict["body"] = {"Action":action}
             self._rdmc.app.post_handler(path, bodydict["body"])
 
+    def expandsupported(self):
+        """Check if the service root advertises support for $expand=. on collections"""
+        try:
+            features = self._rdmc.app.current_client.root.dict['ProtocolFeaturesSupported']
+            expand = features.get('ExpandQuery', {})
+            return bool(expand.get('NoLinks') or expand.get('ExpandAll'))
+        except Exception:
+            return False
+
+    def filtersupported(self):
+        """Check if the service root advertises support for $filter"""
+        try:
+            return bool(self._rdmc.app.current_client.root.dict\
+                                                ['ProtocolFeaturesSupported']['FilterQuery'])
+        except Exception:
+            return False
+
+    def topskipsupported(self):
+        """Check if the service root advertises support for $top and $skip"""
+        try:
+            return bool(self._rdmc.app.current_client.root.dict\
+                                                ['ProtocolFeaturesSupported']['TopSkipQuery'])
+        except Exception:
+            return False
+
     def downloaddata(self, path=None, options=None):
         """Worker function to download the log files
 
@@ -440,69 +467,315 @@ class ServerlogsCommand(RdmcCommandBase):
         :param path: path to download logs
         :type path: str
         """
-        if path:
+        if path and options.service == 'AHS':
             LOGGER.info("Getting data from %s", str(path))
-            if options.service == 'AHS':
-                data = self._rdmc.app.get_handler(path, silent=True, uncache=True)
-                if data:
-                    return data.ori
-                else:
-                    raise NoContentsFoundForOperationError("Unable to retrieve AHS logs.")
+            data = self._rdmc.app.get_handler(path, silent=True, uncache=True)
+            if data:
+                return data.ori
             else:
-                data = self._rdmc.app.get_handler(path, silent=True)
+                raise NoContentsFoundForOperationError("Unable to retrieve AHS logs.")
+
+        completedatadictlist = list()
+        for page in self.getlogpages(path=path, options=options):
+            completedatadictlist.extend(page)
+
+        return completedatadictlist
+
+    def getlogpages(self, path=None, options=None):
+        """Return the pages of log entries to download, only the entries added since the
+        last collection when incremental collection is requested
+
+        :param path: path to download logs
+        :type path: str
+        :param options: command line options
+        :type options: list.
+        :returns: generator of lists of log entries
+        """
+        if options.incremental:
+            return self.iternewlogpages(path=path, cursorfile=self.getcursorfile(options))
+        return self.iterlogpages(path=path)
+
+    def iterlogpages(self, path=None, skip=0, required=True):
+        """Generator for the pages of log entries, so entries can be written out as they
+        are retrieved instead of holding the complete log in memory
+
+        :param path: path to download logs
+        :type path: str
+        :param skip: number of entries at the start of the collection to leave out
+        :type skip: int
+        :param required: raise an error if the log has no entries
+        :type required: bool
+        :returns: generator of lists of log entries
+        """
+        if not path:
+            sys.stdout.write("Path not found for input log.\n")
+            raise NoContentsFoundForOperationError("Unable to retrieve logs.")
+
+        LOGGER.info("Getting data from %s", str(path))
+        firstpath = path
+        if skip:
+            firstpath = firstpath + ('&' if '?' in firstpath else '?') + '$skip=%s' % skip
+        if not self.typepath.defs.flagforrest and self.expandsupported():
+            firstpath = firstpath + ('&' if '?' in firstpath else '?') + '$expand=.'
+        datadict = self._rdmc.app.get_handler(firstpath, silent=True, uncache=True).dict
+
+        try:
+            page = list(datadict['Items'] if 'Items' in datadict else datadict['Members'])
+        except:
+            sys.stdout.write('No data available within log.\n')
+            raise NoContentsFoundForOperationError("Unable to retrieve logs.")
+
+        if self.typepath.defs.flagforrest:
+            pages = itertools.chain([page], self.iterrestpages(path, datadict))
+        else:
+            pages = itertools.chain([page], self.iterremainingpages(path, datadict, len(page), \
+                                                                                        skip))
+
+        received = 0
+        for page in pages:
+            if not self.typepath.defs.flagforrest:
+                page = self.resolvemembers(page)
+            if page:
+                received += len(page)
+                yield page
+
+        if not received and required:
+            sys.stdout.write("No log data present.\n")
+            raise NoContentsFoundForOperationError("Unable to retrieve logs.")
+
+    def iternewlogpages(self, path=None, cursorfile=None):
+        """Generator for the pages of log entries created after the last entry recorded in
+        the cursor file, which is updated once every page has been retrieved. Only the new
+        entries are requested when the service supports $filter, or $skip for logs which
+        are appended to, otherwise paging stops once known entries are reached on logs
+        listed newest first.
+
+        :param path: path to download logs
+        :type path: str
+        :param cursorfile: file holding the last entry collected from the log
+        :type cursorfile: str
+        :returns: generator of lists of log entries
+        """
+        cursor = self.loadcursor(cursorfile, path)
+        created = cursor.get('Created')
+        knownids = set(cursor.get('Ids', []))
+        restlog = self.typepath.defs.flagforrest
+        skip = 0
+        scan = False
+
+        if created and not restlog and self.filtersupported():
+            query = '$filter=' + quote("Created ge '%s'" % created)
+            pages = self.iterlogpages(path=path + ('&' if '?' in path else '?') + query, \
+                                                                                required=False)
+        elif cursor.get('count') and not restlog and self.topskipsupported() and \
+                                                            self.lastentrymatches(path, cursor):
+            skip = cursor['count']
+            pages = self.iterlogpages(path=path, skip=skip, required=False)
+        else:
+            scan = True
+            pages = self.iterlogpages(path=path, required=False)
+
+        received = skip
+        first = last = None
+        newestfirst = stopped = False
+
+        for page in pages:
+            if first is None:
+                first = page[0]
+                newestfirst = scan and page[0].get('Created', '') > page[-1].get('Created', '')
+            last = page[-1]
+            received += len(page)
+
+            newentries = [entry for entry in page if not created or \
+                    entry.get('Created', '') > created or (entry.get('Created') == created \
+                                                    and entry.get('Id') not in knownids)]
+
+            for entry in newentries:
+                if entry.get('Created', '') > cursor.get('Created', ''):
+                    cursor['Created'] = entry['Created']
+                    cursor['Ids'] = [entry.get('Id')]
+                elif entry.get('Created') and entry['Created'] == cursor.get('Created'):
+                    cursor['Ids'].append(entry.get('Id'))
+
+            if newentries:
+                yield newentries
+
+            if newestfirst and len(newentries) < len(page):
+                stopped = True
+                break
+
+        #$skip can only resume logs which are appended to in order
+        if last is not None and (scan or skip) and not stopped and not newestfirst:
+            cursor['count'] = received
+            cursor['Id'] = last.get('Id')
+        elif scan:
+            cursor.pop('count', None)
+            cursor.pop('Id', None)
+
+        self.savecursor(cursorfile, cursor)
+
+    def lastentrymatches(self, path, cursor):
+        """Check that the last entry collected is still at the same position in the log, so
+        the entries after it can be requested with $skip
+
+        :param path: path of the log entries collection
+        :type path: str
+        :param cursor: last entry collected from the log
+        :type cursor: dict
+        :returns: True if the log has only been appended to since the last collection
+        """
+        query = '%s$skip=%s&$top=1' % (path + ('&' if '?' in path else '?'), cursor['count'] - 1)
+        try:
+            members = self._rdmc.app.get_handler(query, silent=True, uncache=True).dict\
+                                                                            .get('Members', [])
+            members = self.resolvemembers(list(members))
+        except Exception:
+            return False
+
+        return bool(members) and members[0].get('Id') == cursor.get('Id')
+
+    def getcursorfile(self, options):
+        """Return the cache file holding the last entry collected from the selected log of
+        the current server
+
+        :param options: command line options
+        :type options: list.
+        :returns: path of the cursor file
+        """
+        if self._rdmc.opts.nocache:
+            raise InvalidCommandLineError("Incremental log collection requires the cache, "\
+                                                            "please remove the --nocache flag.")
+
+        server = self._rdmc.app.current_client.base_url
+        filename = ''.join(char if char.isalnum() or char in '-.' else '_' for char in \
+                                            '%s_%s' % (server, options.service.upper()))
+
+        return os.path.join(self._rdmc.app.config.get_cachedir(), __cursorfoldername__, \
+                                                                        filename + '.json')
+
+    def loadcursor(self, cursorfile, path):
+        """Load the last entry collected from a log
+
+        :param cursorfile: file holding the last entry collected from the log
+        :type cursorfile: str
+        :param path: path of the log entries collection
+        :type path: str
+        :returns: cursor dictionary, empty if the log has not been collected before
+        """
+        try:
+            with open(cursorfile, 'r') as cfile:
+                cursor = json.load(cfile)
+        except (IOError, OSError, ValueError):
+            cursor = None
+
+        if not isinstance(cursor, dict) or cursor.get('path') != path:
+            cursor = {'path': path}
 
-            datadict = data.dict
+        return cursor
+
+    def savecursor(self, cursorfile, cursor):
+        """Save the last entry collected from a log
+
+        :param cursorfile: file holding the last entry collected from the log
+        :type cursorfile: str
+        :param cursor: cursor dictionary
+        :type cursor: dict
+        """
+        if not os.path.isdir(os.path.dirname(cursorfile)):
+            os.makedirs(os.path.dirname(cursorfile))
+
+        with open(cursorfile, 'w') as cfile:
+            json.dump(cursor, cfile)
+
+    def iterrestpages(self, path, datadict):
+        """Generator for the log entries left out of the first page of a legacy REST log
+
+        :param path: path of the log entries collection
+        :type path: str
+        :param datadict: first response of the collection
+        :type datadict: dict
+        :returns: generator of lists of log entries
+        """
+        while 'links' in datadict and 'NextPage' in datadict['links']:
+            next_link_uri = path + '?page=' + str(datadict['links']['NextPage']['page'])
+            datadict = self._rdmc.app.get_handler(next_link_uri, silent=True, uncache=True).dict
 
             try:
-                completedatadictlist = datadict['Items'] if 'Items' in\
-                                            datadict else datadict['Members']
-            except:
+                yield datadict['Items']
+            except KeyError:
                 sys.stdout.write('No data available within log.\n')
                 raise NoContentsFoundForOperationError("Unable to retrieve logs.")
 
-            if self.typepath.defs.flagforrest:
-                morepages = True
+    def iterremainingpages(self, path, datadict, received, skip=0):
+        """Generator for the log entries left out of the first response of a collection,
+        following the next links or requesting the remaining pages with $skip/$top
 
-                while morepages:
-                    if 'links' in datadict and 'NextPage' in datadict['links']:
-                        next_link_uri = path + '?page=' + \
-                                    str(datadict['links']['NextPage']['page'])
+        :param path: path of the log entries collection
+        :type path: str
+        :param datadict: first response of the collection
+        :type datadict: dict
+        :param received: number of entries in the first response
+        :type received: int
+        :param skip: number of entries left out before the first response
+        :type skip: int
+        :returns: generator of lists of log entries
+        """
+        if 'Members@odata.nextLink' in datadict:
+            while 'Members@odata.nextLink' in datadict:
+                datadict = self._rdmc.app.get_handler(datadict['Members@odata.nextLink'], \
+                                                    silent=True, uncache=True).dict
+                yield datadict.get('Members', [])
+        elif received and datadict.get('Members@odata.count', 0) > skip + received and \
+                                                                    self.topskipsupported():
+            path = path + ('&' if '?' in path else '?')
+            pages = ['%s$skip=%s&$top=%s' % (path, start, received) for start in \
+                            range(skip + received, datadict['Members@odata.count'], received)]
+
+            #only one batch of pages is held in memory at a time
+            for batch in range(0, len(pages), MAX_GET_WORKERS):
+                for page in self.getmembers(pages[batch:batch + MAX_GET_WORKERS]):
+                    yield page.get('Members', [])
+
+    def resolvemembers(self, members):
+        """Replace the members of a page which are only links with the resources they
+        point to
+
+        :param members: list of log entries
+        :type members: list
+        :returns: list of log entries
+        """
+        linkindexes = [index for index, member in enumerate(members) if len(member.keys()) == 1]
+        memberpaths = [members[index][self.typepath.defs.hrefstring] for index in linkindexes]
 
-                        href = '%s' % next_link_uri
-                        data = self._rdmc.app.get_handler(href, silent=True)
-                        datadict = data.dict
+        for index, member in zip(linkindexes, self.getmembers(memberpaths)):
+            members[index] = member
 
-                        try:
-                            completedatadictlist = completedatadictlist + datadict['Items']
-                        except:
-                            sys.stdout.write('No data available within log.\n')
-                            raise NoContentsFoundForOperationError("Unable to retrieve logs.")
-                    else:
-                        morepages = False
-            else:
-                datadict = list()
+        return members
 
-                for members in completedatadictlist:
-                    if len(members.keys()) == 1:
-                        memberpath = members[self.typepath.defs.hrefstring]
-                        data = self._rdmc.app.get_handler(memberpath, silent=True)
-                        datadict = datadict+[data.dict]
-                    else:
-                        datadict = datadict + [members]
-                completedatadictlist = datadict
-
-            if completedatadictlist:
-                try:
-                    return completedatadictlist
-                except Exception:
-                    sys.stdout.write("Could not get the data from server.\n")
-                    raise NoContentsFoundForOperationError("Unable to retrieve logs.")
-            else:
-                sys.stdout.write("No log data present.\n")
-                raise NoContentsFoundForOperationError("Unable to retrieve logs.")
-        else:
-            sys.stdout.write("Path not found for input log.\n")
-            raise NoContentsFoundForOperationError("Unable to retrieve logs.")
+    def getmembers(self, paths):
+        """Retrieve resources concurrently with a bounded pool of threads. In-band
+        (blobstore) connections share a single channel, so they are retrieved one at a time.
+
+        :param paths: list of resource paths
+        :type paths: list
+        :returns: list of resource dictionaries in the same order as the paths
+        """
+        if not paths:
+            return []
+
+        def getmember(memberpath):
+            """Retrieve a single resource without adding it to the cache"""
+            return self._rdmc.app.get_handler(memberpath, silent=True, uncache=True).dict
+
+        if not StreamingRequest.available(self._rdmc.app.current_client):
+            return [getmember(memberpath) for memberpath in paths]
+
+        pool = ThreadPool(min(MAX_GET_WORKERS, len(paths)))
+        try:
+            return pool.map(getmember, paths)
+        finally:
+            pool.close()
+            pool.join()
 
     def returnimlpath(self, options=None):
         """Return the requested path of the IML logs
@@ -756,15 +1029,124 @@ class ServerlogsCommand(RdmcCommandBase):
             elif options.filename:
                 with open(options.filename[0], 'w') as foutput:
                     if options.json:
-                        foutput.write(str(json.dumps(data, indent=2, sort_keys=True)))
+                        UI().write_json(data, foutput, indent=2, sort_keys=True)
                     else:
-                        foutput.write(str(json.dumps(data)))
+                        UI().write_json(data, foutput)
             else:
                 if options.json:
                     UI().print_out_json(data)
                 else:
                     UI().print_out_human_readable(data)
 
+    def streamdata(self, path=None, options=None):
+        """Write logs to the specified file, or as JSON Lines to the console, one page at
+        a time as the entries are retrieved. The file is only replaced once every entry
+        is written; on the console a failure still closes the JSON array.
+
+        :param path: path to download logs
+        :type path: str
+        :param options: command line options
+        :type options: list.
+        """
+        LOGGER.info("Saving/Writing data...")
+        tofilter = self.parsefilter(options.filter) if options.filter else None
+        foutput = None
+        written = 0
+        completed = False
+
+        try:
+            for page in self.getlogpages(path=path, options=options):
+                if tofilter:
+                    page = filter_output(page, tofilter[0], tofilter[1])
+
+                for entry in page:
+                    if foutput is None:
+                        foutput = AtomicFileWriter(options.filename[0]) if \
+                                                        options.filename else sys.stdout
+                        if not options.jsonlines:
+                            foutput.write('[\n' if options.json else '[')
+                    elif not options.jsonlines:
+                        foutput.write(',\n' if options.json else ', ')
+
+                    if options.jsonlines:
+                        UI().print_out_json_lines(entry, foutput)
+                    elif options.json:
+                        #strip the enclosing brackets to keep the indentation of a full list
+                        foutput.write(str(json.dumps([entry], indent=2, sort_keys=True)[2:-2]))
+                    else:
+                        foutput.write(str(json.dumps(entry)))
+                    written += 1
+
+            if not written and not options.incremental:
+                raise NoContentsFoundForOperationError("Filter returned no matches.")
+            elif not written:
+                if options.filename or not options.jsonlines:
+                    sys.stdout.write("No new log entries.\n")
+                if options.filename:
+                    foutput = AtomicFileWriter(options.filename[0])
+                    if not options.jsonlines:
+                        foutput.write('[]')
+            elif not options.jsonlines:
+                foutput.write('\n]' if options.json else ']')
+            completed = True
+        finally:
+            if foutput is sys.stdout:
+                if not completed and not options.jsonlines:
+                    foutput.write('\n]\n' if options.json else ']\n')
+            elif foutput is not None:
+                if completed:
+                    foutput.commit()
+                else:
+                    foutput.discard()
+
+    def saveahsdata(self, path=None, options=None):
+        """Write AHS logs to disk in chunks as they are received
+
+        :param path: path to download logs
+        :type path: str
+        :param options: command line options
+        :type options: list.
+        """
+        response = self.getstream(path)
+
+        if response is None:
+            data = self.downloaddata(path=path, options=options)
+            self.savedata(options=options, data=data)
+            return
+
+        try:
+            if response.status != 200:
+                raise NoContentsFoundForOperationError("Unable to retrieve AHS logs.")
+
+            LOGGER.info("Saving/Writing data...")
+            foutput = AtomicFileWriter(self.getahsfilename(options), 'wb')
+            completed = False
+            try:
+                for chunk in response.stream(AHS_CHUNK_SIZE):
+                    foutput.write(chunk)
+                foutput.commit()
+                completed = True
+            finally:
+                if not completed:
+                    foutput.discard()
+        finally:
+            response.release_conn()
+
+    def getstream(self, path):
+        """Request a path without reading the response body into memory
+
+        :param path: path to download
+        :type path: str
+        :returns: unread urllib3 response, or None if the current connection can only
+                  return complete responses
+        """
+        client = self._rdmc.app.current_client
+        if not path or not StreamingRequest.available(client):
+            return None
+
+        LOGGER.info("Streaming data from %s", str(path))
+        return StreamingRequest.send(client, 'GET', path)
+
     def downloadahslocally(self, options=None):
         """Download AHS logs locally
 
@@ -1127,20 +1509,7 @@ class ServerlogsCommand(RdmcCommandBase):
         """
         LOGGER.info("Filtering logs based on requsted options.")
         if tofilter and data:
-            try:
-                if (str(tofilter)[0] == str(tofilter)[-1])\
-                                    and str(tofilter).startswith(("'", '"')):
-                    tofilter = tofilter[1:-1]
-
-                (sel, val) = tofilter.split('=')
-                sel = sel.strip()
-                val = val.strip()
-
-                if val.lower() == "true" or val.lower() == "false":
-                    val = val.lower() in ("yes", "true", "t", "1")
-            except:
-                raise InvalidCommandLineError("Invalid filter" \
-                  " parameter format [filter_attribute]=[filter_value]")
+            (sel, val) = self.parsefilter(tofilter)
 
             data = filter_output(data, sel, val)
             if not data:
@@ -1148,6 +1517,30 @@ class ServerlogsCommand(RdmcCommandBase):
 
         return data
 
+    def parsefilter(self, tofilter):
+        """Split the filter option into its attribute and value
+
+        :param tofilter: command line filter option
+        :type tofilter: str
+        :returns: tuple of the filter attribute and value
+        """
+        try:
+            if (str(tofilter)[0] == str(tofilter)[-1])\
+                                and str(tofilter).startswith(("'", '"')):
+                tofilter = tofilter[1:-1]
+
+            (sel, val) = tofilter.split('=')
+            sel = sel.strip()
+            val = val.strip()
+
+            if val.lower() == "true" or val.lower() == "false":
+                val = val.lower() in ("yes", "true", "t", "1")
+        except:
+            raise InvalidCommandLineError("Invalid filter" \
+              " parameter format [filter_attribute]=[filter_value]")
+
+        return (sel, val)
+
     def getahsfilename(self, options):
         """Create a default name if no ahsfilename is passed
 
@@ -1236,6 +1629,7 @@ class ServerlogsCommand(RdmcCommandBase):
             return
 
         add_login_arguments_group(customparser)
+        add_multiserver_arguments_group(customparser)
 
         customparser.add_argument(
             '-f',
@@ -1348,3 +1742,22 @@ class ServerlogsCommand(RdmcCommandBase):
             " structure makes the information easier to parse.",
             default=False
         )
+        customparser.add_argument(
+            '--jsonlines',
+            dest='jsonlines',
+            action="store_true",
+            help="Optionally include this flag if you wish to write the log"\
+            " entries in JSON Lines format, one entry per line, as they are"\
+            " retrieved from the server.",
+            default=False
+        )
+        customparser.add_argument(
+            '--incremental',
+            dest='incremental',
+            action="store_true",
+            help="Optionally include this flag if you wish to only download"\
+            " the log entries created since the last time the log was"\
+            " downloaded from this server with this flag. The last entry"\
+            " downloaded is kept in the cache directory.",
+            default=False
+        )
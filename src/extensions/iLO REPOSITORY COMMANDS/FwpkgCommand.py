@@ -20,17 +20,24 @@
 import os
 import sys
 import json
+import time
+import errno
 import shutil
+import hashlib
 import zipfile
 import tempfile
+import threading
 
 from argparse import ArgumentParser
+from collections import OrderedDict
 
-from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
+from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group, \
+                        add_multiserver_arguments_group
 
 from rdmc_helper import IncompatibleiLOVersionError, ReturnCodes, Encryption, \
                         InvalidCommandLineErrorOPTS, InvalidCommandLineError,\
-                        InvalidFileInputError, UploadError, TaskQueueError, FirmwareUpdateError
+                        InvalidFileInputError, UploadError, TaskQueueError, \
+                        FirmwareUpdateError, MultipleServerConfigError, ServerPool
 
 def _get_comp_type(payload):
     """ Get's the component type and returns it
@@ -61,6 +68,136 @@ def _get_comp_type(payload):
 
     return ctype
 
+#maximum size of the extracted packages kept in the cache directory
+FWPKG_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+#cache folder holding the extracted packages, one folder per package SHA-256
+__fwpkgcachefolder__ = "fwpkg"
+
+#package digests by path, so concurrent flashes of one package read it only once
+_DIGESTS = dict()
+#lock of each package path, held while its digest is computed
+_DIGEST_LOCKS = dict()
+_CACHE_LOCK = threading.Lock()
+
+def _get_pkg_digest(pkgfile):
+    """ Get's the SHA-256 of a package, reusing it while the file is unchanged
+
+    :param pkgfile: Location of the .fwpkg file
+    :type pkgfile: string.
+    :returns: returns the hex digest of the package
+    :rtype: string
+    """
+    pkgfile = os.path.abspath(pkgfile)
+    with _CACHE_LOCK:
+        lock = _DIGEST_LOCKS.setdefault(pkgfile, threading.Lock())
+
+    with lock:
+        stat = os.stat(pkgfile)
+        key = (stat.st_mtime, stat.st_size)
+
+        if pkgfile in _DIGESTS and _DIGESTS[pkgfile][0] == key:
+            return _DIGESTS[pkgfile][1]
+
+        sha = hashlib.sha256()
+        with open(pkgfile, 'rb') as pfile:
+            for block in iter(lambda: pfile.read(1024 * 1024), b''):
+                sha.update(block)
+
+        _DIGESTS[pkgfile] = (key, sha.hexdigest())
+        return _DIGESTS[pkgfile][1]
+
+def _extract_pkg(pkgfile, entry):
+    """ Extract the images referenced by payload.json, with their signatures, into a
+    cache entry. Type C packages are uploaded whole, so the package itself is kept.
+
+    :param pkgfile: Location of the .fwpkg file
+    :type pkgfile: string.
+    :param entry: cache entry directory
+    :type entry: string.
+    :returns: returns the image file names and type of component
+    :rtype: list, string
+    """
+    tempdir = tempfile.mkdtemp(dir=os.path.dirname(entry))
+
+    try:
+        try:
+            zfile = zipfile.ZipFile(pkgfile)
+        except Exception as excp:
+            raise InvalidFileInputError("Unable to unpack file. " + str(excp))
+
+        try:
+            try:
+                payloaddata = json.loads(zfile.read('payload.json'))
+            except KeyError:
+                raise InvalidFileInputError("Unable to find payload.json in fwpkg file.")
+
+            comptype = _get_comp_type(payloaddata)
+            imagefiles = []
+
+            if comptype == 'C':
+                imagefiles = [os.path.split(pkgfile)[1][:-6] + '.zip']
+                shutil.copy(pkgfile, os.path.join(tempdir, imagefiles[0]))
+            else:
+                for device in payloaddata['Devices']['Device']:
+                    for firmwareimage in device['FirmwareImages']:
+                        if firmwareimage['FileName'] not in imagefiles:
+                            imagefiles.append(firmwareimage['FileName'])
+
+                names = zfile.namelist()
+                for imagefile in imagefiles:
+                    sigprefix = imagefile[:imagefile.rfind('.')] if '.' in imagefile \
+                                                                            else imagefile
+                    members = [name for name in names if name == imagefile or \
+                                (name.startswith(sigprefix) and name.endswith('.compsig'))]
+                    if imagefile not in members:
+                        raise InvalidFileInputError("Unable to find %s in fwpkg file." % \
+                                                                                    imagefile)
+                    for member in members:
+                        zfile.extract(member, tempdir)
+        finally:
+            zfile.close()
+
+        with open(os.path.join(tempdir, 'fwpkg.json'), 'w') as mfile:
+            json.dump({'imagefiles': imagefiles, 'comptype': comptype}, mfile)
+
+        try:
+            os.rename(tempdir, entry)
+        except OSError:
+            #another process extracted the same package first
+            if not os.path.isdir(entry):
+                raise
+            shutil.rmtree(tempdir)
+    except Exception:
+        shutil.rmtree(tempdir, ignore_errors=True)
+        raise
+
+    return imagefiles, comptype
+
+def _evict_pkgs(cachedir, keep):
+    """ Remove the least recently used packages until the cache fits FWPKG_CACHE_SIZE
+
+    :param cachedir: package cache directory
+    :type cachedir: string.
+    :param keep: cache entry in use, which is never removed
+    :type keep: string.
+    """
+    entries = []
+    for name in os.listdir(cachedir):
+        entry = os.path.join(cachedir, name)
+        if not os.path.isdir(entry) or not os.path.isfile(os.path.join(entry, 'fwpkg.json')):
+            continue
+        size = sum(os.path.getsize(os.path.join(root, fname)) for root, _, files in \
+                                                        os.walk(entry) for fname in files)
+        entries.append((os.path.getmtime(entry), size, entry))
+
+    total = sum(entry[1] for entry in entries)
+    for _, size, entry in sorted(entries):
+        if total <= FWPKG_CACHE_SIZE:
+            break
+        if entry != keep:
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
 class FwpkgCommand(RdmcCommandBase):
     """ Fwpkg command class """
     def __init__(self, rdmcObj):
@@ -71,7 +208,12 @@ class FwpkgCommand(RdmcCommandBase):
               'queue to flash.\n\texample: flashfwpkg component.fwpkg.\n\n\t'
               'Skip extra checks before adding taskqueue. (Useful when adding '
               'many flashfwpkg taskqueue items in sequence.)\n\texample: fwpkg '\
-              'component.fwpkg --ignorechecks',\
+              'component.fwpkg --ignorechecks\n\n\tFlash the firmware on multiple servers '\
+              'concurrently,\n\twith a log per server plus progress.jsonl and manifest.json'\
+              '\n\texample: flashfwpkg component.fwpkg --mpfile mpfilename.txt -o '\
+              'outputdirectory\n\n\tNote: multiple server file format (1 server per new '\
+              'line)\n\t--url <iLO url/hostname> -u admin -p password\n\t--url <iLO '\
+              'url/hostname> -u admin -p password',\
             summary='Flashes fwpkg components using the iLO repository.',\
             aliases=['Fwpkg'], \
             argparser=ArgumentParser())
@@ -98,6 +240,14 @@ class FwpkgCommand(RdmcCommandBase):
             else:
                 raise InvalidCommandLineErrorOPTS("")
 
+        if options.mpfilename:
+            if not len(args) == 1:
+                raise InvalidCommandLineError("Fwpkg command only takes one argument.")
+            sys.stdout.write("Flashing firmware on multiple servers...\n")
+            if self.flashmpfunc(options, args[0]):
+                return ReturnCodes.SUCCESS
+            raise MultipleServerConfigError("One or more servers failed to flash the firmware.")
+
         self.fwpkgvalidation(options)
 
         if self.typepath.defs.isgen9:
@@ -110,7 +260,6 @@ class FwpkgCommand(RdmcCommandBase):
         if self._rdmc.app.getiloversion() <= 5.120 and args[0].lower().startswith('iegen10'):
             raise IncompatibleiLOVersionError('Please upgrade to iLO 5 1.20 or '\
                        'greater to ensure correct flash of this firmware.')
-        tempdir = ''
         if not args[0].endswith('.fwpkg'):
             InvalidFileInputError("Invalid file type. Please make sure the file "\
                                   "provided is a valid .fwpkg file type.")
@@ -141,12 +290,69 @@ class FwpkgCommand(RdmcCommandBase):
                 message = "This firmware is set to flash on reboot.\n"
             sys.stdout.write(message)
         finally:
-            if tempdir:
-                shutil.rmtree(tempdir)
             if 'ilo' in args[0].lower():
                 self.logoutobj.run("")
         return ReturnCodes.SUCCESS
 
+    def flashmpfunc(self, options, pkgfile):
+        """ Upload and flash the fwpkg file on every server in the multiple server file
+        concurrently, recording the progress of each server as JSON Lines
+
+        :param options: command line options
+        :type options: list.
+        :param pkgfile: Location of the .fwpkg file
+        :type pkgfile: string.
+        :returns: returns True if every server was flashed
+        """
+        if not pkgfile.endswith('.fwpkg') or not os.path.isfile(pkgfile):
+            raise InvalidFileInputError("Invalid file type. Please make sure the file "\
+                                  "provided is a valid .fwpkg file type.")
+
+        outputdir = options.outdirectory if options.outdirectory else os.getcwd()
+        if outputdir.endswith(('"', "'")) and outputdir.startswith(('"', "'")):
+            outputdir = outputdir[1:-1]
+
+        if not os.path.isdir(outputdir):
+            raise InvalidCommandLineError("The given output folder path does not exist.")
+
+        servers = ServerPool.readmpfile(options.mpfilename)
+
+        flashargs = [os.path.abspath(pkgfile)]
+        for flag, value in (('--forceupload', options.forceupload), ('--ignorechecks', \
+                                            options.ignore), ('--tpmover', options.tover)):
+            if value:
+                flashargs.append(flag)
+
+        jobs = []
+        for name, args in servers:
+            jobs.append((name, ['--nocache', 'flashfwpkg'] + flashargs + args, \
+                                                        os.path.join(outputdir, name+'.log')))
+
+        lock = threading.Lock()
+        console = sys.stdout
+        progressfile = open(os.path.join(outputdir, 'progress.jsonl'), 'w')
+
+        def progress(server, **event):
+            """ Record a progress event of a server """
+            event = OrderedDict([('time', round(time.time(), 2)), ('server', server)] + \
+                                                                    sorted(event.items()))
+            with lock:
+                progressfile.write(json.dumps(event) + '\n')
+                progressfile.flush()
+                if options.json:
+                    console.write(json.dumps(event) + '\n')
+
+        pool = ServerPool(self._rdmc, workers=options.workers, timeout=options.servertimeout, \
+                                                    retries=options.retries, progress=progress)
+
+        try:
+            manifest = pool.runmanifest(jobs, outputdir, 'Flashing firmware on', \
+                                                                        quiet=options.json)
+        finally:
+            progressfile.close()
+
+        return all(not entry['returncode'] for entry in manifest)
+
     def taskqueuecheck(self):
         """ Check taskqueue for potential issues before starting """
 
@@ -183,7 +389,8 @@ class FwpkgCommand(RdmcCommandBase):
 
     @staticmethod
     def preparefwpkg(self, pkgfile):
-        """ Prepare fwpkg file for flashing
+        """ Prepare fwpkg file for flashing. Packages are extracted once into a cache
+        folder named by their SHA-256 and reused until evicted.
 
         :param pkgfile: Location of the .fwpkg file
         :type pkgfile: string.
@@ -191,60 +398,36 @@ class FwpkgCommand(RdmcCommandBase):
                                                             in, and type of file.
         :rtype: string, string, string
         """
-        files = []
-        imagefiles = []
-        payloaddata = None
-        tempdir = tempfile.mkdtemp()
-
         try:
-            zfile = zipfile.ZipFile(pkgfile)
-            zfile.extractall(tempdir)
-            zfile.close()
-        except Exception as excp:
+            digest = _get_pkg_digest(pkgfile)
+        except (IOError, OSError) as excp:
             raise InvalidFileInputError("Unable to unpack file. " + str(excp))
 
-        files = os.listdir(tempdir)
+        cachedir = os.path.join(self._rdmc.app.config.get_cachedir() or \
+                    os.path.join(self._rdmc.opts.config_dir, 'cache'), __fwpkgcachefolder__)
+        entry = os.path.join(cachedir, digest)
 
-        if 'payload.json' in files:
-            with open(os.path.join(tempdir, 'payload.json'), "r") as pfile:
-                data = pfile.read()
-            payloaddata = json.loads(data)
-        else:
-            raise InvalidFileInputError("Unable to find payload.json in fwpkg file.")
+        with _CACHE_LOCK:
+            try:
+                os.makedirs(cachedir)
+            except OSError as excp:
+                if excp.errno != errno.EEXIST:
+                    raise
 
-        comptype = _get_comp_type(payloaddata)
+            try:
+                with open(os.path.join(entry, 'fwpkg.json'), 'r') as mfile:
+                    manifest = json.load(mfile)
+                imagefiles, comptype = manifest['imagefiles'], manifest['comptype']
+                os.utime(entry, None)
+            except (IOError, OSError, ValueError, KeyError):
+                shutil.rmtree(entry, ignore_errors=True)
+                imagefiles, comptype = _extract_pkg(pkgfile, entry)
+                _evict_pkgs(cachedir, entry)
 
         if comptype == 'C':
-            imagefiles = [self.type_c_change(tempdir, pkgfile)]
-        else:
-            for device in payloaddata['Devices']['Device']:
-                for firmwareimage in device['FirmwareImages']:
-                    if firmwareimage['FileName'] not in imagefiles:
-                        imagefiles.append(firmwareimage['FileName'])
-
-        return imagefiles, tempdir, comptype
-
-    def type_c_change(self, tdir, pkgloc):
-        """ Special changes for type C
+            imagefiles = [os.path.join(entry, imagefile) for imagefile in imagefiles]
 
-        :param tempdir: path to temp directory
-        :type tempdir: string.
-        :param components: components to upload
-        :type components: list.
-
-        :returns: The location of the type C file to upload
-        :rtype: string.
-        """
-
-        shutil.copy(pkgloc, tdir)
-
-        fwpkgfile = os.path.split(pkgloc)[1]
-        zfile = fwpkgfile[:-6] + '.zip'
-        zipfileloc = os.path.join(tdir, zfile)
-
-        os.rename(os.path.join(tdir, fwpkgfile), zipfileloc)
-
-        return zipfileloc
+        return imagefiles, entry, comptype
 
     def applyfwpkg(self, options, tempdir, components, comptype):
         """ Apply the component to iLO
@@ -274,6 +457,7 @@ class FwpkgCommand(RdmcCommandBase):
                 uploadcommand += ' --update_target --update_repository'
 
             sys.stdout.write("Uploading firmware: %s\n" % os.path.basename(component))
+            self._rdmc.reportprogress(event='component', component=os.path.basename(component))
             try:
                 self.uploadobj.run(uploadcommand)
             except UploadError:
@@ -354,6 +538,7 @@ class FwpkgCommand(RdmcCommandBase):
             return
 
         add_login_arguments_group(customparser)
+        add_multiserver_arguments_group(customparser)
 
         customparser.add_argument(
             '--forceupload',
@@ -379,3 +564,27 @@ class FwpkgCommand(RdmcCommandBase):
             "associated flash operations",
             default=False
         )
+        customparser.add_argument(
+            '--mpfile',
+            dest='mpfilename',
+            help="Optionally use the provided filename to obtain server information and "\
+            "flash the firmware on every server concurrently.",
+            default=None,
+        )
+        customparser.add_argument(
+            '-o',
+            '--outputdirectory',
+            '--outdir',
+            dest='outdirectory',
+            help="use the provided directory to output data for multiple server flashes.",
+            default=None,
+        )
+        customparser.add_argument(
+            '-j',
+            '--json',
+            dest='json',
+            action="store_true",
+            help="Optionally include this flag to write the progress of multiple server "\
+            "flashes to the console as JSON Lines instead of a summary per server.",
+            default=False
+        )
@@ -28,7 +28,7 @@ from redfish.ris.rmc_helper import IdTokenError
 from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
 from rdmc_helper import IncompatibleiLOVersionError, ReturnCodes, NoContentsFoundForOperationError,\
                         InvalidCommandLineErrorOPTS, InvalidCommandLineError, Encryption, \
-                        TaskQueueError
+                        TaskQueueError, TimeOutError, ProgressTracker
 
 class UpdateTaskQueueCommand(RdmcCommandBase):
     """ Main download command class """
@@ -45,7 +45,8 @@ class UpdateTaskQueueCommand(RdmcCommandBase):
               ' tasks at once.\n\texample: taskqueue create 30 compname.exe compname2.exe '\
               'reboot\n\n\tDelete all tasks from update task queue.\n\texample: taskqueue '\
               '--resetqueue\n\n\tRemove all finished or errored tasks, leaving '\
-              'pending.\n\texample: taskqueue --cleanqueue',\
+              'pending.\n\texample: taskqueue --cleanqueue\n\n\tWait for the tasks in the '\
+              'queue to finish.\n\texample: taskqueue create compname.exe --wait',\
             summary='Manages the update task queue for iLO.',\
             aliases=['Taskqueue'], \
             argparser=ArgumentParser())
@@ -86,6 +87,9 @@ class UpdateTaskQueueCommand(RdmcCommandBase):
         else:
             raise InvalidCommandLineError('Invalid command entered.')
 
+        if options.wait:
+            self.waitforqueue(options.wait)
+
         return ReturnCodes.SUCCESS
 
     def resetqueue(self):
@@ -185,6 +189,44 @@ class UpdateTaskQueueCommand(RdmcCommandBase):
 
             self._rdmc.app.post_handler(path, newtask)
 
+    def waitforqueue(self, timeout):
+        """ Waits for every task in the update task queue to finish
+
+        :param timeout: seconds to wait without a task changing state
+        :type timeout: int.
+        """
+        laststates = dict()
+
+        def getstates():
+            """ Return the name and state of every task """
+            tasks = self._rdmc.app.getcollectionmembers(\
+                                        '/redfish/v1/UpdateService/UpdateTaskQueue/')
+            return tuple((task['Name'], task['State']) for task in tasks)
+
+        def finished(states):
+            """ Check that no task is left to run """
+            return all(state in ('Complete', 'Exception') for _, state in states)
+
+        def showstates(states):
+            """ Show the tasks which changed state """
+            for name, state in states:
+                if laststates.get(name) != state:
+                    sys.stdout.write('Task %s: %s\n' % (name.encode("ascii", "ignore"), state))
+                    self._rdmc.reportprogress(event='task', task=name, state=state)
+            laststates.clear()
+            laststates.update(states)
+
+        sys.stdout.write('Waiting for the update tasks to finish...\n')
+        tracker = ProgressTracker(self._rdmc, getstates, finished, callback=showstates, \
+                                                                            maximum=30)
+        states = tracker.wait(timeout=timeout)
+
+        if not finished(states):
+            raise TimeOutError("Update tasks have not changed state in %s seconds." % timeout)
+        if any(state == 'Exception' for _, state in states):
+            raise TaskQueueError("One or more update tasks failed. Please run iLOrest "\
+                                 "command: taskqueue to check the state of the tasks.")
+
     def printqueue(self, options):
         """ Prints the update task queue
 
@@ -305,3 +347,15 @@ class UpdateTaskQueueCommand(RdmcCommandBase):
             "associated flash operations",
             default=False
         )
+        customparser.add_argument(
+            '--wait',
+            dest='wait',
+            type=int,
+            nargs='?',
+            const=600,
+            metavar='SECONDS',
+            help="Optionally include this flag to wait for every task in the queue"\
+            " to finish. The wait is abandoned if no task changes state in the given"\
+            " number of seconds (default 600).",
+            default=None
+        )
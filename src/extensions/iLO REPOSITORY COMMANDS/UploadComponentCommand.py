@@ -21,6 +21,8 @@ import os
 import sys
 import json
 import time
+import uuid
+import hashlib
 
 import shutil
 
@@ -31,6 +33,7 @@ from argparse import ArgumentParser
 import ctypes
 from ctypes import c_char_p, c_int, c_uint32
 
+import six
 from six.moves import input
 
 import redfish.hpilo.risblobstore2 as risblobstore2
@@ -38,8 +41,15 @@ from redfish.ris.rmc_helper import InvalidPathError
 
 from rdmc_base_classes import RdmcCommandBase, add_login_arguments_group
 from rdmc_helper import ReturnCodes, InvalidCommandLineErrorOPTS, Encryption, UploadError, \
-            InvalidCommandLineError, IncompatibleiLOVersionError, TimeOutError
+            InvalidCommandLineError, IncompatibleiLOVersionError, TimeOutError, \
+            InvalidFileInputError, ProgressTracker, StreamingRequest
 
+#maximum size of a single component section accepted by the iLO Repository
+MAX_COMP_SIZE = 32 * 1024 * 1024
+#size of the blocks component files are read from disk in
+READ_BLOCK_SIZE = 1024 * 1024
+#SHA-256 fields reported for repository components by newer iLO firmware
+REPOSITORY_HASH_FIELDS = ('Sha256', 'SHA256')
 
 def human_readable_time(seconds):
     """ Returns human readable time
@@ -55,6 +65,121 @@ def human_readable_time(seconds):
 
     return str(hours) + " hour(s) " + str(minutes) + \
             " minute(s) " + str(seconds) + " second(s) "
+
+class MultipartFileStream(object):
+    """ File-like multipart/form-data body which reads file sections from disk as the
+    body is sent, so only one block of a component is held in memory at a time. The body
+    supports tell and seek, which urllib3 uses to rewind it when a request is retried.
+
+    :param fields: list of (name, value) tuples. Values are either a string, or a
+                   (filename, path, offset, length) tuple for a section of a file.
+    :type fields: list.
+    """
+    def __init__(self, fields):
+        self.boundary = uuid.uuid4().hex
+        self._parts = []
+        self._current = None
+        self._index = 0
+        self._offset = 0
+        self._position = 0
+
+        for name, value in fields:
+            if isinstance(value, tuple):
+                filename, path, offset, length = value
+                header = '--%s\r\nContent-Disposition: form-data; name="%s"; ' \
+                        'filename="%s"\r\nContent-Type: application/octet-stream\r\n\r\n' \
+                                                            % (self.boundary, name, filename)
+                self._parts.extend([header.encode('utf-8'), (path, offset, length), b'\r\n'])
+            else:
+                header = '--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n' % \
+                                                                        (self.boundary, name)
+                self._parts.extend([header.encode('utf-8'), value.encode('utf-8'), b'\r\n'])
+
+        self._parts.append(('--%s--\r\n' % self.boundary).encode('utf-8'))
+        self._length = sum(self.partlength(part) for part in self._parts)
+
+    @staticmethod
+    def partlength(part):
+        """ Length of a part of the body
+
+        :param part: bytes or a (path, offset, length) file section
+        :type part: bytes or tuple.
+        """
+        return part[2] if isinstance(part, tuple) else len(part)
+
+    @property
+    def content_type(self):
+        """ Content-Type header value of the body """
+        return 'multipart/form-data; boundary=%s' % self.boundary
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        """ Read up to size bytes of the body, reading at most one block of a file
+        section at a time
+
+        :param size: number of bytes to read
+        :type size: int.
+        """
+        size = READ_BLOCK_SIZE if size is None or size < 0 else size
+
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            count = min(size, self.partlength(part) - self._offset)
+            if count <= 0:
+                self.close()
+                self._index += 1
+                self._offset = 0
+                continue
+
+            if not isinstance(part, tuple):
+                data = part[self._offset:self._offset + count]
+            else:
+                if self._current is None:
+                    self._current = open(part[0], 'rb')
+                    self._current.seek(part[1] + self._offset)
+                data = self._current.read(count)
+                if not data:
+                    raise InvalidFileInputError("The file \'%s\' changed during upload." % \
+                                                                                    part[0])
+            self._offset += len(data)
+            self._position += len(data)
+
+            return data
+
+        return b''
+
+    def tell(self):
+        """ Current position in the body """
+        return self._position
+
+    def seek(self, offset, whence=0):
+        """ Move to a position in the body
+
+        :param offset: offset of the position
+        :type offset: int.
+        :param whence: 0 for an offset from the start, 1 from the current position and 2
+                       from the end
+        :type whence: int.
+        """
+        position = max(0, min(offset + (0, self._position, self._length)[whence], \
+                                                                            self._length))
+        self.close()
+        self._index = 0
+        self._offset = position
+        self._position = position
+
+        while self._index < len(self._parts) and \
+                            self._offset >= self.partlength(self._parts[self._index]):
+            self._offset -= self.partlength(self._parts[self._index])
+            self._index += 1
+
+    def close(self):
+        """ Close the file section being read """
+        if self._current is not None:
+            self._current.close()
+            self._current = None
 
 
 class UploadComponentCommand(RdmcCommandBase):
@@ -95,9 +220,7 @@ class UploadComponentCommand(RdmcCommandBase):
                 raise InvalidCommandLineErrorOPTS("")
 
         self.uploadcommandvalidation(options)
-        fwpkg = False
         if options.component.endswith('.fwpkg'):
-            fwpkg = True
             comp, loc, ctype = self.fwpkgprepare(self, options.component)
             if ctype == 'C':
                 options.component = comp[0]
@@ -121,11 +244,6 @@ class UploadComponentCommand(RdmcCommandBase):
 
             sys.stdout.write("%s\n" % human_readable_time(time.time() - start_time))
 
-            if len(filestoupload) > 1:
-                path, _ = os.path.split((filestoupload[0])[1])
-                shutil.rmtree(path)
-            elif fwpkg:
-                shutil.rmtree(loc)
             if options.logout:
                 self.logoutobj.run("")
         else:
@@ -141,45 +259,80 @@ class UploadComponentCommand(RdmcCommandBase):
 		:param filelist: list of files to be uploaded (multiple files will be
                generated for items over 32K in size)
         :type filelist: list of strings
+        :returns: returns True if the component needs to be uploaded
         """
-        validation = True
-        prevfile = None
-
         path = '/redfish/v1/UpdateService/ComponentRepository/?$expand=.'
         results = self._rdmc.app.get_handler(path, service=True, silent=True)
 
         results = results.dict
 
-        if 'Members' in results and results['Members']:
-            for comp in results['Members']:
-                for filehndl in filelist:
-                    if comp['Filename'].upper() == unicode(filehndl[0]).upper()\
-                        and not options.forceupload and prevfile != filehndl[0].upper():
-                        ans = input("A component with the same name (%s) has " \
-                                    "been found. Would you like to upload and "\
-                                    "overwrite this file? (y/n)" % comp['Filename'])
-
-                        if ans.lower() == 'n':
-                            sys.stdout.write('Upload stopped by user due to filename conflict.'\
-                                             ' If you would like to bypass this check include the'\
-                                             ' "--forceupload" flag.\n')
-                            validation = False
-                            break
-                    if comp['Filename'].upper() == unicode(filehndl[0]).upper()\
-                        and prevfile != filehndl[0].upper() and comp['Locked']:
-                        sys.stdout.write('Component is currently locked by a taskqueue task or '\
-                                         'installset. Remove any installsets or taskqueue tasks '\
-                                         'containing the file and try again.\n')
-                        validation = False
-                        break
-                    prevfile = str(comp['Filename'].upper())
-        return validation
+        repository = dict((comp['Filename'].upper(), comp) for comp in \
+                                    results.get('Members', []) if 'Filename' in comp)
+
+        #every section of a split component has the same filename
+        comp = repository.get(six.text_type(filelist[0][0]).upper())
+
+        if not comp:
+            return True
+
+        if not options.forceupload and not options.update_target and \
+                                                    self.componentmatches(options, comp):
+            sys.stdout.write('Component %s is already in the iLO repository, skipping '\
+                             'upload.\n' % comp['Filename'])
+            return False
+
+        if not options.forceupload and self._rdmc.unattended:
+            raise UploadError('A component with the same name (%s) is already in the iLO '\
+                              'repository. Include the "--forceupload" flag to overwrite '\
+                              'it.' % comp['Filename'])
+        elif not options.forceupload:
+            ans = input("A component with the same name (%s) has " \
+                        "been found. Would you like to upload and "\
+                        "overwrite this file? (y/n)" % comp['Filename'])
+
+            if ans.lower() == 'n':
+                sys.stdout.write('Upload stopped by user due to filename conflict.'\
+                                 ' If you would like to bypass this check include the'\
+                                 ' "--forceupload" flag.\n')
+                return False
+
+        if comp['Locked']:
+            sys.stdout.write('Component is currently locked by a taskqueue task or '\
+                             'installset. Remove any installsets or taskqueue tasks '\
+                             'containing the file and try again.\n')
+            return False
+
+        return True
+
+    def componentmatches(self, options, comp):
+        """ Check if a repository component has the same contents as the local component
+
+        :param options: command line options
+        :type options: list.
+        :param comp: repository component
+        :type comp: dict.
+        :returns: returns True if the size and the hash reported by the repository match.
+                  Components the repository reports no hash for never match, since
+                  images of the same name and size can still differ.
+        """
+        hashfield = next((field for field in REPOSITORY_HASH_FIELDS if comp.get(field)), None)
+        if not hashfield or comp.get('SizeBytes') != os.path.getsize(options.component):
+            return False
+
+        sha = hashlib.sha256()
+        with open(options.component, 'rb') as component:
+            for block in iter(lambda: component.read(READ_BLOCK_SIZE), b''):
+                sha.update(block)
+
+        return sha.hexdigest().lower() == comp[hashfield].lower()
 
     def _check_and_split_files(self, options):
-        """ Check and split the file to upload on to iLO Repository
+        """ Check the file to upload on to iLO Repository and divide it into the sections
+        uploaded separately. Sections are byte ranges of the component, no copies are made.
 
         :param options: command line options
         :type options: list.
+        :returns: list of (filename, component path, compsig path, section, offset, length)
         """
 
         def check_file_wr(filename, rw):
@@ -190,7 +343,6 @@ class UploadComponentCommand(RdmcCommandBase):
                 raise InvalidFileInputError("The file \'%s\' could not be opened for upload" % \
                                             filename)
 
-        maxcompsize = 32 * 1024 * 1024
         size = os.path.getsize(options.component)
         filelist = []
 
@@ -201,50 +353,35 @@ class UploadComponentCommand(RdmcCommandBase):
         # This is to upload the binary directly to flash scenario
         if not options.componentsig:
             if not self.findcompsig(filename):
-                return [(filename, options.component, options.componentsig, 0)]
+                return [(filename, options.component, options.componentsig, 0, 0, size)]
 
-        if size > maxcompsize:
+        if size > MAX_COMP_SIZE:
             sys.stdout.write("Component is more than 32MB in size. ")
             sys.stdout.write("Component size = %s\n" % str(size))
-            section = 1
 
             sigpath, _ = os.path.split(options.componentsig)
             check_file_wr(os.path.normpath(options.componentsig), 'r')
             filebasename = filename[:filename.rfind('.')]
-            tempfoldername = "bmn" + ''.join(choice(ascii_lowercase) for i in range(12))
-
-            tempdir = os.path.join(self._rdmc.app.config.get_cachedir(), tempfoldername)
-
-            sys.stdout.write("Spliting component. Temporary " \
-                                            "cache directory at %s\n" % tempdir)
-
-            if not os.path.exists(tempdir):
-                os.makedirs(tempdir)
-
-            with open(options.component, 'rb') as component:
-                while True:
-                    data = component.read(maxcompsize)
-                    if len(data) != 0:
-                        sectionfilename = filebasename + "_part" + str(section)
-                        sectionfilepath = os.path.join(tempdir, sectionfilename)
-
-                        sectioncompsigpath = os.path.join(sigpath, sectionfilename + ".compsig")
-
-                        writefile = open(sectionfilepath, 'wb')
-                        writefile.write(data)
-                        writefile.close()
-
-                        item = (filename, sectionfilepath, sectioncompsigpath, section - 1)
 
-                        filelist.append(item)
-                        section += 1
-
-                    if len(data) != maxcompsize:
-                        break
+            for section, offset in enumerate(range(0, size, MAX_COMP_SIZE)):
+                sectioncompsigpath = os.path.join(sigpath, self.sectionname(filebasename, \
+                                                                    section) + ".compsig")
+                filelist.append((filename, options.component, sectioncompsigpath, section, \
+                                                offset, min(MAX_COMP_SIZE, size - offset)))
 
             return filelist
         else:
-            return [(filename, options.component, options.componentsig, 0)]
+            return [(filename, options.component, options.componentsig, 0, 0, size)]
+
+    def sectionname(self, filebasename, section):
+        """ Name of a section of a component split for upload
+
+        :param filebasename: component filename without its extension
+        :type filebasename: str.
+        :param section: section number, starting from 0
+        :type section: int.
+        """
+        return filebasename + "_part" + str(section + 1)
 
     def uploadfunction(self, filelist, options=None):
         """ Main upload command worker function
@@ -288,7 +425,11 @@ class UploadComponentCommand(RdmcCommandBase):
             componentpath = item[1]
             compsigpath = item[2]
 
-            _, filename = os.path.split(componentpath)
+            if len(filelist) > 1:
+                filename = self.sectionname(ilo_upload_filename[\
+                                        :ilo_upload_filename.rfind('.')], item[3])
+            else:
+                _, filename = os.path.split(componentpath)
 
             if not etag:
                 etag = "sum" + filename.replace('.', '')
@@ -307,17 +448,13 @@ class UploadComponentCommand(RdmcCommandBase):
             if not compsigpath:
                 compsigpath = self.findcompsig(componentpath)
             if compsigpath:
-                with open(compsigpath, 'rb') as fle:
-                    output = fle.read()
-                data.append(('compsig', (ilo_upload_compsig_filename, output, \
-                                                                'application/octet-stream')))
-                output = None
+                data.append(('compsig', (ilo_upload_compsig_filename, compsigpath, 0, \
+                                                            os.path.getsize(compsigpath))))
 
-            with open(componentpath, 'rb') as fle:
-                output = fle.read()
-            data.append(('file', (ilo_upload_filename, output, 'application/octet-stream')))
+            data.append(('file', (ilo_upload_filename, componentpath, item[4], item[5])))
 
-            res = self._rdmc.app.post_handler(str(urltosend), data, response=True, \
+            self._rdmc.reportprogress(event='upload', component=filename, section=section_num)
+            res = self.postmultipart(str(urltosend), data, \
                  headers={'Cookie': 'sessionKey=' + sessionkey})
 
             if res.status != 200:
@@ -333,42 +470,65 @@ class UploadComponentCommand(RdmcCommandBase):
 
         return ReturnCodes.SUCCESS
 
+    def postmultipart(self, path, fields, headers=None):
+        """ POST a multipart/form-data body streamed from disk. The library's post_handler
+        encodes the whole body in memory, so the request is sent with StreamingRequest.
+
+        :param path: path to post to
+        :type path: str.
+        :param fields: multipart fields, see :class:`MultipartFileStream`
+        :type fields: list.
+        :param headers: additional request headers
+        :type headers: dict.
+        :returns: urllib3 response
+        """
+        client = self._rdmc.app.current_client
+        if not StreamingRequest.available(client):
+            raise UploadError("Streaming uploads require a remote connection.")
+
+        body = MultipartFileStream(fields)
+        headers = dict(headers or {})
+        headers['Content-Type'] = body.content_type
+        headers['Content-Length'] = str(len(body))
+
+        try:
+            response = StreamingRequest.send(client, 'POST', path, headers=headers, body=body)
+            response.read()
+            response.release_conn()
+            return response
+        finally:
+            body.close()
+
     def wait_for_state_change(self, wait_time=420):
         """ Wait for the iLO UpdateService to a move to terminal state.
         :param options: command line options
         :type options: list.
-        :param wait_time: time to wait on upload
+        :param wait_time: time to wait on upload, however often the state changes
         :type wait_time: int.
         """
-        total_time = 0
-        spinner = ['|', '/', '-', '\\']
-        state = ""
         sys.stdout.write("Waiting for iLO UpdateService to finish processing the component\n")
 
-        while total_time < wait_time:
-            state, _ = self.get_update_service_state()
-
-            if state == "ERROR":
-                return False
-            elif state != "COMPLETED" and state != "IDLE" and state != "COMPLETE":
-                # Lets try again after 8 seconds
-                count = 0
-
-                # fancy spinner
-                while count <= 32:
-                    sys.stdout.write('Updating: %s\r' % spinner[count % 4])
-                    time.sleep(0.25)
-                    count += 1
+        tracker = ProgressTracker(self._rdmc, lambda: self.get_update_service_state()[0], \
+                    lambda state: state in ("ERROR", "COMPLETED", "IDLE", "COMPLETE"), \
+                    callback=self.showstate)
+        state = tracker.wait(deadline=wait_time)
 
-                total_time += 8
-            else:
-                break
-
-        if total_time > wait_time:
+        if state == "ERROR":
+            return False
+        elif state not in ("COMPLETED", "IDLE", "COMPLETE"):
             raise TimeOutError("UpdateService in " + state + " state for " + str(wait_time) + "s")
 
         return True
 
+    def showstate(self, state):
+        """ Show a new UpdateService state
+
+        :param state: UpdateService state
+        :type state: str.
+        """
+        sys.stdout.write('Updating: %s\r' % state)
+        self._rdmc.reportprogress(event='state', state=state)
+
     def get_update_service_state(self):
         """ Get the current UpdateService state
 
@@ -432,6 +592,8 @@ class UploadComponentCommand(RdmcCommandBase):
         :param options: command line options
         :type options: list.
         """
+        tempdir = None
+
         try:
             dll = self._rdmc.app.current_client.connection._conn.channel.dll
             dll.uploadComponent.argtypes = [c_char_p, c_char_p, c_char_p, c_uint32]
@@ -439,12 +601,19 @@ class UploadComponentCommand(RdmcCommandBase):
 
             multiupload = False
 
+            if len(filelist) > 1:
+                tempdir = self.writesectionfiles(filelist)
+
             for item in filelist:
 
                 ilo_upload_filename = item[0]
                 componentpath = item[1]
                 compsigpath = item[2]
 
+                if tempdir:
+                    componentpath = os.path.join(tempdir, self.sectionname(\
+                                    ilo_upload_filename[:ilo_upload_filename.rfind('.')], item[3]))
+
                 if not compsigpath:
                     compsigpath = self.findcompsig(componentpath)
 
@@ -490,9 +659,52 @@ class UploadComponentCommand(RdmcCommandBase):
 
         except Exception as excep:
             raise excep
+        finally:
+            if tempdir:
+                shutil.rmtree(tempdir)
 
         return ReturnCodes.SUCCESS
 
+    def writesectionfiles(self, filelist):
+        """ Write the sections of a split component to files in a temporary cache directory,
+        since local uploads read each section from its own file
+
+        :param filelist: List of component sections.
+        :type filelist: list.
+        :returns: the temporary directory holding the section files
+        """
+        tempfoldername = "bmn" + ''.join(choice(ascii_lowercase) for i in range(12))
+        tempdir = os.path.join(self._rdmc.app.config.get_cachedir() or \
+                        os.path.join(self._rdmc.opts.config_dir, 'cache'), tempfoldername)
+
+        sys.stdout.write("Spliting component. Temporary " \
+                                        "cache directory at %s\n" % tempdir)
+
+        if not os.path.exists(tempdir):
+            os.makedirs(tempdir)
+
+        try:
+            for item in filelist:
+                sectionfilepath = os.path.join(tempdir, self.sectionname(\
+                                                    item[0][:item[0].rfind('.')], item[3]))
+
+                with open(item[1], 'rb') as component, \
+                                            open(sectionfilepath, 'wb') as writefile:
+                    component.seek(item[4])
+                    remaining = item[5]
+                    while remaining:
+                        data = component.read(min(READ_BLOCK_SIZE, remaining))
+                        if not data:
+                            break
+                        writefile.write(data)
+                        remaining -= len(data)
+        except Exception:
+            #the caller only removes the directory once it has been returned
+            shutil.rmtree(tempdir, ignore_errors=True)
+            raise
+
+        return tempdir
+
     def uploadcommandvalidation(self, options):
         """ upload command method validation function
 
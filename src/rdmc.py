@@ -31,7 +31,6 @@ import shlex
 import ctypes
 import logging
 import traceback
-import importlib
 import collections
 
 from six.moves import input
@@ -63,26 +62,16 @@ from rdmc_helper import ReturnCodes, ConfigurationFileError, \
                     IncompatableServerTypeError, IloLicenseError, \
                     InvalidKeyError, UnableToDecodeError, \
                     UnabletoFindDriveError, Encryption, PathUnavailableError, TaskQueueError,\
-                    TabAndHistoryCompletionClass
+                    TabAndHistoryCompletionClass, CompletionIndex, Prefetcher, \
+                    PriorityLock, InstanceIndex
 
-from rdmc_base_classes import RdmcCommandBase, RdmcOptionParser, HARDCODEDLIST
+from rdmc_base_classes import RdmcCommandBase, RdmcOptionParser, LazyCommand, HARDCODEDLIST
 
 if os.name != 'nt':
     try:
         import setproctitle
     except ImportError as error:
         pass
-
-#import all extensions dynamically
-for name in extensions.classNames:
-    pkgName, cName = name.rsplit('.', 1)
-    pkgName = 'extensions' + pkgName
-    try:
-        extensions.Commands[cName] = getattr(importlib.import_module(pkgName), cName)
-    except Exception as excp:
-        sys.stderr.write("Error locating extension %s at location %s\n" % \
-                                                (cName, 'extensions' + name))
-        raise excp
 #---------End of imports---------
 
 # always flush stdout and stderr
@@ -122,6 +111,8 @@ class RdmcCommand(RdmcCommandBase):
         self._commands = collections.OrderedDict()
         self.commands_dict = extensions.Commands
         self.interactive = False
+        #set on sessions run by a ServerPool, which have no console to prompt on
+        self.unattended = False
         self._progname = '%s : %s' % (versioning.__shortname__, \
                                       versioning.__longname__)
         self.opts = None
@@ -132,6 +123,13 @@ class RdmcCommand(RdmcCommandBase):
         self.candidates = dict()
         self.commlist = list()
         self._redobj = None
+        self._tabindex = None
+        self._tabkeys = dict()
+        self._prefetcher = None
+        self._applock = PriorityLock()
+        self.instanceindex = InstanceIndex()
+        self.persistent = False
+        self.progress = None
         Args.remove('--showwarnings')
 
     def add_command(self, newcmd, section=None):
@@ -160,6 +158,9 @@ class RdmcCommand(RdmcCommandBase):
         for vals in list(self._commands.values()):
             for cmd in vals:
                 if cmd.ismatch(cmdname):
+                    if isinstance(cmd, LazyCommand):
+                        cmd = cmd.load()
+
                     if not cmd.is_enabled():
                         raise CommandNotEnabledError(cmd.enablement_hint())
 
@@ -167,6 +168,39 @@ class RdmcCommand(RdmcCommandBase):
 
         raise cliutils.CommandNotFoundException(cmdname)
 
+    def reportprogress(self, **event):
+        """ Pass a progress event to the caller running this command, if it asked for them
+
+        :param event: progress event fields
+        :type event: dict.
+        """
+        if self.progress:
+            self.progress(**event)
+
+    def spawn(self, args):
+        """ Create an independent command object with its own RmcApp, used to run
+        commands against other servers from within this process
+
+        :param args: list of the entered arguments
+        :type args: list.
+        :returns: the new RdmcCommand object
+        """
+        return create_rdmc(args)
+
+    def load_command(self, stub):
+        """ Replace a manifest placeholder with the real command object
+
+        :param stub: placeholder of the command to be loaded
+        :type stub: LazyCommand.
+        :returns: the loaded command
+        """
+        cmd = new_command(self, stub.classname)
+        cmds = self._commands[stub.section]
+        if stub in cmds:
+            cmds[cmds.index(stub)] = cmd
+
+        return cmd
+
     def _run_command(self, opts, args):
         """ Calls the commands run function
 
@@ -288,24 +322,38 @@ class RdmcCommand(RdmcCommandBase):
                 else:
                     raise
 
-        if ("login" in line or any(x.startswith("--url") for x in line) or not line)\
-                        and not (any(x.startswith(("-h", "--h")) for x in nargv) or "help" in line):
+        # a persistent (daemon) instance keeps its session alive between commands
+        warm = self.persistent and self.app.redfishinst
+
+        if ("login" in line or (any(x.startswith("--url") for x in line) and not warm) \
+                        or not line) and not (any(x.startswith(("-h", "--h")) for x in nargv) \
+                        or "help" in line):
             self.app.logout()
         else:
-            creds, enc = self._pull_creds(nargv)
-            self.app.restore(creds=creds, enc=enc)
+            if not warm:
+                creds, enc = self._pull_creds(nargv)
+                self.app.restore(creds=creds, enc=enc)
             self.opts.is_redfish = self.app.typepath.updatedefinesflag(\
                                                                 redfishflag=self.opts.is_redfish)
 
         if nargv:
             try:
                 self.retcode = self._run_command(self.opts, nargv)
-                if self.app.cache:
+                if self.persistent:
+                    pass
+                elif self.app.cache:
                     if ("logout" not in line) and ("--logout" not in line):
                         self.app.save()
                         self.app.redfishinst = None
                 else:
                     self.app.logout()
+            except redfish.ris.SessionExpired as excp:
+                if not warm:
+                    self.handle_exceptions(excp)
+                else:
+                    #the daemon logs in again and retries the command
+                    self.app.logout()
+                    raise
             except Exception as excp:
                 self.handle_exceptions(excp)
 
@@ -353,6 +401,8 @@ class RdmcCommand(RdmcCommandBase):
                 self.candidates[item] = []
 
         self._redobj = TabAndHistoryCompletionClass(dict(self.candidates))
+        self._tabindex = CompletionIndex(self.app.config.get_cachedir() if self.app.cache \
+                                                                                else None)
         try:
             session = PromptSession(completer=self._redobj, \
                                                         complete_style=CompleteStyle.READLINE_LIKE)
@@ -380,21 +430,43 @@ class RdmcCommand(RdmcCommandBase):
             nargv = shlex.split(line, posix=False)
 
             try:
-                if not (any(x.startswith("-h") for x in nargv) or \
-                    any(x.startswith("--h") for x in nargv) or "help" in line):
-                    if "login " in line or line == 'login' or \
-                        any(x.startswith("--url") for x in nargv):
-                        self.app.logout()
-                self.retcode = self._run_command(opts, nargv)
-                self.check_for_tab_lists(nargv)
+                # the session the prefetch was started for is about to change
+                if set(nargv) & set(['login', 'logout', '--logout']) or \
+                                                any(x.startswith("--url") for x in nargv):
+                    self.stopprefetch()
+                with self._applock:
+                    if not (any(x.startswith("-h") for x in nargv) or \
+                        any(x.startswith("--h") for x in nargv) or "help" in line):
+                        if "login " in line or line == 'login' or \
+                            any(x.startswith("--url") for x in nargv):
+                            self.app.logout()
+                    self.retcode = self._run_command(opts, nargv)
+                    self.check_for_tab_lists(nargv)
             except Exception as excp:
                 self.handle_exceptions(excp)
 
+            self.startprefetch()
+
             if self.opts.verbose:
                 sys.stdout.write("iLOrest return code: %s\n" % self.retcode)
 
         return self.retcode
 
+    def startprefetch(self):
+        """ Start loading commonly used types in the background once logged in, if
+        enabled with the prefetch option """
+        if not self.opts.prefetch or self._prefetcher or not self.app.redfishinst:
+            return
+
+        self._prefetcher = Prefetcher(self.app, self._applock)
+        self._prefetcher.start()
+
+    def stopprefetch(self):
+        """ Cancel loading types in the background, waiting for the type being loaded """
+        if self._prefetcher:
+            self._prefetcher.cancel()
+            self._prefetcher = None
+
     def handle_exceptions(self, excp):
         """ Main exception handler for both shell and interactive modes
 
@@ -673,7 +745,8 @@ class RdmcCommand(RdmcCommandBase):
                 traceback.print_exc(file=sys.stderr)
 
     def check_for_tab_lists(self, command=None):
-        """ Function to generate available options for tab tab
+        """ Function to generate available options for tab tab. The lists are taken from
+        the completion index and only rebuilt when the selection or its data changes.
 
         :param command: command for auto tab completion
         :type command: string.
@@ -681,68 +754,93 @@ class RdmcCommand(RdmcCommandBase):
         changes = dict()
 
         # select options
-        typeslist = list()
-
         try:
-            typeslist = sorted(set(self.app.types()))
-            changes["select"] = typeslist
+            typeskey = [self.app.redfishinst.base_url if self.app.redfishinst else None, \
+                                                            len(self.app.monolith.paths)]
+            if self._tabkeys.get('select') != typeskey:
+                changes["select"] = sorted(set(self.app.types()))
+                self._tabkeys['select'] = typeskey
         except:
             pass
 
         # get/set/info options
-        getlist = list()
-
         try:
-            typestr = self.app.typepath.defs.typestring
-            templist = self.app.getprops()
-            dictcopy = copy.copy(templist[0])
-
-            for content in templist:
-                for k in list(content.keys()):
-                    if k.lower() in HARDCODEDLIST or '@odata' in k.lower():
-                        del content[k]
-            if 'Bios.' in dictcopy[typestr]:
-                templist = templist[0]['Attributes']
-            else:
-                templist = templist[0]
-            for key, _ in templist.items():
-                getlist.append(key)
-
-            getlist.sort()
+            instances = self.app.get_selection()
+            key = ['props', self.app.selector, [[inst.path, inst.etag, len(inst.patches)] \
+                                                                    for inst in instances]]
+            #without etags changes to the data can not be detected, so nothing is cached
+            if not instances or any(inst.etag is None for inst in instances):
+                key = None
+
+            props = self._tabindex.get(key, self.tab_properties)
+
+            if key is None or self._tabkeys.get('props') != key:
+                changes["get"] = props["get"]
+                changes["nestedprop"] = props["nestedprop"]
+                changes["set"] = props["get"]
+                changes["info"] = props["get"]
+                changes["val"] = []
+                self._tabkeys['props'] = key
 
             # if select command, get possible values
-            infovals = dict()
+            infokey = ['info', props["type"], props["registry"]]
+            if 'select' in command or self._tabkeys.get('info') != infokey:
+                infovals = self._tabindex.get(infokey, self.tab_information \
+                                                        if 'select' in command else None)
+                if infovals is not None:
+                    changes["nestedinfo"] = infovals
+                    self._tabkeys['info'] = infokey
+        except:
+            pass
+
+        self._tabindex.save()
+
+        if changes:
+            self._redobj.updates_tab_completion_lists(changes)
 
-            if 'select'in command:
+    def tab_properties(self):
+        """ Build the property lists of the current selection for tab completion
 
-                if typestr in dictcopy:
-                    (_, attributeregistry) = self.app.get_selection(setenable=True)
-                    schema, reg = self.app.get_model(dictcopy, attributeregistry)
+        :returns: returns a dictionary of the property names, the nested properties and
+                  the type and attribute registry they belong to
+        """
+        typestr = self.app.typepath.defs.typestring
+        templist = self.app.getprops()
+        dictcopy = copy.copy(templist[0])
+
+        for k in list(templist[0].keys()):
+            if k.lower() in HARDCODEDLIST or '@odata' in k.lower():
+                del templist[0][k]
+        if 'Bios.' in dictcopy[typestr]:
+            templist = templist[0]['Attributes']
+        else:
+            templist = templist[0]
 
-                    if reg:
-                        reg = reg['Attributes']
-                        for item in getlist:
-                            for attribute in reg:
-                                if item == attribute:
-                                    infovals.update({item:reg[attribute]})
-                                    break
+        return {"get": sorted(templist.keys()), "type": dictcopy[typestr], \
+                "registry": dictcopy.get("AttributeRegistry"), "nestedprop": \
+                dictcopy['Attributes'] if 'Attributes' in dictcopy else dictcopy}
 
-                        changes["nestedinfo"] = infovals
+    def tab_information(self):
+        """ Build the schema or registry information of the current selection for tab
+        completion help
 
-                    elif schema:
-                        changes["nestedinfo"] = schema
+        :returns: returns the information or None if there is no schema or registry
+        """
+        typestr = self.app.typepath.defs.typestring
+        currdict = self.app.getprops()[0]
 
-            changes["get"] = getlist
-            changes["nestedprop"] = dictcopy['Attributes'] if 'Attributes' in dictcopy else dictcopy
-            changes["set"] = getlist
-            changes["info"] = getlist
-            changes["val"] = []
+        if typestr not in currdict:
+            return None
 
-        except:
-            pass
+        (_, attributeregistry) = self.app.get_selection(setenable=True)
+        schema, reg = self.app.get_model(currdict, attributeregistry)
 
-        if changes:
-            self._redobj.updates_tab_completion_lists(changes)
+        if reg:
+            reg = reg['Attributes']
+            getlist = currdict['Attributes'] if 'Bios.' in currdict[typestr] else currdict
+            return dict((item, reg[item]) for item in getlist if item in reg)
+
+        return schema
 
     def _pull_creds(self, args):
         """Pull creds from the arguments for blobstore"""
@@ -761,34 +859,122 @@ class RdmcCommand(RdmcCommandBase):
             return {}
         return cred_args, enc
 
-if __name__ == '__main__':
-    # Initialization of main command class
-    ARGUMENTS = sys.argv[1:]
+def new_command(rdmc, classname):
+    """ Create a command object from its extension class
+
+    :param rdmc: main command object
+    :type rdmc: RdmcCommand.
+    :param classname: extension class name as listed in extensions.classNames
+    :type classname: str.
+    :returns: the new command object
+    """
+    cName = classname.split('.')[-1]
 
-    RDMC = RdmcCommand(Args=ARGUMENTS)
+    if cName == 'HelpCommand':
+        return extensions.Commands[cName](rdmc=rdmc)
 
-    # Addition of rdmc commands and sub commands
-    for cName in extensions.classNames:
-        sName = cName.split('.')[1]
-        cName = cName.split('.')[-1]
+    try:
+        return extensions.Commands[cName](rdmc)
+    except cliutils.ResourceAllocationError as excp:
+        UI().error(excp)
+        retcode = ReturnCodes.RESOURCE_ALLOCATION_ISSUES_ERROR
+        UI().printmsg("Unable to allocate more resources.")
+        sys.stdout.write("ILOREST return code: %s\n" % retcode)
+        sys.exit(retcode)
+
+def create_rdmc(args):
+    """ Create the main command class and add all rdmc commands and sub commands.
+    Commands listed in the extension manifest are only imported when used; without
+    a valid manifest every extension is loaded and the manifest is regenerated in
+    the cache directory.
+
+    :param args: list of the entered arguments
+    :type args: list.
+    :returns: the initialized RdmcCommand object
+    """
+    rdmc = RdmcCommand(Args=args)
+    cachedir = manifest_cachedir(args)
+
+    manifest = extensions.load_manifest(cachedir)
+    if manifest:
+        for entry in manifest:
+            rdmc.add_command(LazyCommand(entry, rdmc.load_command), section=entry['section'])
+
+        return rdmc
+
+    (manifest, complete) = load_commands(rdmc)
+    if complete and cachedir:
+        extensions.save_manifest(manifest, os.path.join(cachedir, 'manifest.json'))
+
+    return rdmc
+
+def manifest_cachedir(args):
+    """ Cache directory for the generated command manifest, following the --cache-dir
+    and --nocache global options
+
+    :param args: list of the entered arguments
+    :type args: list.
+    :returns: returns the cache directory, or None if caching is disabled
+    """
+    configdir = os.path.join(cliutils.get_user_config_dir(), '.%s' % versioning.__shortname__)
+    for ind, arg in enumerate(args):
+        if arg == '--nocache':
+            return None
+        elif arg == '--cache-dir' and ind + 1 < len(args):
+            configdir = args[ind + 1]
+        elif arg.startswith('--cache-dir='):
+            configdir = arg.split('=', 1)[1]
+
+    return os.path.join(configdir, 'cache')
+
+def load_commands(rdmc):
+    """ Load every extension command and build the manifest entries of the commands
+
+    :param rdmc: command object the commands are added to
+    :type rdmc: RdmcCommand.
+    :returns: returns the manifest entries and False if any extension failed to load
+    """
+    manifest = []
+    complete = True
+    for classname in extensions.classNames:
+        sName = classname.split('.')[1]
+        cName = classname.split('.')[-1]
 
         if not cName.endswith("Command"):
             continue
 
-        if cName == 'HelpCommand':
-            RDMC.add_command(extensions.Commands[cName](rdmc=RDMC), section=sName)
-        else:
-            try:
-                RDMC.add_command(extensions.Commands[cName](RDMC), section=sName)
-            except cliutils.ResourceAllocationError as excp:
-                UI().error(excp)
-                retcode = ReturnCodes.RESOURCE_ALLOCATION_ISSUES_ERROR
-                UI().printmsg("Unable to allocate more resources.")
-                sys.stdout.write("ILOREST return code: %s\n" % retcode)
-                sys.exit(retcode)
-            except Exception as excp:
-                sys.stderr.write("Error loading extension: %s\n" % cName)
-                sys.stderr.write("\t" + str(excp) + '\n')
+        try:
+            cmd = new_command(rdmc, classname)
+        except Exception as excp:
+            sys.stderr.write("Error loading extension: %s\n" % cName)
+            sys.stderr.write("\t" + str(excp) + '\n')
+            complete = False
+            continue
+
+        rdmc.add_command(cmd, section=sName)
+        manifest.append({'name': cmd.name, 'aliases': cmd.aliases or [], 'section': sName, \
+                         'summary': cmd.summary, 'module': 'extensions' + \
+                         classname.rsplit('.', 1)[0], 'classname': classname})
+
+    return (manifest, complete)
+
+def build_manifest():
+    """ Write the command manifest shipped with the extensions. Run when packaging, the
+    install location is not written to at runtime.
+
+    :returns: returns True if every extension was loaded and the manifest written
+    """
+    (manifest, complete) = load_commands(RdmcCommand(Args=[]))
+    if complete:
+        extensions.save_manifest(manifest, extensions.manifestFile)
+
+    return complete and os.path.isfile(extensions.manifestFile)
+
+if __name__ == '__main__':
+    # Initialization of main command class
+    ARGUMENTS = sys.argv[1:]
+
+    RDMC = create_rdmc(ARGUMENTS)
 
     # Main execution function call wrapper
     if "setproctitle" in sys.modules:
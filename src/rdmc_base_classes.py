@@ -97,6 +97,34 @@ def add_login_arguments_group(parser, full=False):
             "not needed for normal operations.",
             default=None)
 
+def add_multiserver_arguments_group(parser):
+    """Adds the options controlling concurrent multiple server operations to the
+    passed parser
+
+    :param parser: The parser to add the multiple server option group to
+    :type parser: ArgumentParser.
+    """
+    group = parser.add_argument_group('MULTIPLE SERVER OPTIONS', 'Options for running the '\
+                                      'command against multiple servers.')
+    group.add_argument(
+        '--workers',
+        dest='workers',
+        type=int,
+        help="Maximum number of servers to process concurrently. (default: 10)",
+        default=10)
+    group.add_argument(
+        '--servertimeout',
+        dest='servertimeout',
+        type=int,
+        help="Optionally give up on a server after the given number of seconds.",
+        default=None)
+    group.add_argument(
+        '--retries',
+        dest='retries',
+        type=int,
+        help="Number of times to retry a server that can not be reached. (default: 0)",
+        default=0)
+
 class CommandBase(object):
     """Abstract base class for all Command objects.
 
@@ -265,6 +293,36 @@ class RdmcCommandBase(CommandBase):
         """
         return ""
 
+class LazyCommand(RdmcCommandBase):
+    """Placeholder for a command listed in the extension manifest. The extension
+       module is only imported when the command is first used.
+    """
+
+    def __init__(self, entry, loader):
+        """ Constructor
+
+        :param entry: manifest entry for the command
+        :type entry: dict.
+        :param loader: function creating the real command from this placeholder
+        :type loader: function.
+        """
+        RdmcCommandBase.__init__(self,\
+            name=entry['name'],\
+            usage=None,\
+            summary=entry['summary'],\
+            aliases=entry['aliases'])
+        self.section = entry['section']
+        self.classname = entry['classname']
+        self._loader = loader
+
+    def load(self):
+        """ Import the extension module and return the real command object """
+        return self._loader(self)
+
+    def print_help(self):
+        """ Help for the real command """
+        self.load().print_help()
+
 class RdmcOptionParser(ArgumentParser):
     """ Constructor """
     def __init__(self):
@@ -336,6 +394,14 @@ class RdmcOptionParser(ArgumentParser):
             "requested by the file. Note: May cause errors in some data "\
             "retrieval due to difference in schema versions.",
             default=False)
+        self.add_argument(
+            '--prefetch',
+            dest='prefetch',
+            action='store_true',
+            help="In interactive mode, load commonly used types (ComputerSystem, Bios "\
+            "and its attribute registry, Manager and EthernetInterface) in the "\
+            "background after logging in, so later commands find them already loaded.",
+            default=False)
         self.add_argument(
             '--proxy',
             dest='proxy',
@@ -0,0 +1,372 @@
+###
+# Copyright 2019 Hewlett Packard Enterprise, Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###
+
+# -*- coding: utf-8 -*-
+"""
+Persistent daemon mode for Redfish Utility. The daemon keeps a warm interpreter with one
+live RmcApp per iLO URL and the thin client forwards argv over a Unix socket, streaming
+back stdout, stderr and the return code.
+
+    python rdmc_daemon.py --daemon-start        start the daemon in the foreground
+    python rdmc_daemon.py --daemon-stop         stop a running daemon
+    python rdmc_daemon.py [ilorest arguments]   run a command through the daemon
+
+If no daemon is listening the client falls back to running rdmc.py directly.
+"""
+
+#---------Imports---------
+
+import os
+import sys
+import json
+import errno
+import socket
+import getpass
+import hashlib
+
+import cliutils
+import versioning
+
+#---------End of imports---------
+
+SOCKET_NAME = '%s.sock' % versioning.__shortname__.lower()
+STOP_REQUEST = '--daemon-stop'
+START_REQUEST = '--daemon-start'
+SOCKET_OPTION = '--daemon-socket'
+
+def default_socket_path():
+    """ Default location of the daemon socket, inside the default cache directory
+
+    :returns: returns the socket path
+    """
+    return os.path.join(cliutils.get_user_config_dir(), '.%s' % versioning.__shortname__, \
+                                                                                SOCKET_NAME)
+
+def session_key(argv):
+    """ Key used to select the daemon session a command is run against. Commands
+    without a URL share the default session, which is restored from the cache. The URL
+    is taken from --url or from the login command, as in login <url>. The password is
+    part of the key as a digest, so a different password never reuses a session logged
+    in with other credentials.
+
+    :param argv: command line arguments
+    :type argv: list.
+    :returns: returns a (url, user, password digest) tuple
+    """
+    url = user = password = None
+    arg_iter = iter(argv)
+    for arg in arg_iter:
+        if arg == '--url':
+            url = next(arg_iter, None)
+        elif arg.startswith('--url='):
+            url = arg.split('=', 1)[1]
+        elif arg in ('-u', '--user'):
+            user = next(arg_iter, None)
+        elif arg.startswith('--user='):
+            user = arg.split('=', 1)[1]
+        elif arg in ('-p', '--password'):
+            password = next(arg_iter, None)
+        elif arg.startswith('--password='):
+            password = arg.split('=', 1)[1]
+
+    #the command is the first argument which isn't an option, as in rdmc
+    command = next((index for index, arg in enumerate(argv) if not arg.startswith('-') \
+                                    and (not index or argv[index - 1] != '-c')), None)
+    if url is None and command is not None and argv[command].lower() == 'login' and \
+                    len(argv) > command + 1 and not argv[command + 1].startswith('-'):
+        url = argv[command + 1]
+
+    if not url:
+        return (None, None, None)
+    if password is not None:
+        if not isinstance(password, bytes):
+            password = password.encode('utf-8')
+        password = hashlib.sha256(password).hexdigest()
+    return (url, user, password)
+
+def _send(conn, **message):
+    """ Send a single newline delimited json message over the socket """
+    conn.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+def _recv_lines(conn):
+    """ Generator for the newline delimited json messages read from the socket """
+    pending = b''
+    while True:
+        data = conn.recv(65536)
+        if not data:
+            break
+        pending += data
+        while b'\n' in pending:
+            line, pending = pending.split(b'\n', 1)
+            if line:
+                yield json.loads(line.decode('utf-8'))
+
+class SocketStream(object):
+    """ File-like object forwarding writes to the daemon client as stream messages """
+    def __init__(self, conn, name):
+        self._conn = conn
+        self._name = name
+        self.encoding = 'utf-8'
+
+    def write(self, data):
+        """ Forward data to the client """
+        if not data:
+            return
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', 'replace')
+        try:
+            _send(self._conn, **{self._name: data})
+        except socket.error:
+            pass
+
+    def flush(self):
+        """ Writes are sent immediately """
+        pass
+
+    def isatty(self):
+        """ The daemon is never attached to a terminal """
+        return False
+
+class NoInputStream(object):
+    """ Standard input of forwarded commands. Reading from the daemon's own input would
+    block every client, so any prompt fails instead. """
+    message = "Commands run through the daemon cannot prompt for input, include the "\
+                                                            "value on the command line."
+
+    def read(self, *_):
+        """ Refuse to read """
+        raise EOFError(self.message)
+
+    def readline(self, *_):
+        """ Refuse to read """
+        raise EOFError(self.message)
+
+    def isatty(self):
+        """ The daemon is never attached to a terminal """
+        return False
+
+def _refuse_getpass(*_args, **_kwargs):
+    """ getpass replacement for forwarded commands """
+    raise EOFError(NoInputStream.message)
+
+class RdmcDaemon(object):
+    """ Daemon holding one persistent RdmcCommand per iLO URL """
+    def __init__(self, sockpath=None):
+        self.sockpath = sockpath or default_socket_path()
+        self.sessions = dict()
+        self._running = False
+        self._rdmc = None
+
+    def serve(self):
+        """ Main daemon loop. Commands are handled one at a time, since stdout and
+        stderr are redirected for the whole process while a command runs. """
+        import rdmc
+        self._rdmc = rdmc
+
+        sockdir = os.path.dirname(self.sockpath)
+        if sockdir and not os.path.isdir(sockdir):
+            os.makedirs(sockdir)
+        try:
+            os.unlink(self.sockpath)
+        except OSError as excp:
+            if excp.errno != errno.ENOENT:
+                raise
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        oldmask = os.umask(0o177)
+        try:
+            server.bind(self.sockpath)
+        finally:
+            os.umask(oldmask)
+        server.listen(5)
+        self._running = True
+
+        try:
+            while self._running:
+                conn, _ = server.accept()
+                try:
+                    self.handle(conn)
+                except Exception as excp:
+                    rdmc.LOGGER.error("Daemon request failed: %s", excp)
+                finally:
+                    conn.close()
+        finally:
+            server.close()
+            os.unlink(self.sockpath)
+            self.shutdown()
+
+    def handle(self, conn):
+        """ Handle a single client request
+
+        :param conn: client connection
+        :type conn: socket.
+        """
+        request = next(_recv_lines(conn), None)
+        if not request:
+            return
+
+        argv = request.get('argv', [])
+        if STOP_REQUEST in argv:
+            self._running = False
+            _send(conn, exit=0)
+            return
+
+        retcode = self.run_command(conn, argv, request.get('cwd'))
+        _send(conn, exit=retcode)
+
+    def run_command(self, conn, argv, cwd=None):
+        """ Run a command against its persistent session with output sent to the client
+
+        :param conn: client connection
+        :type conn: socket.
+        :param argv: command line arguments
+        :type argv: list.
+        :param cwd: working directory of the client
+        :type cwd: str.
+        :returns: returns the command return code
+        """
+        rdmc = self._rdmc
+        key = session_key(argv)
+        olddir = os.getcwd()
+        streams = (sys.stdin, sys.stdout, sys.stderr, rdmc.LERR.stream, getpass.getpass)
+
+        sys.stdin = NoInputStream()
+        sys.stdout = SocketStream(conn, 'stdout')
+        sys.stderr = SocketStream(conn, 'stderr')
+        rdmc.LERR.stream = sys.stderr
+        getpass.getpass = _refuse_getpass
+
+        retcode = rdmc.ReturnCodes.SUCCESS
+        try:
+            if cwd:
+                os.chdir(cwd)
+
+            #a warm session which expired on the server is dropped and the command is
+            #retried once with a new login
+            for attempt in range(2):
+                if key not in self.sessions:
+                    self.sessions[key] = rdmc.create_rdmc(list(argv))
+                    self.sessions[key].persistent = True
+                    self.sessions[key].unattended = True
+                session = self.sessions[key]
+                session.retcode = rdmc.ReturnCodes.SUCCESS
+
+                try:
+                    retcode = session.run(list(argv))
+                except SystemExit as excp:
+                    retcode = excp.code if isinstance(excp.code, int) else session.retcode
+                except rdmc.redfish.ris.SessionExpired:
+                    del self.sessions[key]
+                    if attempt:
+                        raise
+                    continue
+                break
+
+            if session.opts and session.opts.verbose:
+                sys.stdout.write("ILOREST return code: %s\n" % retcode)
+
+            # logout or a failed login leaves nothing worth keeping warm
+            if not session.app.redfishinst:
+                del self.sessions[key]
+        except Exception as excp:
+            retcode = rdmc.ReturnCodes.GENERAL_ERROR
+            sys.stderr.write('ERROR: %s\n' % excp)
+        finally:
+            (sys.stdin, sys.stdout, sys.stderr, rdmc.LERR.stream, getpass.getpass) = streams
+            os.chdir(olddir)
+
+        return retcode if retcode is not None else rdmc.ReturnCodes.SUCCESS
+
+    def shutdown(self):
+        """ Save cached sessions before the daemon exits """
+        for session in self.sessions.values():
+            try:
+                if session.app.cache:
+                    session.app.save()
+                else:
+                    session.app.logout()
+            except Exception:
+                pass
+        self.sessions = dict()
+
+def forward(argv, sockpath=None):
+    """ Forward a command to the daemon and stream back its output
+
+    :param argv: command line arguments
+    :type argv: list.
+    :param sockpath: daemon socket path
+    :type sockpath: str.
+    :returns: returns the command return code or None if no daemon is listening
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(sockpath or default_socket_path())
+    except socket.error:
+        conn.close()
+        return None
+
+    retcode = None
+    try:
+        _send(conn, argv=argv, cwd=os.getcwd())
+        for message in _recv_lines(conn):
+            if 'stdout' in message:
+                sys.stdout.write(message['stdout'])
+                sys.stdout.flush()
+            elif 'stderr' in message:
+                sys.stderr.write(message['stderr'])
+                sys.stderr.flush()
+            elif 'exit' in message:
+                retcode = message['exit']
+                break
+    finally:
+        conn.close()
+
+    return retcode
+
+def main(argv):
+    """ Entry point for both the daemon and the thin client
+
+    :param argv: command line arguments
+    :type argv: list.
+    """
+    sockpath = None
+    if SOCKET_OPTION in argv:
+        index = argv.index(SOCKET_OPTION)
+        sockpath = argv[index + 1] if len(argv) > index + 1 else None
+        argv = argv[:index] + argv[index + 2:]
+
+    if START_REQUEST in argv:
+        RdmcDaemon(sockpath).serve()
+        return 0
+
+    # interactive mode needs a terminal, so it is never forwarded
+    interactive = not [arg for arg in argv if not arg.startswith('-')]
+    retcode = None if interactive and STOP_REQUEST not in argv else forward(argv, sockpath)
+
+    if retcode is None:
+        if STOP_REQUEST in argv:
+            sys.stderr.write("No %s daemon is running.\n" % versioning.__shortname__)
+            return 1
+        rdmcpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rdmc.py')
+        os.execv(sys.executable, [sys.executable, rdmcpath] + argv)
+
+    return retcode
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
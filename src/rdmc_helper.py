@@ -24,18 +24,32 @@ import os
 import sys
 import time
 import json
+import bisect
+import random
+import re
+import shlex
 import logging
+import threading
 
 from collections import OrderedDict
 from ctypes import create_string_buffer, c_char_p, byref
+from multiprocessing.dummy import Pool as ThreadPool
 
 import six
 import pyaes
 
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+from urllib3.exceptions import MaxRetryError
 from prompt_toolkit.completion import Completer, Completion
 
 import redfish.ris
 import redfish.hpilo.risblobstore2 as risblobstore2
+from redfish.rest.connections import HttpConnection, RetriesExhaustedError
 
 import versioning
 from rdmc_base_classes import HARDCODEDLIST
@@ -321,6 +335,9 @@ class TaskQueueError(RdmcError):
     """ Raised when there is an issue with the current order of taskqueue """
     pass
 
+#number of output pieces buffered before writing human readable or json output
+OUTPUT_BUFFER_PIECES = 4096
+
 class UI(object):
     """ UI class handles all of our printing etc so we have
     consistency across the project """
@@ -437,7 +454,7 @@ class UI(object):
         :param content: content to be printed out
         :type content: str.
         """
-        sys.stdout.write(json.dumps(content, indent=2, cls=redfish.ris.JSONEncoder, sort_keys=True))
+        self.write_json(content, sys.stdout, indent=2, sort_keys=True)
         sys.stdout.write('\n')
 
     def print_out_json_ordered(self, content):
@@ -447,9 +464,42 @@ class UI(object):
         :type content: str.
         """
         content = OrderedDict(sorted(list(content.items()), key=lambda x: x[0]))
-        sys.stdout.write(json.dumps(content, indent=2, cls=redfish.ris.JSONEncoder))
+        self.write_json(content, sys.stdout, indent=2)
         sys.stdout.write('\n')
 
+    def print_out_json_lines(self, content, output=None):
+        """ Print out content as JSON Lines, one compact json document per instance
+
+        :param content: instance or list of instances to be printed out
+        :type content: list.
+        :param output: file to write to instead of std.out
+        :type output: file.
+        """
+        output = output or sys.stdout
+        for instance in content if isinstance(content, list) else [content]:
+            self.write_json(instance, output, separators=(',', ':'), sort_keys=True)
+            output.write('\n')
+
+    def write_json(self, content, output, **kwargs):
+        """ Encode content as json and write it to output as it is encoded, instead of
+        building the whole document as one string first
+
+        :param content: content to be written out
+        :type content: str.
+        :param output: file to write to
+        :type output: file.
+        :param kwargs: json encoder arguments, as for json.dumps
+        :type kwargs: dict.
+        """
+        pending = []
+        for piece in redfish.ris.JSONEncoder(**kwargs).iterencode(content):
+            pending.append(piece)
+            if len(pending) >= OUTPUT_BUFFER_PIECES:
+                output.write(''.join(pending))
+                pending = []
+        if pending:
+            output.write(''.join(pending))
+
     def print_out_human_readable(self, content):
         """ Print out human readable content to std.out
 
@@ -469,29 +519,801 @@ class UI(object):
         :param start: used to determine the indent level
         :type start: int.
         """
-        space = '\n' + '\t' * indent + ' ' * start
-        if isinstance(content, list):
-            for item in content:
-                if item is None:
-                    continue
+        pending = []
+        for piece in self.human_readable(content, indent, start, enterloop):
+            pending.append(piece)
+            if len(pending) >= OUTPUT_BUFFER_PIECES:
+                sys.stdout.write(''.join(pending))
+                pending = []
+        if pending:
+            sys.stdout.write(''.join(pending))
+
+    def human_readable(self, content, indent=0, start=0, enterloop=False):
+        """ Generator for the pieces of the human readable form of content, built in
+        one pass with an explicit stack so deeply nested content has no recursion limit
+
+        :param content: content to be converted
+        :type content: str.
+        :param indent: indent string to be used as seperator
+        :type indent: str.
+        :param start: used to determine the indent level
+        :type start: int.
+        """
+        #entries are either text to output or (content, indent, start, enterloop)
+        stack = [(content, indent, start, enterloop)]
+        while stack:
+            entry = stack.pop()
+            if not isinstance(entry, tuple):
+                yield entry
+                continue
+
+            content, indent, start, enterloop = entry
+            space = '\n' + '\t' * indent + ' ' * start
+            work = []
+            if isinstance(content, list):
+                last = len(content) - 1
+                for position, item in enumerate(content):
+                    if item is None:
+                        continue
+
+                    work.append((item, indent, start, False))
+
+                    if position != last:
+                        work.append(space)
+            elif isinstance(content, dict):
+                for key, value in content.items():
+                    if not enterloop:
+                        work.append(space)
+
+                    enterloop = False
+                    work.append(str(key) + '=')
+                    work.append((value, indent, (start + len(key) + 2), False))
+            else:
+                content = content if isinstance(content, six.string_types) else str(content)
+
+                yield '""' if not content else content
+                continue
+
+            stack.extend(reversed(work))
 
-                self.pretty_human_readable(item, indent, start)
+class ThreadedStream(object):
+    """ Stream wrapper sending writes from registered threads to their own file.
+    Threads of a ThreadPool write where the thread that created the pool writes, as
+    multiprocessing.dummy records it as their _parent. Writes from every other thread
+    go to the wrapped stream. """
+    def __init__(self, stream):
+        self._stream = stream
+        self._targets = dict()
 
-                if content.index(item) != (len(content) - 1):
-                    sys.stdout.write(space)
-        elif isinstance(content, dict):
-            for key, value in content.items():
-                if space and not enterloop:
-                    sys.stdout.write(space)
+    def redirect(self, target):
+        """ Send writes from the current thread to target, or back to the wrapped
+        stream if target is None
 
-                enterloop = False
-                sys.stdout.write(str(key) + '=')
-                self.pretty_human_readable(value, indent, (start + len(key) + 2))
+        :param target: file object to write to
+        :type target: file.
+        """
+        ident = threading.current_thread().ident
+        if target is None:
+            self._targets.pop(ident, None)
         else:
-            content = content if isinstance(content, six.string_types) else str(content)
+            self._targets[ident] = target
+
+    def target(self):
+        """ Return the stream registered for the current thread or the closest thread it
+        was started from """
+        thread = threading.current_thread()
+        while thread is not None:
+            if thread.ident in self._targets:
+                return self._targets[thread.ident]
+            thread = getattr(thread, '_parent', None)
+
+        return self._stream
+
+    def write(self, data):
+        """ Write data to the stream registered for the current thread """
+        self.target().write(data)
+
+    def flush(self):
+        """ Flush the stream registered for the current thread """
+        self.target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class InstanceIndex(object):
+    """ Secondary index over the instances of the selected types, from property path to
+    value to the instances with that value, used for --filter. The index for a path is
+    built the first time it is filtered on and rebuilt when the instances of the type
+    change, such as after a refresh or a commit reloads them. """
+    #[ATTRIBUTE][OPERATOR][VALUE], the operators are >=, <=, =, > and <
+    FILTER_FORMAT = re.compile(r'^([^<>=]+?)\s*(>=|<=|=|>|<)\s*(.*)$')
+
+    def __init__(self):
+        self._indexes = dict()
+
+    @staticmethod
+    def parse(filters):
+        """ Parse --filter values of the form [ATTRIBUTE][OPERATOR][VALUE]
+
+        :param filters: filter values given on the command line
+        :type filters: list.
+        :returns: returns a list of (attribute, operator, value) tuples
+        """
+        parsed = []
+        for fltr in filters or []:
+            fltr = str(fltr)
+            if fltr[0] == fltr[-1] and fltr.startswith(("'", '"')):
+                fltr = fltr[1:-1]
+
+            match = InstanceIndex.FILTER_FORMAT.match(fltr.strip())
+            if not match:
+                raise InvalidCommandLineError("Invalid filter parameter format "\
+                                    "[filter_attribute]=[filter_value]")
+
+            (path, operator, value) = match.groups()
+            parsed.append((path, operator, value.strip('\'\"')))
+        return parsed
+
+    def select(self, app, selector, filters):
+        """ Select the instances of a type matching every filter
+
+        :param app: application to select from
+        :type app: RmcApp.
+        :param selector: type to select
+        :type selector: str.
+        :param filters: (attribute, operator, value) tuples, combined with AND
+        :type filters: list.
+        :returns: returns the matching instances
+        """
+        instances = app.select(selector=selector)
+        matches = None
+        for path, operator, value in filters:
+            found = self.match(selector, instances, path, operator, value)
+            matches = found if matches is None else matches & found
+
+        if not matches:
+            raise redfish.ris.InstanceNotFoundError("Unable to locate instance for '%s' and "\
+                    "filter '%s'" % (selector, ' and '.join(''.join(fltr) for fltr in filters)))
+
+        return [instances[ind] for ind in sorted(matches)]
+
+    def match(self, selector, instances, path, operator, value):
+        """ Find the instances with a property matching a filter. Values are compared
+        without case, a trailing * on an = value matches by prefix and the range operators
+        compare numerically when the value is a number.
+
+        :param selector: type the instances belong to
+        :type selector: str.
+        :param instances: instances of the type
+        :type instances: list.
+        :param path: property path, with / between nested properties
+        :type path: str.
+        :param operator: one of >=, <=, =, > and <
+        :type operator: str.
+        :param value: value to compare with
+        :type value: str.
+        :returns: returns the set of positions of the matching instances
+        """
+        index = self.index(selector, instances, path)
+        value = value.lower()
+
+        if operator == '=' and not value:
+            return set(index['present'])
+        elif operator == '=' and not value.endswith('*'):
+            return set(index['values'].get(value, ()))
+        elif operator == '=':
+            keys = index['keys']
+            start = end = bisect.bisect_left(keys, value[:-1])
+            while end < len(keys) and keys[end].startswith(value[:-1]):
+                end += 1
+            return set(ind for key in keys[start:end] for ind in index['values'][key])
+
+        number = InstanceIndex.number(value)
+        (keys, entries) = (index['numberkeys'], index['numbers']) if number is not None else \
+                                                        (index['stringkeys'], index['strings'])
+        value = number if number is not None else value
+
+        if operator == '>=':
+            return set(ind for _, ind in entries[bisect.bisect_left(keys, value):])
+        elif operator == '>':
+            return set(ind for _, ind in entries[bisect.bisect_right(keys, value):])
+        elif operator == '<=':
+            return set(ind for _, ind in entries[:bisect.bisect_right(keys, value)])
+        return set(ind for _, ind in entries[:bisect.bisect_left(keys, value)])
+
+    def index(self, selector, instances, path):
+        """ Return the index of a property path, building it if the instances changed
+
+        :param selector: type the instances belong to
+        :type selector: str.
+        :param instances: instances of the type
+        :type instances: list.
+        :param path: property path, with / between nested properties
+        :type path: str.
+        :returns: returns the index
+        """
+        key = (selector.lower(), path.lower())
+        stamp = [(inst.path, inst.etag, id(inst.resp)) for inst in instances]
+        index = self._indexes.get(key)
+        if index and index['stamp'] == stamp:
+            return index
+
+        index = dict(stamp=stamp, present=set(), values=dict(), numbers=[], strings=[])
+        parts = [part.lower() for part in path.split('/')]
+        for ind, inst in enumerate(instances):
+            for leaf in InstanceIndex.leaves(inst.dict, parts):
+                index['present'].add(ind)
+                text = six.text_type(",".join(six.text_type(item) for item in leaf) if \
+                                            isinstance(leaf, (list, tuple)) else leaf).lower()
+                index['values'].setdefault(text, set()).add(ind)
+                index['strings'].append((text, ind))
+                number = InstanceIndex.number(leaf)
+                if number is not None:
+                    index['numbers'].append((number, ind))
+
+        index['keys'] = sorted(index['values'])
+        index['strings'].sort()
+        index['numbers'].sort()
+        index['numberkeys'] = [number for number, _ in index['numbers']]
+        index['stringkeys'] = [text for text, _ in index['strings']]
+        self._indexes[key] = index
+        return index
+
+    @staticmethod
+    def leaves(data, parts):
+        """ Generator for the values at a property path, matching property names without
+        case and following every item of the lists on the path
+
+        :param data: instance data
+        :type data: dict.
+        :param parts: lower case property names of the path
+        :type parts: list.
+        """
+        stack = [(data, 0)]
+        while stack:
+            (data, depth) = stack.pop()
+            if depth == len(parts):
+                yield data
+            elif isinstance(data, dict):
+                key = next((key for key in data if key.lower() == parts[depth]), None)
+                if key is not None:
+                    stack.append((data[key], depth + 1))
+            elif isinstance(data, list):
+                stack.extend((item, depth) for item in data)
+
+    @staticmethod
+    def number(value):
+        """ Return value as a number, or None if it is not numeric
+
+        :param value: value to convert
+        :type value: str.
+        :returns: returns the number or None
+        """
+        if isinstance(value, bool):
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+class PriorityLock(object):
+    """ Lock shared by the foreground and background threads, which gives the foreground
+    priority. The foreground holds it with a with statement, background threads hold the
+    lock returned by background(). """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def __enter__(self):
+        self._idle.clear()
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self._lock.release()
+        self._idle.set()
+
+    def background(self):
+        """ Wait until the foreground is not waiting for or holding the lock
+
+        :returns: returns the lock for the background thread to hold
+        """
+        self._idle.wait()
+        return self._lock
+
+class Prefetcher(object):
+    """ Loads commonly used types into the monolith of an application on a background
+    thread. The monolith is not thread safe, so each type is loaded while holding a lock
+    that the foreground also holds while it runs a command. A command waits for at most
+    the type currently being loaded. """
+    #types loaded in order, the Bios type also loads its attribute registry
+    TYPES = ('ComputerSystem.', 'Bios.', 'Manager.', 'EthernetInterface.')
+
+    def __init__(self, app, lock, types=None):
+        """ Constructor
+
+        :param app: application to load the types into
+        :type app: RmcApp.
+        :param lock: lock held while the monolith is in use
+        :type lock: PriorityLock.
+        :param types: types to load, defaults to TYPES
+        :type types: list.
+        """
+        self._app = app
+        self.lock = lock
+        self.types = types or self.TYPES
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """ Start loading the types in the background """
+        self._thread = threading.Thread(target=self._run, name='prefetch')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def cancel(self, wait=True):
+        """ Stop loading any more types
+
+        :param wait: wait for the type currently being loaded
+        :type wait: bool.
+        """
+        self._cancel.set()
+        if wait and self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        """ Load every type in turn until cancelled """
+        for selector in self.types:
+            with self.lock.background():
+                if self._cancel.is_set():
+                    return
+                try:
+                    self.load(selector)
+                except Exception as excp:
+                    LOGGER.info("Unable to prefetch %s: %s", selector, excp)
+
+    def load(self, selector):
+        """ Load the instances of a type, and the attribute registry of the Bios type
+
+        :param selector: type to load
+        :type selector: str.
+        """
+        selector = self._app.typepath.modifyselectorforgen(selector)
+
+        if selector.lower().startswith(self._app.typepath.defs.biostype.lower()):
+            (instances, attributeregistry) = self._app.get_selection(selector=selector, \
+                                                                            setenable=True)
+            if instances and attributeregistry:
+                self._app.get_model(instances[0].dict, attributeregistry)
+        else:
+            self._app.get_selection(selector=selector)
+
+class ServerPool(object):
+    """ Runs commands against multiple servers concurrently inside this process.
+    Every server gets its own RdmcCommand (and RmcApp) and its output is written to
+    its own log file. """
+    RETRY_CODES = [ReturnCodes.V1_RETRIES_EXHAUSTED_ERROR, \
+                   ReturnCodes.V1_SERVER_DOWN_OR_UNREACHABLE_ERROR]
+
+    def __init__(self, rdmc, workers=10, timeout=None, retries=0, progress=None):
+        """ Constructor
+
+        :param rdmc: main command object, used to spawn a session per server
+        :type rdmc: RdmcCommand.
+        :param workers: maximum number of servers processed at the same time
+        :type workers: int.
+        :param timeout: seconds allowed for each server, None for no limit
+        :type timeout: int.
+        :param retries: attempts repeated when a server can not be reached
+        :type retries: int.
+        :param progress: called with the job name and the fields of each progress event
+                         reported by the commands run
+        :type progress: function.
+        """
+        self._rdmc = rdmc
+        self.workers = max(1, workers or 1)
+        self.timeout = timeout
+        self.retries = max(0, retries or 0)
+        self.progress = progress
+        self.durations = dict()
+        self._stdout = None
+        self._stderr = None
+        self._abandoned = []
+
+    @staticmethod
+    def readmpfile(mpfile):
+        """ Validate a multiple server file and return the servers listed in it
+
+        :param mpfile: multiple server file
+        :type mpfile: string.
+        :returns: returns a list of (name, argument list) tuples, one per server line. The
+                  name is the host of the --url argument, followed by the line number when
+                  the host is on more than one line, and names the files of the server.
+        """
+        sys.stdout.write('Checking given server information...\n')
+
+        if mpfile.startswith(('"', "'")) and mpfile[0] == mpfile[-1]:
+            mpfile = mpfile[1:-1]
+
+        if not os.path.isfile(mpfile):
+            raise InvalidFileInputError("File '%s' doesn't exist." % mpfile)
+
+        servers = list()
+        with open(mpfile, "r") as myfile:
+            for lineno, line in enumerate(myfile, 1):
+                if not line.strip():
+                    continue
+
+                args = shlex.split(line, posix=False)
+
+                if len(args) < 5 or '--url' not in args:
+                    sys.stderr.write('Incomplete data in input file: {}\n'.format(line))
+                    raise InvalidMSCfileInputError('Please verify the '\
+                                        'contents of the %s file' % mpfile)
+                servers.append((lineno, args[args.index('--url')+1].split('//')[-1], args))
+
+        if not servers:
+            raise InvalidMSCfileInputError('No servers found in the %s file' % mpfile)
+
+        hosts = [host for _, host, _ in servers]
+        return [(host if hosts.count(host) == 1 else '%s_%s' % (host, lineno), args) \
+                                                        for lineno, host, args in servers]
+
+    def runmanifest(self, jobs, outputdir, action, fields=None, quiet=False):
+        """ Run the jobs of a multiple server file, reporting each server as it finishes,
+        and write the manifest of the run to outputdir in the order of the jobs
+
+        :param jobs: list of (name, argv, logfile path) tuples with unique names
+        :type jobs: list.
+        :param outputdir: directory the manifest is written to
+        :type outputdir: str.
+        :param action: what is done on each server, as shown in the report
+        :type action: str.
+        :param fields: returns additional manifest fields of a finished job as a list of
+                       (key, value) tuples, called with the job name and return code
+        :type fields: function.
+        :param quiet: don't write the report to the console
+        :type quiet: bool.
+        :returns: returns the manifest entries
+        """
+        positions = dict((job[0], ind) for ind, job in enumerate(jobs))
+        manifest = [None] * len(jobs)
+
+        for name, _, logpath, returncode in self.run(jobs):
+            status = 'SUCCESS' if not returncode else 'FAILED'
+            seconds = round(self.durations.get(name, 0), 2)
+            manifest[positions[name]] = OrderedDict([('server', name)] + \
+                        (fields(name, returncode) if fields else []) + \
+                        [('log', os.path.basename(logpath)), ('status', status), \
+                        ('returncode', returncode), ('seconds', seconds)])
+            if self.progress:
+                self.progress(name, event='finished', status=status, returncode=returncode, \
+                                                                            seconds=seconds)
+
+            if quiet:
+                continue
+
+            sys.stdout.write('{} {} : {}\n'.format(action, name, status))
+            if returncode:
+                sys.stderr.write('ILOREST return code : {}.\nFor more details please check '\
+                        '{} under {} directory.\n'.format(returncode, os.path.basename(logpath), \
+                                                                                    outputdir))
+
+        manifestpath = os.path.join(outputdir, 'manifest.json')
+        with open(manifestpath, 'w') as outfile:
+            outfile.write(json.dumps(manifest, indent=2))
+
+        if not quiet:
+            sys.stdout.write("Manifest saved to: %s\n" % manifestpath)
+
+        return manifest
+
+    def run(self, jobs):
+        """ Run the jobs, yielding each one with its return code as soon as it finishes
+
+        :param jobs: list of (name, argv, logfile path) tuples
+        :type jobs: list.
+        :returns: generator of (name, argv, logfile path, return code) tuples
+        """
+        if not jobs:
+            return
+
+        streams = (sys.stdout, sys.stderr, LERR.stream)
+        self._stdout = sys.stdout = ThreadedStream(sys.stdout)
+        self._stderr = sys.stderr = LERR.stream = ThreadedStream(sys.stderr)
+
+        pool = ThreadPool(min(self.workers, len(jobs)))
+        try:
+            for result in pool.imap_unordered(self._runjob, jobs):
+                yield result
+        finally:
+            pool.close()
+            #commands which timed out keep writing to their log file through the wrappers,
+            #which pass every other write on to the original streams
+            if not any(worker.is_alive() for worker in self._abandoned):
+                (sys.stdout, sys.stderr, LERR.stream) = streams
+
+    def _runjob(self, job):
+        """ Run a single job, retrying while the server can not be reached
+
+        :param job: (name, argv, logfile path) tuple
+        :type job: tuple.
+        """
+        (name, argv, logpath) = job
+        starttime = time.time()
+        logfile = open(logpath, 'w+')
+        owned = True
+        if self.progress:
+            self.progress(name, event='started')
+        try:
+            (returncode, owned) = self._attempt(name, argv, logfile)
+            for attempt in range(self.retries):
+                #an attempt which timed out is still running, never start another one
+                if returncode not in self.RETRY_CODES or not owned:
+                    break
+                logfile.write("\nRetrying %s (attempt %s of %s)...\n" % (name, attempt + 2, \
+                                                                        self.retries + 1))
+                (returncode, owned) = self._attempt(name, argv, logfile)
+        finally:
+            if owned:
+                logfile.close()
+            self.durations[name] = time.time() - starttime
+
+        return (name, argv, logpath, returncode)
+
+    def _attempt(self, name, argv, logfile):
+        """ Run the command once on its own thread, giving up after the timeout. A command
+        which times out can not be stopped, it keeps writing to the log file and closes
+        it when it finishes.
+
+        :param name: job name
+        :type name: str.
+        :param argv: command line arguments
+        :type argv: list.
+        :param logfile: file receiving the command output
+        :type logfile: file.
+        :returns: returns the return code and False if the command timed out and now
+                  owns the log file
+        """
+        result = [ReturnCodes.GENERAL_ERROR]
+        state = dict(finished=False, abandoned=False)
+        lock = threading.Lock()
+
+        def target():
+            """ Run the command with its output sent to the log file """
+            self._stdout.redirect(logfile)
+            self._stderr.redirect(logfile)
+            try:
+                session = self._rdmc.spawn(list(argv))
+                session.unattended = True
+                if self.progress:
+                    session.progress = lambda **event: self.progress(name, **event)
+                result[0] = session.run(list(argv))
+            except SystemExit as excp:
+                result[0] = excp.code if isinstance(excp.code, int) else \
+                                                                ReturnCodes.GENERAL_ERROR
+            except Exception as excp:
+                logfile.write('ERROR: %s\n' % excp)
+            finally:
+                self._stdout.redirect(None)
+                self._stderr.redirect(None)
+                with lock:
+                    state['finished'] = True
+                    if state['abandoned']:
+                        logfile.close()
+
+        worker = threading.Thread(target=target)
+        worker.daemon = True
+        worker.start()
+        worker.join(self.timeout)
+
+        with lock:
+            if not state['finished']:
+                state['abandoned'] = True
+                self._abandoned.append(worker)
+                logfile.write("\nERROR: Timed out after %s seconds.\n" % self.timeout)
+                return (ReturnCodes.GENERAL_ERROR, False)
+
+        return (result[0] if result[0] is not None else ReturnCodes.SUCCESS, True)
+
+class StreamingRequest(object):
+    """ Requests whose bodies are streamed instead of held in memory, for large uploads
+    and downloads and for event streams. The redfish library client only sends buffered
+    requests, so this is the one place which sends requests on the connection pool of a
+    client, with the authentication headers the client adds to its own requests. """
+    @staticmethod
+    def available(client):
+        """ Check if requests of a client can be streamed, which needs a remote connection
+
+        :param client: redfish library client
+        :type client: RestClient.
+        :returns: returns True if send can be used with the client
+        """
+        return isinstance(client.connection, HttpConnection)
+
+    @staticmethod
+    def send(client, method, path, headers=None, body=None, **kwargs):
+        """ Send a request without reading the response body. The caller reads the body
+        with stream or read and then calls release_conn on the response.
+
+        :param client: redfish library client with a remote connection
+        :type client: RestClient.
+        :param method: HTTP method
+        :type method: str.
+        :param path: path of the request
+        :type path: str.
+        :param headers: additional request headers
+        :type headers: dict.
+        :param body: request body, a string or a file like object read while sending
+        :type body: str or file.
+        :param kwargs: urllib3 request arguments, such as retries
+        :type kwargs: dict.
+        :returns: returns the unread urllib3 response
+        """
+        headers = client._get_req_headers(headers=dict(headers or {}))
+        try:
+            return client.connection._conn(method, str(client.base_url + \
+                                path.replace('//', '/')), body=body, headers=headers, \
+                                preload_content=False, **kwargs)
+        except MaxRetryError:
+            raise RetriesExhaustedError()
+
+class ProgressTracker(object):
+    """ Follows the state of a long running operation until it finishes. The service's
+    server-sent event stream is used to learn about changes when it offers one, otherwise
+    the state is polled with exponential backoff and jitter. """
+    def __init__(self, rdmc, fetch, done, callback=None, initial=0.5, maximum=8, \
+                                                            usesse=True, active=None):
+        """ Constructor
+
+        :param rdmc: command object of the server the operation runs on
+        :type rdmc: RdmcCommand.
+        :param fetch: returns the current state of the operation
+        :type fetch: function.
+        :param done: returns True when passed a state the operation finishes in
+        :type done: function.
+        :param callback: called with the new state every time the state changes
+        :type callback: function.
+        :param initial: seconds between the first checks of the state
+        :type initial: float.
+        :param maximum: longest time between checks of the state when polling
+        :type maximum: float.
+        :param usesse: listen to the server-sent event stream if the service has one
+        :type usesse: bool.
+        :param active: returns True when passed a state the operation is known to be making
+                       progress in, the timeout does not run while in such a state
+        :type active: function.
+        """
+        self._rdmc = rdmc
+        self.fetch = fetch
+        self.done = done
+        self.callback = callback
+        self.initial = initial
+        self.maximum = maximum
+        self.usesse = usesse
+        self.active = active
+        self._changed = threading.Event()
+        self._stream = None
+
+    def wait(self, timeout=None, deadline=None):
+        """ Wait for the operation to finish
+
+        :param timeout: seconds allowed without a change of state, None for no limit
+        :type timeout: int.
+        :param deadline: seconds allowed in total, however often the state changes, None
+                         for no limit
+        :type deadline: int.
+        :returns: returns the last state, which the caller checks with done if a
+                  timeout or deadline was given
+        """
+        starttime = time.time()
+        if self.usesse:
+            self._subscribe()
+
+        try:
+            state = self.fetch()
+            if self.callback:
+                self.callback(state)
+
+            delay = self.initial
+            lastchange = time.time()
+
+            while not self.done(state):
+                now = time.time()
+                if deadline is not None and now - starttime >= deadline:
+                    break
+                elif self.active and self.active(state):
+                    lastchange = now
+                elif timeout is not None and now - lastchange >= timeout:
+                    break
+
+                #events only wake the loop, so the state is still polled now and then
+                maxdelay = self.maximum * 4 if self._stream else self.maximum
+                pause = delay * random.uniform(0.75, 1.25)
+                if deadline is not None:
+                    pause = max(0, min(pause, starttime + deadline - now))
+                self._changed.wait(pause)
+                self._changed.clear()
+
+                laststate, state = state, self.fetch()
+
+                if state != laststate:
+                    lastchange = time.time()
+                    delay = self.initial
+                    if self.callback:
+                        self.callback(state)
+                else:
+                    delay = min(delay * 2, maxdelay)
+        finally:
+            self._unsubscribe()
+
+        return state
 
-            content = '""' if not content else content
-            sys.stdout.write(content)
+    def _subscribe(self):
+        """ Open the service's server-sent event stream, if it has one, and wake the wait
+        loop whenever an event arrives """
+        try:
+            client = self._rdmc.app.current_client
+            if not StreamingRequest.available(client):
+                return
+
+            uri = self._rdmc.app.get_handler('/redfish/v1/EventService/', silent=True, \
+                                                service=True).dict.get('ServerSentEventUri')
+            if not uri:
+                return
+
+            response = StreamingRequest.send(client, 'GET', uri, headers={'Accept': \
+                                                        'text/event-stream'}, retries=False)
+
+            if response.status != 200:
+                response.release_conn()
+                return
+        except Exception as excp:
+            LOGGER.info("Server-sent events are not available: %s", excp)
+            return
+
+        self._stream = response
+        listener = threading.Thread(target=self._listen, args=(response,))
+        listener.daemon = True
+        listener.start()
+
+    def _listen(self, response):
+        """ Read events from the stream until it is closed
+
+        :param response: unread server-sent event stream response
+        :type response: urllib3.response.HTTPResponse.
+        """
+        chunks = response.read_chunked() if response.chunked else \
+                                                iter(lambda: response.read(1), b'')
+        pending = b''
+
+        try:
+            for chunk in chunks:
+                pending += chunk
+                while b'\n' in pending:
+                    line, pending = pending.split(b'\n', 1)
+                    if line.startswith(b'data:'):
+                        self._changed.set()
+        except Exception:
+            pass
+        finally:
+            if self._stream is response:
+                self._stream = None
+
+    def _unsubscribe(self):
+        """ Close the server-sent event stream """
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+#size of the chunks encrypted files are processed in
+ENCRYPTION_CHUNK_SIZE = 1024 * 1024
+#initial AES-CTR counter block used by pyaes, kept for the native backend
+CTR_INITIAL_COUNTER = b'\x00' * 15 + b'\x01'
 
 class Encryption(object):
     """ Encryption/Decryption object """
@@ -527,6 +1349,27 @@ class Encryption(object):
                 fips = False
         return fips
 
+    @staticmethod
+    def cipher(key):
+        """ AES-CTR transform for a key, using the native cryptography backend when it
+        is installed and pyaes otherwise. Both use pyaes' initial counter of 1 so files
+        are interchangeable.
+
+        :param key: string to encrypt or decrypt with
+        :type key: str.
+
+        :returns: returns a function transforming consecutive chunks of data
+        """
+        if not isinstance(key, bytes):
+            key = key.encode("utf8")
+        if len(key) not in [16, 24, 32]:
+            raise InvalidKeyError("")
+
+        if Cipher is not None:
+            return Cipher(algorithms.AES(key), modes.CTR(CTR_INITIAL_COUNTER), \
+                                                    backend=default_backend()).encryptor().update
+        return pyaes.AESModeOfOperationCTR(key).encrypt
+
     def encrypt_file(self, filetxt, key):
         """ encrypt a file given a key
 
@@ -538,13 +1381,42 @@ class Encryption(object):
         if Encryption.check_fips_mode_os():
             raise CommandNotEnabledError("Encrypting of files is not available"\
                                          " in FIPS mode.")
-        filetxt = str(filetxt)
-        if len(key.encode("utf8")) not in [16, 24, 32]:
-            raise InvalidKeyError("")
-        else:
-            encryptedfile = pyaes.AESModeOfOperationCTR(key).encrypt(filetxt.encode("utf8"))
+        transform = Encryption.cipher(key)
+        filetxt = str(filetxt).encode("utf8")
 
-        return encryptedfile
+        return b''.join(transform(filetxt[start:start + ENCRYPTION_CHUNK_SIZE]) for start \
+                                        in range(0, len(filetxt), ENCRYPTION_CHUNK_SIZE))
+
+    def encrypt_json(self, data, outfile, key, **kwargs):
+        """ encode data as json and encrypt it to a file in chunks, without building
+        the whole document in memory
+
+        :param data: data to be encoded and encrypted
+        :type data: dict.
+        :param outfile: binary file to write the encrypted data to
+        :type outfile: file.
+        :param key: string to encrypt with
+        :type key: str.
+        :param kwargs: json encoder arguments, as for json.dumps
+        :type kwargs: dict.
+        """
+        if Encryption.check_fips_mode_os():
+            raise CommandNotEnabledError("Encrypting of files is not available"\
+                                         " in FIPS mode.")
+        transform = Encryption.cipher(key)
+        encoder = kwargs.pop('cls', None) or json.JSONEncoder
+
+        pending = []
+        pendingsize = 0
+        for chunk in encoder(**kwargs).iterencode(data):
+            pending.append(six.text_type(chunk))
+            pendingsize += len(chunk)
+            if pendingsize >= ENCRYPTION_CHUNK_SIZE:
+                outfile.write(transform(''.join(pending).encode("utf8")))
+                pending = []
+                pendingsize = 0
+        if pending:
+            outfile.write(transform(''.join(pending).encode("utf8")))
 
     def decrypt_file(self, filetxt, key):
         """ decrypt a file given a key
@@ -556,18 +1428,51 @@ class Encryption(object):
 
         :returns: returns the decrypted file
         """
-        if len(key.encode("utf8")) not in [16, 24, 32]:
-            raise InvalidKeyError("")
-        else:
-            decryptedfile = pyaes.AESModeOfOperationCTR(key).decrypt(filetxt)
-            try:
-                json.loads(decryptedfile)
-            except:
-                raise UnableToDecodeError("Unable to decrypt the file, make "\
-                        "sure the key is the same as used in encryption.")
+        decryptedfile = self.decrypt_stream(filetxt, key)
+        try:
+            json.loads(decryptedfile)
+        except:
+            raise UnableToDecodeError("Unable to decrypt the file, make "\
+                    "sure the key is the same as used in encryption.")
 
         return decryptedfile
 
+    def decrypt_stream(self, infile, key):
+        """ decrypt file content or a binary file object in chunks given a key
+
+        :param infile: content or binary file to be decrypted
+        :type infile: str or file.
+        :param key: string to decrypt with
+        :type key: str.
+
+        :returns: returns the decrypted content
+        """
+        transform = Encryption.cipher(key)
+
+        if isinstance(infile, bytes):
+            chunks = (infile[start:start + ENCRYPTION_CHUNK_SIZE] for start \
+                                    in range(0, len(infile), ENCRYPTION_CHUNK_SIZE))
+        else:
+            chunks = iter(lambda: infile.read(ENCRYPTION_CHUNK_SIZE), b'')
+
+        return b''.join(transform(chunk) for chunk in chunks)
+
+    def decrypt_json(self, infile, key):
+        """ decrypt and parse an encrypted json file given a key
+
+        :param infile: content or binary file to be decrypted
+        :type infile: str or file.
+        :param key: string to decrypt with
+        :type key: str.
+
+        :returns: returns the parsed json data
+        """
+        try:
+            return json.loads(self.decrypt_stream(infile, key).decode("utf8"))
+        except ValueError:
+            raise UnableToDecodeError("Unable to decrypt the file, make "\
+                    "sure the key is the same as used in encryption.")
+
     @staticmethod
     def decode_credentials(credential):
         """ decode an encoded credential
@@ -624,12 +1529,221 @@ class Encryption(object):
 
         return retbuff.value
 
+class JsonObjectWriter(object):
+    """ Writes a json object one member at a time, formatted the way json.dump formats
+    the whole object, so a document can be written out as its parts become ready. Members
+    are written in the order given, sort_keys only applies inside them. The output is
+    encrypted as it is written when a key is given. """
+    def __init__(self, outfile, key=None, **kwargs):
+        """ Constructor
+
+        :param outfile: file to write to, opened in binary mode when a key is given
+        :type outfile: file.
+        :param key: string to encrypt with, None to write plain json
+        :type key: str.
+        :param kwargs: json encoder arguments, as for json.dumps
+        :type kwargs: dict.
+        """
+        if key and Encryption.check_fips_mode_os():
+            raise CommandNotEnabledError("Encrypting of files is not available"\
+                                         " in FIPS mode.")
+        self._outfile = outfile
+        self._transform = Encryption.cipher(key) if key else None
+        self._encoder = (kwargs.pop('cls', None) or json.JSONEncoder)(**kwargs)
+        self._indent = kwargs.get('indent')
+        self._members = 0
+
+    def write(self, name, value):
+        """ Write a member of the object
+
+        :param name: member name
+        :type name: str.
+        :param value: member value
+        :type value: dict.
+        """
+        newline = '\n' + ' ' * self._indent if self._indent is not None else ''
+        member = self._encoder.encode(value)
+        if self._indent is not None:
+            member = member.replace('\n', newline)
+
+        self._write(('{' if not self._members else self._encoder.item_separator) + newline + \
+                    self._encoder.encode(name) + self._encoder.key_separator + member)
+        self._members += 1
+
+    def close(self):
+        """ Write the end of the object """
+        if not self._members:
+            self._write('{}')
+        else:
+            self._write(('\n' if self._indent is not None else '') + '}')
+
+    def _write(self, text):
+        """ Write text to the file, encrypting it if needed """
+        if self._transform:
+            self._outfile.write(self._transform(six.text_type(text).encode("utf8")))
+        else:
+            self._outfile.write(text)
+
+class AtomicFileWriter(object):
+    """ Writes a file under a temporary name next to it and moves it into place once it is
+    complete, so a failure part way through never leaves a truncated file behind and
+    keeps any previous version of the file. """
+    def __init__(self, path, mode='w'):
+        """ Constructor
+
+        :param path: file to write
+        :type path: str.
+        :param mode: mode to open the file with
+        :type mode: str.
+        """
+        self.path = path
+        self.tmppath = '%s.%s.tmp' % (path, os.getpid())
+        self._file = open(self.tmppath, mode)
+
+    def commit(self):
+        """ Close the file and move it into place """
+        self._file.close()
+        if os.name == 'nt' and os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(self.tmppath, self.path)
+
+    def discard(self):
+        """ Close and remove the file, leaving the destination as it was """
+        self._file.close()
+        try:
+            os.remove(self.tmppath)
+        except OSError:
+            pass
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+class PropertyTrie(object):
+    """ Prefix trie over the nested property paths of the selection, used by the tab
+    completer. Every node keeps the sorted names of its children, with and without the
+    reserved properties, and the help text for its property from the schema or registry. """
+    __slots__ = ('children', 'names', 'visible', 'help')
+
+    def __init__(self, data=None, info=None):
+        """ Constructor
+
+        :param data: nested properties of the selection
+        :type data: dict.
+        :param info: schema or attribute registry information for the properties
+        :type info: dict.
+        """
+        self.children = dict()
+        self.names = []
+        self.visible = []
+        self.help = ''
+
+        #build without recursion, large OEM trees can be deeply nested
+        stack = [(self, data, info)] if data is not None else []
+        while stack:
+            node, data, info = stack.pop()
+            node.help = PropertyTrie.helptext(info)
+
+            if not isinstance(data, dict):
+                continue
+
+            for key, value in data.items():
+                child = PropertyTrie()
+                node.children[key] = child
+                stack.append((child, value, PropertyTrie.childinfo(info, key)))
+
+            node.names = sorted(node.children)
+            node.visible = [name for name in node.names if not (name.lower() in HARDCODEDLIST \
+                    or '@odata' in name.lower() or '@redfish.allowablevalues' in name.lower())]
+
+    def find(self, path):
+        """ Return the deepest node along a property path
+
+        :param path: property names to follow
+        :type path: list.
+        :returns: returns the last node found on the path
+        """
+        node = self
+        for name in path:
+            if name not in node.children:
+                break
+            node = node.children[name]
+        return node
+
+    def complete(self, prefix, reserved=False):
+        """ Return the sorted names of the children starting with prefix
+
+        :param prefix: beginning of the property name
+        :type prefix: str.
+        :param reserved: include the reserved and @odata properties
+        :type reserved: bool.
+        :returns: returns a list of property names
+        """
+        names = self.names if reserved else self.visible
+        start = end = bisect.bisect_left(names, prefix)
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return names[start:end]
+
+    @staticmethod
+    def childinfo(info, key):
+        """ Return the schema or registry information of a child property
+
+        :param info: schema or registry information of the parent property
+        :type info: dict.
+        :param key: name of the child property
+        :type key: str.
+        :returns: returns the information of the child, empty if there is none
+        """
+        if not info:
+            return {}
+        try:
+            if 'properties' in info:
+                info = info['properties']
+            if not 'AttributeName' in info[key]:
+                return info['properties'][key] if 'properties' in info else info[key]
+            return info[key]
+        except Exception:
+            return {}
+
+    @staticmethod
+    def helptext(info):
+        """ Build the help bar text for a property
+
+        :param info: schema or registry information of the property
+        :type info: dict.
+        :returns: returns the help text
+        """
+        try:
+            help_text = info.get('HelpText', '')
+            if 'Type' in info and info['Type'].lower() == "enumeration":
+                help_text += "\nPossible Values:\n"
+                for value in info['Value']:
+                    help_text += six.u(str(value['ValueName'])) + ' '
+
+            if not help_text:
+                try:
+                    info = info['properties']
+                except KeyError:
+                    pass
+                help_text = info.get('description', '')
+                if 'enum' in info:
+                    help_text += "\nPossible Values:\n"
+                    for value in info['enum']:
+                        help_text += six.u(str(value)) + ' '
+        except Exception:
+            return ''
+
+        if isinstance(help_text, six.text_type):
+            help_text = help_text.replace('. ', '.\n')
+        return help_text
+
 class TabAndHistoryCompletionClass(Completer):
     """ Tab and History Class used by interactive mode """
     def __init__(self, options):
         self.options = options
         self.toolbar_text = None
         self.last_complete = None
+        self.trie = PropertyTrie()
 
     def get_completions(self, document, complete_event):
         """ Function to return the options for autocomplete """
@@ -660,53 +1774,10 @@ class TabAndHistoryCompletionClass(Completer):
                     else:
                         lstoption = self.options.get(tokens[0], {})
                 elif tokens[0] in ['get', 'list', 'info', 'set']:
-                    #Match properties
-                    nested_data = self.options.get('nestedprop', {})
-                    nested_info = self.options.get('nestedinfo', {})
-                    for token in nestedtokens:
-                        try:
-                            nested_data = nested_data[token]
-                            if tokens[0] == 'get' and isinstance(nested_data, dict):
-                                for k in list(nested_data.keys()):
-                                    if k.lower() in HARDCODEDLIST or '@odata' in k.lower() or \
-                                                            '@redfish.allowablevalues' in k.lower():
-                                        del nested_data[k]
-                            if nested_info:
-                                if 'properties' in nested_info:
-                                    nested_info = nested_info['properties']
-                                if not 'AttributeName' in nested_info[token]:
-                                    nested_info = nested_info['properties'][token] if 'properties' \
-                                                        in nested_info else nested_info[token]
-                                else:
-                                    nested_info = nested_info[token]
-                        except Exception:
-                            break
-                    nested_data = list(nested_data.keys()) if isinstance(nested_data, dict) else []
-                    lstoption = nested_data
-
-                    #Try to get info for help bar
-                    help_text = nested_info.get('HelpText', '')
-                    enum_tab = []
-                    if 'Type' in nested_info and nested_info['Type'].lower() == "enumeration":
-                        help_text += "\nPossible Values:\n"
-                        for value in nested_info['Value']:
-                            enum_tab.append(value['ValueName'])
-                            help_text += six.u(str(value['ValueName'])) + ' '
-
-                    if not help_text:
-                        try:
-                            nested_info = nested_info['properties']
-                        except KeyError:
-                            pass
-                        help_text = nested_info.get('description', '')
-                        if 'enum' in nested_info:
-                            help_text += "\nPossible Values:\n"
-                            for value in nested_info['enum']:
-                                enum_tab.append(value)
-                                help_text += six.u(str(value)) + ' '
-                    if isinstance(help_text, unicode):
-                        help_text = help_text.replace('. ', '.\n')
-                    self.toolbar_text = help_text
+                    #Match properties, list also shows the reserved properties
+                    node = self.trie.find(nestedtokens)
+                    lstoption = node.complete(word, reserved=tokens[0] == 'list')
+                    self.toolbar_text = node.help
                 else:
                     lstoption = {}
             else:
@@ -735,3 +1806,71 @@ class TabAndHistoryCompletionClass(Completer):
         # to the current tab options list
         for key, value in options.items():
             self.options[key] = value
+
+        if 'nestedprop' in options or 'nestedinfo' in options:
+            self.trie = PropertyTrie(self.options.get('nestedprop'), \
+                                                        self.options.get('nestedinfo'))
+
+class CompletionIndex(object):
+    """ Tab completion lists for interactive mode keyed by what they were built from, such
+    as the selection and the ETags of the selected instances, so they are only rebuilt when
+    the selection or its data changes. Entries are kept in the cache directory between
+    sessions. """
+    #number of entries kept, oldest used entries are dropped first
+    MAX_ENTRIES = 32
+
+    def __init__(self, cachedir=None):
+        """ Constructor
+
+        :param cachedir: cache directory to keep the index in, None to keep it in memory
+        :type cachedir: str.
+        """
+        self.path = os.path.join(cachedir, 'completion.json') if cachedir else None
+        self.entries = OrderedDict()
+        self._dirty = False
+
+        if self.path:
+            try:
+                with open(self.path, 'r') as indexfile:
+                    self.entries = json.load(indexfile, object_pairs_hook=OrderedDict)
+            except (IOError, OSError, ValueError):
+                pass
+
+    def get(self, key, build=None):
+        """ Return the entry for a key, building and storing it if it is missing
+
+        :param key: json serializable key, None if the entry can not be cached
+        :type key: list.
+        :param build: returns the entry, None to only return a stored entry
+        :type build: function.
+        :returns: returns the entry or None if it is missing and can not be built
+        """
+        if key is None:
+            return build() if build else None
+
+        key = json.dumps(key, sort_keys=True)
+        if key in self.entries:
+            self.entries[key] = self.entries.pop(key)
+            return self.entries[key]
+        elif not build:
+            return None
+
+        value = build()
+        if value is not None:
+            self.entries[key] = value
+            while len(self.entries) > self.MAX_ENTRIES:
+                self.entries.popitem(last=False)
+            self._dirty = True
+        return value
+
+    def save(self):
+        """ Write the index to the cache directory if it has changed """
+        if not self.path or not self._dirty:
+            return
+
+        try:
+            with open(self.path, 'w') as indexfile:
+                json.dump(self.entries, indexfile, cls=redfish.ris.JSONEncoder)
+            self._dirty = False
+        except (IOError, OSError):
+            pass